@@ -1,20 +1,33 @@
 import os
+import sys
+import time
 import sqlite3
-import json
+import uuid
 import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 import streamlit as st
-import numpy as np
 from urllib.parse import quote
 
+# Shared helpers live next to the ingest/build scripts
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+from retrieval import RetrievalEngine, fetch_chunks, keyword_search as fts_keyword_search
+from setup_db import setup_database
+from audio_clips import clip_range, extract_clip
+from chat_client import OpenAIChatClient, ChatError, build_prompt
+from answer_cache import AnswerCache
+from context_packer import pack_context, format_stats as format_context_stats
+from embedding_client import estimate_tokens
+from telemetry import QueryLog
+from db import connect
+from ingest_jobs import enqueue, list_jobs, start_worker, worker_running
+
 load_dotenv()
 
 DB_PATH = os.getenv('DB_PATH', 'pr_chat.db')
 UPLOADS_DIR = os.getenv('UPLOADS_DIR', 'data/uploads')
 TRANSCRIPTS_DIR = os.getenv('TRANSCRIPTS_DIR', 'data/transcripts')
 FAISS_INDEX_PATH = os.getenv('FAISS_INDEX_PATH', 'faiss_index.faiss')
-EMBEDDINGS_META = os.getenv('EMBEDDINGS_META', 'embeddings_meta.json')
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 
 # Streamlit page config
@@ -86,11 +99,10 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+@st.cache_resource
 def initialize_db():
-    """Initialize database if not exists."""
-    if not os.path.exists(DB_PATH):
-        st.info("Initializing database...")
-        os.system(f"python scripts/setup_db.py")
+    """Create the database, or add newer tables and columns to an existing one (once per server)."""
+    setup_database(quiet=True)
 
 
 def get_document_info(doc_id):
@@ -137,25 +149,44 @@ def get_document_audio(doc_id):
     return None
 
 
-def display_audio_player(doc_id, title):
-    """Display audio player for MP3 documents."""
-    audio_path = get_document_audio(doc_id)
+def format_clock(seconds):
+    """Seconds as m:ss or h:mm:ss."""
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+
+def display_audio_player(doc_id, title, source_path=None, start_time=None, end_time=None, key=None):
+    """
+    Display audio player for MP3 documents.
+    
+    When the passage's start/end time is known, only a short clip around it
+    is sent to the browser; the full recording is loaded on request.
+    """
+    if source_path is not None:
+        audio_path = source_path
+    else:
+        audio_path = get_document_audio(doc_id)
     
     if audio_path and os.path.exists(audio_path):
         st.markdown(f'<div class="audio-player-box">', unsafe_allow_html=True)
         st.markdown(f'**🎙️ Audio: {title}**')
         
         try:
-            with open(audio_path, 'rb') as f:
-                audio_bytes = f.read()
-            st.audio(audio_bytes, format='audio/mp3')
+            if start_time is not None and end_time is not None:
+                clip_path = extract_clip(audio_path, *clip_range(start_time, end_time))
+                if clip_path:
+                    st.caption(f"Passage at {format_clock(start_time)}–{format_clock(end_time)}")
+                    st.audio(clip_path, format='audio/mp3')
+            if st.checkbox("Load full recording", key=f"full_audio_{key or doc_id}"):
+                st.audio(audio_path, format='audio/mp3', start_time=int(start_time or 0))
         except Exception as e:
             st.warning(f"Could not load audio file: {e}")
         
         st.markdown('</div>', unsafe_allow_html=True)
 
 
-def display_transcript(doc_id, title, highlight_chunk=None):
+def display_transcript(doc_id, title, highlight_chunk=None, key=None):
     """Display full transcript of a document."""
     doc_info = get_document_info(doc_id)
     
@@ -187,10 +218,36 @@ def display_transcript(doc_id, title, highlight_chunk=None):
             data=full_text,
             file_name=f"{title}_transcript.txt",
             mime="text/plain",
-            key=f"download_{doc_id}"
+            key=f"download_{key or doc_id}"
         )
 
 
+def display_search_result(i, result, passage_label, passage_html, key):
+    """
+    Display one search hit: source badge, audio, passage and transcript.
+    
+    `key` must be unique on the page (several hits can share a document).
+    """
+    doc_id, title, content_type = result['doc_id'], result['title'], result['content_type']
+    with st.expander(f"{i}. 🎙️ {title} ({content_type.upper()})", expanded=False):
+        # Show source badge
+        icon = "🎙️" if content_type == "mp3" else "📄"
+        page = f", p. {result['page_number']}" if result.get('page_number') else ""
+        st.markdown(f'<span class="source-badge">{icon} From: {title}{page}</span>', unsafe_allow_html=True)
+        
+        # Audio player if MP3
+        if content_type == "mp3":
+            display_audio_player(doc_id, title, result['source_path'],
+                                 result.get('start_time'), result.get('end_time'), key=key)
+        
+        # Show the relevant passage
+        st.markdown(f"**{passage_label}**")
+        st.markdown(f'<div class="search-result"><p>{passage_html}</p></div>', unsafe_allow_html=True)
+        
+        # Show full transcript
+        display_transcript(doc_id, title, highlight_chunk=result['chunk_text'], key=key)
+
+
 def get_db_stats():
     """Get database statistics."""
     try:
@@ -210,154 +267,246 @@ def get_db_stats():
 
 
 def keyword_search(query, limit=10):
-    """Search using FTS5."""
+    """
+    Search passages using the chunk-level FTS5 index.
+
+    Returns:
+        (results, timings) - results are chunk dicts with bm25 'score',
+        'snippet' and 'highlight', in rank order
+    """
     try:
+        start = time.perf_counter()
         conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        
-        # FTS5 search - now also returns doc_id and content_type
-        c.execute('''
-            SELECT DISTINCT d.doc_id, d.title, d.content_type, c.chunk_text, c.chunk_id
-            FROM documents_fts f
-            JOIN documents d ON f.doc_id = d.doc_id
-            JOIN chunks c ON d.doc_id = c.doc_id
-            WHERE documents_fts MATCH ?
-            LIMIT ?
-        ''', (query, limit))
-        
-        results = c.fetchall()
-        conn.close()
-        return results
+        try:
+            results = fts_keyword_search(conn, query, limit)
+        finally:
+            conn.close()
+        elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+        return results, {'fts_ms': elapsed_ms, 'total_ms': elapsed_ms}
     except Exception as e:
         st.error(f"Search error: {e}")
-        return []
+        return [], {}
+
+
+@st.cache_resource
+def get_retrieval_engine():
+    """Shared retrieval engine, kept resident across sessions and reruns."""
+    return RetrievalEngine(FAISS_INDEX_PATH, DB_PATH)
+
+
+def format_timings(timings):
+    """Format query timings for display."""
+    if not timings:
+        return ""
+    label = ""
+    if 'cold' in timings:
+        label = " (cold)" if timings['cold'] else " (warm)"
+    parts = [f"{k[:-3]} {v} ms" for k, v in timings.items()
+             if k.endswith('_ms') and k != 'total_ms' and v]
+    return f"⏱️ {timings['total_ms']} ms{label} — " + " · ".join(parts)
 
 
 def semantic_search(query, top_k=5):
-    """Search using FAISS embeddings."""
+    """
+    Search using FAISS embeddings.
+
+    Returns:
+        (results, timings) - results are chunk dicts (doc_id, title,
+        content_type, source_path, chunk_text, chunk_id, ...) in rank order
+    """
     try:
-        if not os.path.exists(FAISS_INDEX_PATH) or not os.path.exists(EMBEDDINGS_META):
+        engine = get_retrieval_engine()
+        if not engine.is_available():
             st.error("🔍 Semantic search not available. Please run: `python scripts/build_embeddings.py`")
-            return []
-        
-        import faiss
-        from sentence_transformers import SentenceTransformer
-        
-        # Get query embedding
-        model = SentenceTransformer('all-MiniLM-L6-v2')
-        qvec = model.encode([query])[0].astype('float32')
-        
-        # Search FAISS
-        index = faiss.read_index(FAISS_INDEX_PATH)
-        D, I = index.search(np.array([qvec]), top_k)
-        
-        # Get metadata
-        with open(EMBEDDINGS_META, 'r') as f:
-            meta = json.load(f)
-        
-        # Fetch chunks from database with content_type
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        
-        results = []
-        for idx in I[0]:
-            if 0 <= idx < len(meta):
-                chunk_id = meta[idx]['chunk_id']
-                doc_id = meta[idx]['doc_id']
-                title = meta[idx]['title']
-                
-                c.execute('SELECT chunk_text FROM chunks WHERE chunk_id = ?', (chunk_id,))
-                row = c.fetchone()
-                
-                # Get content type
-                c.execute('SELECT content_type FROM documents WHERE doc_id = ?', (doc_id,))
-                doc_row = c.fetchone()
-                content_type = doc_row[0] if doc_row else 'unknown'
-                
-                if row:
-                    results.append((doc_id, title, content_type, row[0], chunk_id))
+            return [], {}
         
-        conn.close()
-        return results
+        return engine.retrieve(query, top_k)
     except Exception as e:
         st.error(f"Semantic search error: {e}")
-        return []
+        return [], {}
+
+
+def hybrid_search(query, top_k=5):
+    """
+    Search with FTS5 BM25 and FAISS concurrently, fused by reciprocal rank.
+
+    Returns:
+        (results, timings) - fused chunk dicts in rank order, with per-leg
+        keyword/semantic latency in timings
+    """
+    try:
+        return get_retrieval_engine().hybrid_retrieve(query, top_k)
+    except Exception as e:
+        st.error(f"Hybrid search error: {e}")
+        return [], {}
+
+
+def queue_ingest(source, source_type, title=None):
+    """Queue a file or URL for the background ingest worker, starting one if needed. Returns job_id."""
+    conn = connect(DB_PATH)
+    try:
+        job_id = enqueue(conn, source, source_type, title)
+    finally:
+        conn.close()
+    start_worker()
+    return job_id
 
 
 def ingest_file(uploaded_file):
-    """Ingest uploaded file."""
+    """Save an uploaded file and queue it for ingest. Returns the job ID, or None on error."""
     try:
         # Save to temp location
         temp_path = os.path.join(UPLOADS_DIR, uploaded_file.name)
         with open(temp_path, 'wb') as f:
             f.write(uploaded_file.getbuffer())
         
-        # Run ingest script
-        os.system(f"python scripts/ingest.py {temp_path}")
-        
-        return True
+        return queue_ingest(temp_path, 'upload')
     except Exception as e:
         st.error(f"Upload error: {e}")
-        return False
+        return None
 
 
 def ingest_url(url, title=None):
-    """Ingest from URL."""
+    """Queue a URL for download and ingest. Returns the job ID, or None on error."""
     try:
-        os.system(f"python scripts/ingest.py {url} --type url --title {title or 'downloaded'}")
-        return True
+        return queue_ingest(url, 'url', title or None)
     except Exception as e:
         st.error(f"URL error: {e}")
-        return False
+        return None
+
+
+def display_ingest_jobs(limit=5):
+    """Recent ingest jobs with their progress; restarts the worker if jobs are waiting without one."""
+    conn = connect(DB_PATH)
+    try:
+        jobs = list_jobs(conn, limit)
+    finally:
+        conn.close()
+    if not jobs:
+        return
+    
+    st.markdown("### 📋 Ingest Jobs")
+    pending = [job for job in jobs if job['status'] in ('queued', 'running', 'indexing')]
+    if pending and not worker_running():
+        start_worker()  # e.g. after a restart
+    
+    for job in jobs:
+        name = job['title'] or os.path.basename(job['source'])
+        if job['status'] in ('queued', 'running', 'indexing'):
+            st.progress(min(1.0, job['progress'] or 0.0), text=f"#{job['job_id']} {name}: {job['stage'] or ''}")
+        elif job['status'] == 'done':
+            st.caption(f"✅ #{job['job_id']} {name}" + (f" — {job['stage']}" if job['error'] else ""))
+        else:
+            st.caption(f"❌ #{job['job_id']} {name}: {job['error']}")
+    if pending:
+        st.button("🔄 Refresh", key="refresh_jobs")
+
+
+@st.cache_resource
+def get_chat_client():
+    """Shared chat client - one pooled keep-alive session for every app session."""
+    return OpenAIChatClient()
+
 
+def stream_answer(query, context_chunks, context_titles, placeholder):
+    """
+    Generate an answer with OpenAI, rendering it into `placeholder` as it streams.
 
-def generate_answer(query, context_chunks, context_titles):
-    """Generate answer using OpenAI."""
+    Returns:
+        (answer, timings) - timings has first_token_ms, total_ms and
+        prompt_tokens (as reported by the API, else estimated)
+    """
+    timings = {}
     if not OPENAI_API_KEY:
-        return "OpenAI API key not set. Please set OPENAI_API_KEY environment variable."
+        answer = "OpenAI API key not set. Please set OPENAI_API_KEY environment variable."
+        placeholder.markdown(f'<div class="answer-box">{answer}</div>', unsafe_allow_html=True)
+        return answer, timings
     
+    prompt = build_prompt(query, context_chunks, context_titles)
+    timings['prompt_tokens'] = estimate_tokens(prompt)  # replaced by the API's count when reported
+    answer = ""
+    last_render = 0.0
     try:
-        import requests
-        
-        context = "\n\n".join([
-            f"[From: {title}]\n{chunk}"
-            for chunk, title in zip(context_chunks, context_titles)
-        ])
-        
-        prompt = f"""You are a helpful assistant that answers questions based on provided documents.
-Use the following document excerpts to answer the question. Be thorough and cite the source document.
+        for piece in get_chat_client().stream(prompt, timings):
+            answer += piece
+            # Redraw at most ~20 times a second rather than once per token
+            if time.perf_counter() - last_render > 0.05:
+                placeholder.markdown(f'<div class="answer-box">{answer}▌</div>', unsafe_allow_html=True)
+                last_render = time.perf_counter()
+    except ChatError as e:
+        timings['error'] = str(e)
+        answer += f"\n\nError generating answer: {e}"
+    placeholder.markdown(f'<div class="answer-box">{answer}</div>', unsafe_allow_html=True)
+    return answer, timings
+
+
+@st.cache_resource
+def get_answer_cache():
+    """Shared answer cache for repeated and near-duplicate questions."""
+    return AnswerCache(DB_PATH)
+
+
+def question_vector(query):
+    """
+    Embed the question with the index's model for answer-cache lookups.
+
+    Retrieval has just encoded the same query, so the engine returns the
+    vector it remembered instead of encoding it again.
+
+    Returns:
+        (vector, model_name), or (None, None) without an index - the cache
+        then only matches the same question text
+    """
+    engine = get_retrieval_engine()
+    if not engine.is_available():
+        return None, None
+    try:
+        engine.ensure_loaded()
+        return engine.encode(query)[0], engine.model_name
+    except Exception as e:
+        print(f"⚠️ Answer cache: could not embed question: {e}")
+        return None, None
 
-Document Context:
-{context}
 
-Question: {query}
+def cached_sources(chunk_ids):
+    """
+    Load the source chunks of an answer found by question before retrieval.
 
-Answer:"""
-        
-        headers = {
-            "Authorization": f"Bearer {OPENAI_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        data = {
-            "model": "gpt-4o-mini",
-            "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": 1200,
-            "temperature": 0.7
-        }
-        
-        response = requests.post(
-            'https://api.openai.com/v1/chat/completions',
-            headers=headers,
-            json=data
-        )
-        
-        if response.status_code == 200:
-            return response.json()['choices'][0]['message']['content']
-        else:
-            return f"Error: {response.text}"
-    except Exception as e:
-        return f"Error generating answer: {e}"
+    Returns:
+        (results, timings) like semantic_search(), in the cached rank order
+    """
+    start = time.perf_counter()
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        results = fetch_chunks(conn, chunk_ids)
+    finally:
+        conn.close()
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+    return results, {'hydrate_ms': elapsed_ms, 'total_ms': elapsed_ms}
+
+
+@st.cache_resource
+def get_query_log():
+    """Shared query telemetry writer (see scripts/telemetry.py)."""
+    return QueryLog(DB_PATH)
+
+
+def log_query(kind, query, timings, results, rerun_key=None, **fields):
+    """
+    Record a request's stage timings and result count; skipped when it failed.
+
+    The search tabs run again on every Streamlit rerun (any widget change);
+    pass their query and parameters as `rerun_key` so a search is logged
+    only when they change.
+    """
+    if not timings:
+        return
+    if rerun_key is not None:
+        state_key = f'last_logged_{kind}'
+        if st.session_state.get(state_key) == rerun_key:
+            return
+        st.session_state[state_key] = rerun_key
+    get_query_log().log(kind, query, timings, len(results), st.session_state.session_id, **fields)
 
 
 # Main UI
@@ -365,6 +514,7 @@ st.markdown("<h1 style='text-align: center;'>📚 PR-chat Knowledge Base</h1>",
 st.markdown("<p style='text-align: center; color: #6c757d;'>Upload documents and search with AI</p>", unsafe_allow_html=True)
 
 initialize_db()
+st.session_state.setdefault('session_id', uuid.uuid4().hex)
 
 # Sidebar
 with st.sidebar:
@@ -376,6 +526,16 @@ with st.sidebar:
     with col2:
         st.metric("Chunks", chunk_count)
     
+    with st.expander("⏱️ Latency"):
+        windows = {"Last hour": 1, "Last 24 hours": 24, "Last 7 days": 168}
+        window = st.selectbox("Window", list(windows), index=1, key="latency_window")
+        latency_rows = get_query_log().stage_percentiles(windows[window])
+        if latency_rows:
+            st.dataframe(latency_rows, hide_index=True, use_container_width=True)
+            st.caption("Milliseconds per stage; total is the whole request.")
+        else:
+            st.caption("No queries in this window yet.")
+    
     st.markdown("---")
     st.markdown("### 📤 Upload Documents")
     
@@ -390,23 +550,25 @@ with st.sidebar:
         
         if uploaded_file is not None:
             if st.button("📤 Upload & Process"):
-                with st.spinner("Processing file..."):
-                    if ingest_file(uploaded_file):
-                        st.success(f"✅ Processed: {uploaded_file.name}")
-                        st.rerun()
+                job_id = ingest_file(uploaded_file)
+                if job_id:
+                    st.success(f"✅ Queued {uploaded_file.name} as job #{job_id}")
     
     else:  # URL
         url = st.text_input("Enter MP3 URL")
         title = st.text_input("Document title (optional)")
         
         if url and st.button("📥 Download & Process"):
-            with st.spinner("Downloading and processing..."):
-                if ingest_url(url, title):
-                    st.success("✅ Processed URL")
-                    st.rerun()
+            job_id = ingest_url(url, title)
+            if job_id:
+                st.success(f"✅ Queued URL as job #{job_id}")
+    
+    display_ingest_jobs()
 
 # Main tabs
-tab1, tab2, tab3, tab4 = st.tabs(["💬 Ask Question", "🔍 Keyword Search", "🧠 Semantic Search", "📜 Browse Docs"])
+tab1, tab2, tab3, tab4, tab5 = st.tabs([
+    "💬 Ask Question", "🔀 Hybrid Search", "🔍 Keyword Search", "🧠 Semantic Search", "📜 Browse Docs"
+])
 
 # Tab 1: AI Chat with RAG
 with tab1:
@@ -418,53 +580,122 @@ with tab1:
     else:
         query = st.text_input("Your question:", placeholder="What is this document about?", key="ai_question")
         col1, col2 = st.columns([3, 1])
+        with col1:
+            retrieval_mode = st.radio("Find sources with", ["Hybrid", "Semantic"], horizontal=True,
+                                      key="ai_retrieval_mode")
         with col2:
             top_k = st.slider("Results", 3, 10, 5)
+        fresh_answer = st.checkbox("Generate a fresh answer (skip the answer cache)", key="ai_fresh_answer")
         
         if query and st.button("🔍 Get Answer", type="primary"):
-            with st.spinner("Searching and generating answer..."):
-                # Get relevant chunks
-                results = semantic_search(query, top_k)
+            ask_start = time.perf_counter()
+            retrieval_key = f"{retrieval_mode.lower()}:{top_k}"
+            
+            # The same question asked the same way: reuse its answer and sources without retrieving
+            cache_start = time.perf_counter()
+            cached = None if fresh_answer else get_answer_cache().get_question(query, retrieval_key)
+            cache_ms = round((time.perf_counter() - cache_start) * 1000, 1)
+            if cached:
+                results, timings = cached_sources(cached['chunk_ids'])
+            else:
+                with st.spinner("Searching..."):
+                    # Get relevant chunks
+                    if retrieval_mode == "Hybrid":
+                        results, timings = hybrid_search(query, top_k)
+                    else:
+                        results, timings = semantic_search(query, top_k)
+            
+            if results:
+                st.markdown("### 🤖 Answer")
+                answer_placeholder = st.empty()
                 
-                if results:
-                    # Extract data from new result format
-                    doc_ids = [r[0] for r in results]
-                    context_chunks = [r[3] for r in results]  # chunk is at index 3
-                    context_titles = [r[1] for r in results]  # title is at index 1
-                    content_types = [r[2] for r in results]   # content_type is at index 2
-                    
-                    # Generate answer
-                    answer = generate_answer(query, context_chunks, context_titles)
-                    
-                    # Display answer
-                    st.markdown("### 🤖 Answer")
-                    st.markdown(f'<div class="answer-box">{answer}</div>', unsafe_allow_html=True)
-                    
-                    st.markdown("---")
-                    st.markdown(f"### 📚 Source Documents ({len(results)} referenced)")
+                pack_ms = 0.0
+                qvec = qmodel = None
+                if not cached:
+                    # Merge neighbouring chunks, drop repeats and fit the context token budget
+                    pack_start = time.perf_counter()
+                    passages, context_stats = pack_context(results)
+                    pack_ms = round((time.perf_counter() - pack_start) * 1000, 1)
+                    context_chunks = [p['text'] for p in passages]
+                    context_titles = [p['label'] for p in passages]
                     
-                    # Display each source with audio and transcript
-                    for i, (doc_id, title, content_type, chunk) in enumerate(results, 1):
-                        with st.expander(f"{i}. 🎙️ {title} ({content_type.upper()})"):
-                            # Show source badge
-                            icon = "🎙️" if content_type == "mp3" else "📄"
-                            st.markdown(f'<span class="source-badge">{icon} From: {title}</span>', unsafe_allow_html=True)
-                            
-                            # Audio player if MP3
-                            if content_type == "mp3":
-                                display_audio_player(doc_id, title)
-                            
-                            # Show the relevant passage used in answer
-                            st.markdown("**Passage used in answer:**")
-                            st.markdown(f'<div class="search-result"><p>{chunk[:300]}...</p></div>', unsafe_allow_html=True)
-                            
-                            # Show full transcript
-                            display_transcript(doc_id, title, highlight_chunk=chunk)
+                    # Same sources and a near-identical question: reuse the answer
+                    cache_start = time.perf_counter()
+                    qvec, qmodel = question_vector(query)
+                    cached = None if fresh_answer else get_answer_cache().get(query, results, qvec, qmodel)
+                    cache_ms = round(cache_ms + (time.perf_counter() - cache_start) * 1000, 1)
+                answer_timings = {}
+                if cached:
+                    answer = cached['answer']
+                    answer_placeholder.markdown(f'<div class="answer-box">{cached["answer"]}</div>',
+                                                unsafe_allow_html=True)
+                    similar = (f" · similar question: “{cached['question']}” ({cached['similarity']:.2f})"
+                               if cached['similarity'] < 1 else "")
+                    st.caption(f"⚡ cached answer, {cache_ms} ms{similar}")
                 else:
-                    st.info("No relevant documents found.")
+                    # Stream the answer into a placeholder as it is generated
+                    answer_placeholder.markdown('<div class="answer-box">Generating answer...</div>',
+                                                unsafe_allow_html=True)
+                    answer, answer_timings = stream_answer(query, context_chunks, context_titles,
+                                                           answer_placeholder)
+                    if answer_timings.get('total_ms') is not None:
+                        st.caption(f"⏱️ first token {answer_timings.get('first_token_ms', '-')} ms · "
+                                   f"answer {answer_timings['total_ms']} ms · "
+                                   f"prompt {answer_timings['prompt_tokens']} tokens")
+                        st.caption(f"📦 Context: {format_context_stats(context_stats)}")
+                    if 'error' not in answer_timings:
+                        get_answer_cache().put(query, results, answer, qvec, qmodel, retrieval=retrieval_key)
+                
+                ask_timings = {k: v for k, v in timings.items() if k != 'total_ms'}
+                ask_timings.update(retrieval_ms=timings.get('total_ms'), pack_ms=pack_ms, cache_ms=cache_ms,
+                                   first_token_ms=answer_timings.get('first_token_ms'),
+                                   answer_ms=answer_timings.get('total_ms'),
+                                   total_ms=round((time.perf_counter() - ask_start) * 1000, 1))
+                log_query('ask', query, ask_timings, results, cache_hit=bool(cached),
+                          prompt_tokens=answer_timings.get('prompt_tokens'))
+                get_query_log().log_chat(st.session_state.session_id, query, answer,
+                                         [r['doc_id'] for r in results])
+                
+                st.markdown("---")
+                st.markdown(f"### 📚 Source Documents ({len(results)} referenced)")
+                st.caption(format_timings(timings))
+                
+                # Display each source with audio and transcript
+                for i, r in enumerate(results, 1):
+                    display_search_result(i, r, "Passage used in answer:", f"{r['chunk_text'][:300]}...",
+                                          key=f"ask_{i}")
+            else:
+                st.info("No relevant documents found.")
 
-# Tab 2: Keyword Search
+# Tab 2: Hybrid Search
 with tab2:
+    st.markdown("### 🔀 Hybrid Search")
+    st.markdown("Keyword and meaning-based search together, fused by rank")
+    
+    col1, col2 = st.columns([4, 1])
+    with col1:
+        query = st.text_input("Search:", placeholder="Words or a question...", key="hybrid_search")
+    with col2:
+        top_k = st.number_input("Results", 1, 20, 5, key="hybrid_top_k")
+    
+    if query and query.strip():
+        with st.spinner("🔍 Searching..."):
+            results, timings = hybrid_search(query, top_k)
+            log_query('hybrid', query, timings, results, rerun_key=(query, top_k))
+            
+            if results:
+                st.success(f"✨ Found {len(results)} relevant passages")
+                st.caption(format_timings(timings))
+                
+                for i, r in enumerate(results, 1):
+                    found_by = " + ".join(r['sources'])
+                    display_search_result(i, r, f"Relevant passage ({found_by}):", r.get('snippet') or r['chunk_text'],
+                                          key=f"hybrid_{i}")
+            else:
+                st.info("No relevant documents found.")
+
+# Tab 3: Keyword Search
+with tab3:
     st.markdown("### 🔎 Keyword Search")
     st.markdown("Fast full-text search across all documents")
     
@@ -475,31 +706,20 @@ with tab2:
         limit = st.number_input("Results", 1, 50, 10, key="kw_limit")
     
     if query and query.strip():
-        results = keyword_search(query, limit)
+        results, timings = keyword_search(query, limit)
+        log_query('keyword', query, timings, results, rerun_key=(query, limit))
         if results:
             st.success(f"✨ Found {len(results)} results")
+            st.caption(format_timings(timings))
             
-            for i, (doc_id, title, content_type, snippet, chunk_id) in enumerate(results, 1):
-                with st.expander(f"{i}. 🎙️ {title} ({content_type.upper()})", expanded=False):
-                    # Show source badge
-                    icon = "🎙️" if content_type == "mp3" else "📄"
-                    st.markdown(f'<span class="source-badge">{icon} From: {title}</span>', unsafe_allow_html=True)
-                    
-                    # Audio player if MP3
-                    if content_type == "mp3":
-                        display_audio_player(doc_id, title)
-                    
-                    # Show the chunk
-                    st.markdown("**Found in:**")
-                    st.markdown(f'<div class="search-result"><p>{snippet[:300]}...</p></div>', unsafe_allow_html=True)
-                    
-                    # Show full transcript
-                    display_transcript(doc_id, title, highlight_chunk=snippet)
+            for i, r in enumerate(results, 1):
+                # Show the matching passage with the terms highlighted
+                display_search_result(i, r, "Found in:", r['snippet'], key=f"kw_{i}")
         else:
             st.info("No results found.")
 
-# Tab 3: Semantic Search
-with tab3:
+# Tab 4: Semantic Search
+with tab4:
     st.markdown("### 🧠 Semantic Search")
     st.markdown("Find documents by meaning, not just keywords")
     
@@ -511,32 +731,20 @@ with tab3:
     
     if query:
         with st.spinner("🔍 Searching..."):
-            results = semantic_search(query, top_k)
+            results, timings = semantic_search(query, top_k)
+            log_query('semantic', query, timings, results, rerun_key=(query, top_k))
             
             if results:
                 st.success(f"✨ Found {len(results)} relevant passages")
+                st.caption(format_timings(timings))
                 
-                for i, (doc_id, title, content_type, chunk, chunk_id) in enumerate(results, 1):
-                    with st.expander(f"{i}. 🎙️ {title} ({content_type.upper()})", expanded=False):
-                        # Show source badge
-                        icon = "🎙️" if content_type == "mp3" else "📄"
-                        st.markdown(f'<span class="source-badge">{icon} From: {title}</span>', unsafe_allow_html=True)
-                        
-                        # Audio player if MP3
-                        if content_type == "mp3":
-                            display_audio_player(doc_id, title)
-                        
-                        # Show the relevant chunk
-                        st.markdown("**Relevant passage:**")
-                        st.markdown(f'<div class="search-result"><p>{chunk}</p></div>', unsafe_allow_html=True)
-                        
-                        # Show full transcript
-                        display_transcript(doc_id, title, highlight_chunk=chunk)
+                for i, r in enumerate(results, 1):
+                    display_search_result(i, r, "Relevant passage:", r['chunk_text'], key=f"sem_{i}")
             else:
                 st.info("No relevant documents found.")
 
-# Tab 4: Browse Documents
-with tab4:
+# Tab 5: Browse Documents
+with tab5:
     st.markdown("### 📜 Browse All Documents")
     
     try:
@@ -571,10 +779,10 @@ with tab4:
                     
                     # Audio player if MP3
                     if content_type == "mp3":
-                        display_audio_player(doc_id, title)
+                        display_audio_player(doc_id, title, key=f"browse_{doc_id}")
                     
                     # Show transcript
-                    display_transcript(doc_id, title)
+                    display_transcript(doc_id, title, key=f"browse_{doc_id}")
         else:
             st.info("No documents uploaded yet. Use the sidebar to add documents!")
     except Exception as e:
@@ -4,9 +4,11 @@ Generate sample test data for PR-chat (creates mock documents for testing).
 """
 
 import os
-import sqlite3
 from dotenv import load_dotenv
 
+from chunker import iter_chunks
+from db import connect, insert_document, insert_chunks
+
 load_dotenv()
 
 DB_PATH = os.getenv('DB_PATH', 'pr_chat.db')
@@ -96,32 +98,16 @@ Regular scripture study deepens spiritual understanding and strengthens faith.
     ]
     
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
+        conn = connect(DB_PATH)
         
         print("📝 Adding sample documents to knowledge base...\n")
         
         for doc in samples:
-            # Insert document
-            c.execute('''
-                INSERT INTO documents (source_type, source_path, title, content_type, full_text)
-                VALUES (?, ?, ?, ?, ?)
-            ''', ('text', 'sample', doc['title'], doc['content_type'], doc['text']))
-            
-            doc_id = c.lastrowid
-            
-            # Insert into FTS
-            c.execute('INSERT INTO documents_fts VALUES (?, ?, ?)',
-                      (doc_id, doc['title'], doc['text']))
-            
-            # Create chunks (simple split by paragraphs)
-            chunks = [p.strip() for p in doc['text'].split('\n\n') if p.strip()]
+            doc_id = insert_document(conn, 'text', 'sample', doc['title'], doc['content_type'], doc['text'])
             
-            for i, chunk in enumerate(chunks):
-                c.execute('''
-                    INSERT INTO chunks (doc_id, chunk_order, chunk_text)
-                    VALUES (?, ?, ?)
-                ''', (doc_id, i, chunk))
+            # Same chunker as ingest.py
+            chunks = [chunk for chunk, _, _ in iter_chunks(doc['text'])]
+            insert_chunks(conn, doc_id, [(i, chunk, None, None, None) for i, chunk in enumerate(chunks)])
             
             print(f"✓ Added: {doc['title']} ({len(chunks)} chunks)")
         
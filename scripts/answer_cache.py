@@ -0,0 +1,223 @@
+"""
+Persistent cache of generated answers for repeated and near-duplicate questions.
+
+An entry is keyed by the retrieved chunk IDs plus the question: a later
+question hits when retrieval returns the same chunks and the question is
+the same (ignoring case, spacing and trailing punctuation) or its embedding is within
+ANSWER_CACHE_SIMILARITY (cosine) of the cached one. The same question asked
+the same way (retrieval mode and result count) is found by get_question()
+before retrieval runs at all, as long as no document was added since the
+answer was cached. Each entry also stores a hash of its chunks' text, so an
+entry is dropped as soon as any source chunk changes. Entries expire after
+ANSWER_CACHE_TTL_HOURS and the least recently used are evicted past
+ANSWER_CACHE_MAX_ENTRIES.
+
+The answer_cache table is created by setup_db.py in the main database, so
+a database reset clears it too.
+"""
+
+import os
+import time
+import hashlib
+import threading
+from dotenv import load_dotenv
+
+from db import connect
+from embedding_cache import normalize_text
+
+load_dotenv()
+
+DB_PATH = os.getenv('DB_PATH', 'pr_chat.db')
+ANSWER_CACHE_SIMILARITY = float(os.getenv('ANSWER_CACHE_SIMILARITY', '0.95'))
+ANSWER_CACHE_TTL_HOURS = float(os.getenv('ANSWER_CACHE_TTL_HOURS', '168'))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv('ANSWER_CACHE_MAX_ENTRIES', '5000'))
+
+
+def question_hash(question):
+    """Key for a question: case, whitespace and trailing punctuation don't matter."""
+    text = normalize_text(question).casefold().rstrip(' ?!.')
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def chunk_key(results):
+    """Order-independent key for a set of retrieved chunks."""
+    return ','.join(str(cid) for cid in sorted(r['chunk_id'] for r in results))
+
+
+def chunk_content_hash(results):
+    """Hash of the retrieved chunks' text; changes whenever any of them is edited."""
+    h = hashlib.sha256()
+    for r in sorted(results, key=lambda r: r['chunk_id']):
+        h.update(f"{r['chunk_id']}:{r['chunk_text']}\x00".encode('utf-8'))
+    return h.hexdigest()
+
+
+def _unit(vec):
+    import numpy as np
+
+    vec = np.asarray(vec, dtype='float32').ravel()
+    norm = float(np.linalg.norm(vec))
+    return vec / norm if norm else vec
+
+
+class AnswerCache:
+    """SQLite-backed answer cache with similarity lookup, TTL and LRU eviction."""
+
+    def __init__(self, path=DB_PATH, similarity=ANSWER_CACHE_SIMILARITY,
+                 ttl_hours=ANSWER_CACHE_TTL_HOURS, max_entries=ANSWER_CACHE_MAX_ENTRIES):
+        self.similarity = similarity
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.conn = connect(path, check_same_thread=False)
+
+    def get_question(self, question, retrieval):
+        """
+        Look up an answer by question text alone, before running retrieval.
+
+        Only entries for the same `retrieval` (e.g. 'hybrid:5') count, and
+        only if no document was added since they were cached - new documents
+        could change what retrieval returns - and their chunks are unchanged.
+
+        Returns:
+            {'answer', 'question', 'similarity', 'chunk_ids'} (chunk_ids in
+            rank order) or None. A miss is not counted; get() follows it.
+        """
+        now = time.time()
+        with self._lock:
+            latest_doc = self.conn.execute('''
+                SELECT strftime('%s', created_at) FROM documents ORDER BY doc_id DESC LIMIT 1
+            ''').fetchone()
+            rows = self.conn.execute('''
+                SELECT entry_id, question, chunk_ids, chunk_hash, answer FROM answer_cache
+                WHERE question_hash = ? AND retrieval = ? AND created_at > ? AND created_at >= ?
+                ORDER BY last_used DESC
+            ''', (question_hash(question), retrieval, now - self.ttl_seconds,
+                  float(latest_doc[0]) if latest_doc and latest_doc[0] else 0.0)).fetchall()
+
+            for entry_id, cached_question, chunk_ids, chunk_hash, answer in rows:
+                ids = [int(cid) for cid in chunk_ids.split(',')] if chunk_ids else []
+                placeholders = ', '.join('?' * len(ids))
+                chunks = [{'chunk_id': cid, 'chunk_text': text} for cid, text in self.conn.execute(
+                    f'SELECT chunk_id, chunk_text FROM chunks WHERE chunk_id IN ({placeholders})', ids)]
+                if not ids or chunk_content_hash(chunks) != chunk_hash:
+                    self.conn.execute('DELETE FROM answer_cache WHERE entry_id = ?', (entry_id,))
+                    continue  # a source chunk changed or was deleted since this answer
+                self.conn.execute('UPDATE answer_cache SET last_used = ?, hits = hits + 1 WHERE entry_id = ?',
+                                  (now, entry_id))
+                self.conn.commit()
+                self.hits += 1
+                return {'answer': answer, 'question': cached_question, 'similarity': 1.0, 'chunk_ids': ids}
+            self.conn.commit()
+        return None
+
+    def get(self, question, results, question_vector=None, model=None):
+        """
+        Look up an answer for `question` over the retrieved `results`.
+
+        Args:
+            results: retrieved chunk dicts (chunk_id, chunk_text)
+            question_vector: the question's embedding, for near-duplicate hits
+            model: the embedding model that produced question_vector
+
+        Returns:
+            {'answer', 'question', 'similarity'} or None on a miss.
+        """
+        import numpy as np
+
+        if not results:
+            return None
+        q_hash = question_hash(question)
+        current_hash = chunk_content_hash(results)
+        vec = _unit(question_vector) if question_vector is not None else None
+        now = time.time()
+
+        with self._lock:
+            rows = self.conn.execute('''
+                SELECT entry_id, question, question_hash, model, question_vector, chunk_hash, answer
+                FROM answer_cache WHERE chunk_key = ? AND created_at > ?
+            ''', (chunk_key(results), now - self.ttl_seconds)).fetchall()
+
+            best = None
+            stale = []
+            for entry_id, cached_question, cached_hash, cached_model, blob, chunk_hash, answer in rows:
+                if chunk_hash != current_hash:
+                    stale.append((entry_id,))  # a source chunk changed since this answer
+                    continue
+                if cached_hash == q_hash:
+                    similarity = 1.0
+                elif vec is not None and blob is not None and cached_model == model:
+                    similarity = float(np.dot(vec, np.frombuffer(blob, dtype='float32')))
+                else:
+                    continue
+                if similarity >= self.similarity and (best is None or similarity > best[0]):
+                    best = (similarity, entry_id, cached_question, answer)
+
+            if stale:
+                self.conn.executemany('DELETE FROM answer_cache WHERE entry_id = ?', stale)
+            if best is None:
+                self.misses += 1
+                self.conn.commit()
+                return None
+
+            similarity, entry_id, cached_question, answer = best
+            self.conn.execute('UPDATE answer_cache SET last_used = ?, hits = hits + 1 WHERE entry_id = ?',
+                              (now, entry_id))
+            self.conn.commit()
+            self.hits += 1
+        return {'answer': answer, 'question': cached_question, 'similarity': similarity}
+
+    def put(self, question, results, answer, question_vector=None, model=None, retrieval=None):
+        """
+        Store an answer, then drop expired entries and evict past max_entries.
+
+        Args:
+            results: retrieved chunk dicts in rank order
+            retrieval: how they were found (e.g. 'hybrid:5'), for get_question()
+        """
+        if not results or not answer:
+            return
+        now = time.time()
+        blob = _unit(question_vector).tobytes() if question_vector is not None else None
+        key = chunk_key(results)
+        q_hash = question_hash(question)
+        with self._lock:
+            # A fresh answer to the same question over the same chunks replaces the old one
+            self.conn.execute('DELETE FROM answer_cache WHERE chunk_key = ? AND question_hash = ?',
+                              (key, q_hash))
+            self.conn.execute('''
+                INSERT INTO answer_cache (question, question_hash, retrieval, model, question_vector,
+                                          chunk_key, chunk_ids, chunk_hash, answer, created_at, last_used)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (question, q_hash, retrieval, model, blob, key, ','.join(str(r['chunk_id']) for r in results),
+                  chunk_content_hash(results), answer, now, now))
+            self._evict(now)
+            self.conn.commit()
+
+    def _evict(self, now):
+        self.conn.execute('DELETE FROM answer_cache WHERE created_at <= ?', (now - self.ttl_seconds,))
+        self.conn.execute('''
+            DELETE FROM answer_cache WHERE entry_id IN (
+                SELECT entry_id FROM answer_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+            )
+        ''', (self.max_entries,))
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute('DELETE FROM answer_cache')
+            self.conn.commit()
+
+    def stats(self):
+        """Hit/miss counters for this process plus the number of cached answers."""
+        with self._lock:
+            entries = self.conn.execute('SELECT COUNT(*) FROM answer_cache').fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': entries,
+        }
@@ -0,0 +1,64 @@
+"""
+Short audio clips around matched passages.
+
+Search results for MP3 documents play a clip cut from the recording with
+ffmpeg (stream copy, no re-encoding) instead of sending the whole file to
+the browser. Clips are cached in CLIPS_DIR by source file, modification
+time and time range, and the oldest are pruned past CLIP_CACHE_MAX_FILES.
+"""
+
+import os
+import hashlib
+import subprocess
+from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CLIPS_DIR = os.getenv('CLIPS_DIR', 'data/clips')
+CLIP_PADDING_SECONDS = 5.0  # context either side of the passage
+CLIP_CACHE_MAX_FILES = 500
+
+
+def clip_range(start_time, end_time, padding=CLIP_PADDING_SECONDS):
+    """Padded (start, end) in whole seconds, so nearby hits share cached clips."""
+    return max(0, int(start_time - padding)), int(end_time + padding + 1)
+
+
+def _prune(clips_dir, max_files):
+    clips = sorted(Path(clips_dir).glob('*.mp3'), key=lambda p: p.stat().st_mtime)
+    for path in clips[:max(0, len(clips) - max_files)]:
+        path.unlink(missing_ok=True)
+
+
+def extract_clip(source_path, start, end, clips_dir=CLIPS_DIR):
+    """
+    Cut [start, end) seconds out of an MP3.
+
+    Returns:
+        Path to the cached clip, or None if ffmpeg is unavailable or fails.
+    """
+    stat = os.stat(source_path)
+    key = hashlib.sha1(f"{os.path.abspath(source_path)}|{stat.st_mtime_ns}|{start}|{end}".encode()).hexdigest()
+    clip_path = os.path.join(clips_dir, f"{key[:16]}.mp3")
+    if os.path.exists(clip_path):
+        os.utime(clip_path)  # keep recently played clips out of pruning
+        return clip_path
+
+    Path(clips_dir).mkdir(parents=True, exist_ok=True)
+    tmp_path = clip_path + '.part.mp3'
+    try:
+        # -ss before -i seeks in the input instead of decoding up to it
+        subprocess.run(
+            ['ffmpeg', '-v', 'error', '-y', '-ss', str(start), '-t', str(end - start),
+             '-i', source_path, '-c', 'copy', '-map', '0:a', tmp_path],
+            check=True, capture_output=True, timeout=60,
+        )
+        os.replace(tmp_path, clip_path)
+    except (OSError, subprocess.SubprocessError):
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+
+    _prune(clips_dir, CLIP_CACHE_MAX_FILES)
+    return clip_path
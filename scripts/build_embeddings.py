@@ -3,138 +3,538 @@
 Build embeddings for document chunks and create a FAISS index.
 
 Usage:
-  python scripts/build_embeddings.py
+  python scripts/build_embeddings.py          # incremental (default)
+  python scripts/build_embeddings.py --full   # re-embed every chunk
+  python scripts/build_embeddings.py --index-type hnsw --evaluate
+  python scripts/build_embeddings.py --encoding int8 --compare-encodings
+
+Each chunk's vector is stored in the chunk_embeddings table together with
+the model name and a hash of the chunk text. Incremental runs only embed
+new or changed chunks; a full re-embed happens when --full is given or
+the embedding model changes. Texts that were embedded before by the same
+model - duplicate chunks, or everything after a database reset - come from
+the on-disk embedding cache (embedding_cache.py) instead of the model.
+
+The index type (flat, ivf_flat, ivf_pq, hnsw) is chosen from the corpus
+size unless --index-type or FAISS_INDEX_TYPE says otherwise; see
+vector_index.py. Vectors can be stored as float32, float16, int8 (scalar
+quantized) or PQ codes with --encoding / FAISS_ENCODING. Approximate
+indexes print recall@k and latency against exact search after they are
+built; --compare-encodings reports size and recall loss per encoding.
 
 Creates:
-- faiss_index.faiss - Vector search index
-- embeddings_meta.json - Metadata mapping chunks to documents
+- faiss_index.faiss - Vector search index whose vector IDs are chunk_ids
+
+Chunk and document metadata is read from SQLite at query time, and facts
+about the index (model, dimension, size) are kept in the index_meta table.
 """
 
 import os
 import json
+import hashlib
 import sqlite3
+import argparse
+import threading
 from dotenv import load_dotenv
 from tqdm import tqdm
 
+from setup_db import setup_database
+from embedding_client import OpenAIEmbeddingClient
+from embedding_cache import cached_embed, get_embedding_cache
+from vector_index import (
+    INDEX_TYPES, ENCODINGS, FAISS_INDEX_TYPE, FAISS_ENCODING, choose_index_type,
+    MAX_TRAIN_VECTORS, resolve_index, needs_training, create_index, set_search_params,
+    evaluate_index, compare_encodings, index_nbytes, is_positional, supports_remove,
+)
+
 load_dotenv()
 
 DB_PATH = os.getenv('DB_PATH', 'pr_chat.db')
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 FAISS_INDEX_PATH = os.getenv('FAISS_INDEX_PATH', 'faiss_index.faiss')
-EMBEDDINGS_META = os.getenv('EMBEDDINGS_META', 'embeddings_meta.json')
+FAISS_CHECKPOINT_PATH = FAISS_INDEX_PATH + '.partial'
+LEGACY_EMBEDDINGS_META = os.getenv('EMBEDDINGS_META', 'embeddings_meta.json')
 
+OPENAI_EMBEDDING_MODEL = 'text-embedding-3-small'
+LOCAL_EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
 
-def get_chunks():
-    """Fetch all chunks from database."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('''
-        SELECT c.chunk_id, c.doc_id, c.chunk_text, d.title
-        FROM chunks c
-        JOIN documents d ON c.doc_id = d.doc_id
-        ORDER BY c.chunk_id
-    ''')
-    rows = c.fetchall()
-    conn.close()
-    return rows
-
-
-def embed_texts_openai(texts):
-    """Get embeddings from OpenAI."""
-    import requests
-    
-    print("🔗 Using OpenAI embeddings")
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    url = "https://api.openai.com/v1/embeddings"
-    model = "text-embedding-3-small"
-    batch_size = 10
-    embeddings = []
-    
-    for i in tqdm(range(0, len(texts), batch_size)):
-        batch = texts[i:i + batch_size]
-        data = {"model": model, "input": batch}
-        r = requests.post(url, headers=headers, json=data)
-        r.raise_for_status()
-        j = r.json()
-        for item in j['data']:
-            embeddings.append(item['embedding'])
-    
-    return embeddings
-
-
-def embed_texts_local(texts):
-    """Get embeddings using local sentence-transformers."""
-    from sentence_transformers import SentenceTransformer
-    
-    print("🧠 Using local sentence-transformers embeddings")
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    embeddings = model.encode(texts, show_progress_bar=True, convert_to_numpy=True).tolist()
-    return embeddings
-
-
-def build_faiss(embeddings):
-    """Build FAISS index from embeddings."""
+PAGE_SIZE = 1000  # chunks read, embedded and stored per step
+CHECKPOINT_EVERY = 50_000  # vectors added between checkpoints
+EVALUATE_MAX_VECTORS = 200_000  # larger corpora only evaluate on --evaluate
+
+
+def current_model():
+    """Name of the embedding model this run will use."""
+    return OPENAI_EMBEDDING_MODEL if OPENAI_API_KEY else LOCAL_EMBEDDING_MODEL
+
+
+def text_hash(text):
+    """Stable hash of a chunk's text."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def count_chunks(conn):
+    """Number of chunks that belong to a document."""
+    return conn.execute('''
+        SELECT COUNT(*) FROM chunks c JOIN documents d ON c.doc_id = d.doc_id
+    ''').fetchone()[0]
+
+
+def iter_chunks(conn, page_size=PAGE_SIZE):
+    """Yield pages of (chunk_id, chunk_text) in chunk_id order, one page in memory at a time."""
+    last_id = 0
+    while True:
+        page = conn.execute('''
+            SELECT c.chunk_id, c.chunk_text
+            FROM chunks c
+            JOIN documents d ON c.doc_id = d.doc_id
+            WHERE c.chunk_id > ?
+            ORDER BY c.chunk_id
+            LIMIT ?
+        ''', (last_id, page_size)).fetchall()
+        if not page:
+            return
+        yield page
+        last_id = page[-1][0]
+
+
+def get_stored_hashes(conn, chunk_ids):
+    """Return {chunk_id: text_hash} for the stored vectors among chunk_ids."""
+    placeholders = ', '.join('?' * len(chunk_ids))
+    return dict(conn.execute(
+        f'SELECT chunk_id, text_hash FROM chunk_embeddings WHERE chunk_id IN ({placeholders})',
+        list(chunk_ids)).fetchall())
+
+
+def store_embeddings(conn, chunk_ids, hashes, vecs, model):
+    """Insert or replace stored vectors for the given chunks."""
+    conn.executemany('''
+        INSERT OR REPLACE INTO chunk_embeddings (chunk_id, model, text_hash, dim, vector)
+        VALUES (?, ?, ?, ?, ?)
+    ''', [
+        (chunk_id, model, h, vec.shape[0], vec.tobytes())
+        for chunk_id, h, vec in zip(chunk_ids, hashes, vecs)
+    ])
+
+
+def iter_stored_vectors(conn, after=0, page_size=PAGE_SIZE):
+    """Yield (chunk_ids, float32 matrix) pages of stored vectors with chunk_id > after."""
+    import numpy as np
+
+    while True:
+        page = conn.execute('''
+            SELECT chunk_id, vector FROM chunk_embeddings
+            WHERE chunk_id > ?
+            ORDER BY chunk_id
+            LIMIT ?
+        ''', (after, page_size)).fetchall()
+        if not page:
+            return
+        ids = np.asarray([row[0] for row in page], dtype='int64')
+        yield ids, np.vstack([np.frombuffer(row[1], dtype='float32') for row in page])
+        after = int(ids[-1])
+
+
+def sample_stored_vectors(conn, max_vectors=MAX_TRAIN_VECTORS):
+    """Random sample of stored vectors for training IVF/PQ quantizers."""
+    import numpy as np
+
+    rows = conn.execute('SELECT vector FROM chunk_embeddings ORDER BY random() LIMIT ?',
+                        (max_vectors,)).fetchall()
+    return np.vstack([np.frombuffer(row[0], dtype='float32') for row in rows])
+
+
+def load_all_vectors(conn, page_size=PAGE_SIZE):
+    """Every stored vector as (chunk_ids, float32 matrix); only used for evaluation."""
+    import numpy as np
+
+    n, d = conn.execute('SELECT COUNT(*), MAX(dim) FROM chunk_embeddings').fetchone()
+    ids = np.empty(n, dtype='int64')
+    vecs = np.empty((n, d), dtype='float32')
+    pos = 0
+    for page_ids, page_vecs in iter_stored_vectors(conn, page_size=page_size):
+        ids[pos:pos + len(page_ids)] = page_ids
+        vecs[pos:pos + len(page_ids)] = page_vecs
+        pos += len(page_ids)
+    return ids[:pos], vecs[:pos]
+
+
+_openai_client = None
+_openai_client_lock = threading.Lock()
+
+
+def get_openai_client():
+    """Shared pooled embeddings client (see embedding_client.py)."""
+    global _openai_client
+    with _openai_client_lock:
+        if _openai_client is None:
+            _openai_client = OpenAIEmbeddingClient(OPENAI_EMBEDDING_MODEL)
+        return _openai_client
+
+
+def embed_texts_openai(texts, show_progress=True):
+    """Get embeddings from OpenAI as a float32 matrix (cached, see embedding_cache.py)."""
+    def embed(missing):
+        client = get_openai_client()
+        if show_progress:
+            print(f"🔗 Using OpenAI embeddings ({client.max_workers} concurrent requests, "
+                  f"{len(missing)} uncached texts)")
+        with tqdm(total=len(missing), disable=not show_progress) as pbar:
+            return client.embed(missing, progress=pbar.update)
+
+    return cached_embed(texts, OPENAI_EMBEDDING_MODEL, embed)
+
+
+_local_model = None
+_local_model_lock = threading.Lock()
+
+
+def get_local_model():
+    """Shared sentence-transformers model, loaded on first use."""
+    global _local_model
+    with _local_model_lock:
+        if _local_model is None:
+            from sentence_transformers import SentenceTransformer
+
+            _local_model = SentenceTransformer(LOCAL_EMBEDDING_MODEL)
+        return _local_model
+
+
+def embed_texts_local(texts, show_progress=True):
+    """Get embeddings using local sentence-transformers as a float32 matrix (cached)."""
+    def embed(missing):
+        if show_progress:
+            print(f"🧠 Using local sentence-transformers embeddings ({len(missing)} uncached texts)")
+        return get_local_model().encode(missing, show_progress_bar=show_progress,
+                                        convert_to_numpy=True).astype('float32')
+
+    return cached_embed(texts, LOCAL_EMBEDDING_MODEL, embed)
+
+
+def get_index_meta(conn):
+    """Return the index_meta table as a dict."""
+    return dict(conn.execute('SELECT key, value FROM index_meta').fetchall())
+
+
+def write_index_file(index, path):
+    """Write an index via a temp file so an interrupted write never corrupts `path`."""
+    import faiss
+
+    tmp_path = path + '.tmp'
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def read_checkpoint(conn, state):
+    """
+    Return the saved build checkpoint if it belongs to a build with the
+    same model, index type and encoding and its partial index exists.
+    """
+    value = get_index_meta(conn).get('build_checkpoint')
+    if not value:
+        return None
+    checkpoint = json.loads(value)
+    if any(checkpoint.get(k) != v for k, v in state.items()):
+        return None
+    if not os.path.exists(FAISS_CHECKPOINT_PATH):
+        return None
+    return checkpoint
+
+
+def write_checkpoint(conn, index, state, last_chunk_id):
+    """Save a partially built index and how far the build got."""
+    write_index_file(index, FAISS_CHECKPOINT_PATH)
+    checkpoint = dict(state, last_chunk_id=last_chunk_id, ntotal=index.ntotal)
+    conn.execute('INSERT OR REPLACE INTO index_meta (key, value) VALUES (?, ?)',
+                 ('build_checkpoint', json.dumps(checkpoint)))
+    conn.commit()
+
+
+def clear_checkpoint(conn):
+    conn.execute("DELETE FROM index_meta WHERE key = 'build_checkpoint'")
+    conn.commit()
+    if os.path.exists(FAISS_CHECKPOINT_PATH):
+        os.remove(FAISS_CHECKPOINT_PATH)
+
+
+def build_faiss(conn, n, state, nlist=None, page_size=PAGE_SIZE):
+    """
+    Build an ID-mapped FAISS index (vector ID = chunk_id) from stored vectors.
+
+    Vectors are streamed from chunk_embeddings a page at a time and a
+    checkpoint is written every CHECKPOINT_EVERY vectors, so an interrupted
+    build resumes from the last checkpoint instead of starting over.
+    """
     import faiss
+
+    index_type, encoding = state['index_type'], state['encoding']
+    checkpoint = read_checkpoint(conn, state)
+    index = None
+    after = 0
+    if checkpoint:
+        index = faiss.read_index(FAISS_CHECKPOINT_PATH)
+        if index.ntotal == checkpoint['ntotal']:
+            set_search_params(index)
+            after = checkpoint['last_chunk_id']
+            print(f"⏯️ Resuming {index_type} build from checkpoint "
+                  f"({index.ntotal} vectors, chunk_id > {after})")
+        else:
+            index = None
+
+    if index is None:
+        d = conn.execute('SELECT dim FROM chunk_embeddings LIMIT 1').fetchone()[0]
+        print(f"📦 Building FAISS index ({index_type}, {encoding})...")
+        sample = sample_stored_vectors(conn) if needs_training(index_type, encoding) else None
+        index = create_index(index_type, d, n, nlist=nlist, encoding=encoding, sample=sample)
+        del sample
+
+    since_checkpoint = 0
+    with tqdm(total=n, initial=index.ntotal, desc="Indexing", unit="vec") as pbar:
+        for ids, vecs in iter_stored_vectors(conn, after, page_size):
+            index.add_with_ids(vecs, ids)
+            pbar.update(len(ids))
+            since_checkpoint += len(ids)
+            if since_checkpoint >= CHECKPOINT_EVERY:
+                write_checkpoint(conn, index, state, int(ids[-1]))
+                since_checkpoint = 0
+    return index
+
+
+def load_faiss():
+    """Load the existing index, or None if missing or not ID-mapped."""
+    import faiss
+
+    if not os.path.exists(FAISS_INDEX_PATH):
+        return None
+    index = faiss.read_index(FAISS_INDEX_PATH)
+    if is_positional(index):
+        print("🔄 Existing index uses positional IDs, rebuilding with chunk_id IDs")
+        return None
+    return index
+
+
+def save_faiss(conn, index, model, index_type, encoding, quiet=False):
+    """Write the index to disk and record its facts in index_meta."""
+    write_index_file(index, FAISS_INDEX_PATH)
+    conn.executemany('INSERT OR REPLACE INTO index_meta (key, value) VALUES (?, ?)', [
+        ('model', model),
+        ('dim', str(index.d)),
+        ('ntotal', str(index.ntotal)),
+        ('index_type', index_type),
+        ('encoding', encoding),
+    ])
+    conn.commit()
+    if quiet:
+        return
+    print(f"✓ FAISS index saved: {FAISS_INDEX_PATH} ({index_type}, {encoding}, "
+          f"{index.ntotal} vectors, {index_nbytes(index) / 1e6:.1f} MB)")
+
+    # The positional metadata file is no longer used
+    if os.path.exists(LEGACY_EMBEDDINGS_META):
+        os.remove(LEGACY_EMBEDDINGS_META)
+        print(f"🧹 Removed legacy {LEGACY_EMBEDDINGS_META}")
+
+
+def main(full=False, index_type=FAISS_INDEX_TYPE, nlist=None, evaluate=None,
+         encoding=FAISS_ENCODING, compare=False, page_size=PAGE_SIZE):
+    """
+    Build embeddings and FAISS index.
+
+    Chunks are read, embedded and stored a page at a time, and each page's
+    vectors go straight into the index, so memory use does not grow with
+    the corpus. Every page is committed as soon as it is embedded; an
+    interrupted run picks up at the first chunk without a stored vector.
+
+    Args:
+        full: re-embed every chunk
+        index_type: 'auto' or one of vector_index.INDEX_TYPES
+        nlist: IVF cell count override
+        evaluate: print recall/latency vs exact search (default: after
+            rebuilding an approximate index of up to EVALUATE_MAX_VECTORS)
+        encoding: one of vector_index.ENCODINGS
+        compare: print size and recall loss for every encoding
+        page_size: chunks per page
+    """
     import numpy as np
-    
-    print("📦 Building FAISS index...")
-    vecs = np.array(embeddings).astype('float32')
-    d = vecs.shape[1]
-    index = faiss.IndexFlatL2(d)
-    index.add(vecs)
-    faiss.write_index(index, FAISS_INDEX_PATH)
-    print(f"✓ FAISS index saved: {FAISS_INDEX_PATH}")
-
-
-def main():
-    """Build embeddings and FAISS index."""
+
     print("Building embeddings...")
     print("=" * 60)
-    
-    rows = get_chunks()
-    if not rows:
+
+    setup_database(quiet=True)
+    conn = sqlite3.connect(DB_PATH)
+    n = count_chunks(conn)
+    if not n:
         print("❌ No chunks found. Run ingest first.")
+        conn.close()
         return
-    
-    print(f"📊 Found {len(rows)} chunks")
-    
-    # Extract data
-    chunk_ids = [r[0] for r in rows]
-    doc_ids = [r[1] for r in rows]
-    texts = [r[2] for r in rows]
-    titles = [r[3] for r in rows]
-    
-    # Build metadata
-    meta = [
-        {
-            "chunk_id": chunk_ids[i],
-            "doc_id": doc_ids[i],
-            "title": titles[i]
-        }
-        for i in range(len(chunk_ids))
-    ]
-    
-    # Generate embeddings
+
+    print(f"📊 Found {n} chunks")
+
+    model = current_model()
+    stored_models = [row[0] for row in conn.execute('SELECT DISTINCT model FROM chunk_embeddings')]
+    model_changed = any(m != model for m in stored_models)
+    if model_changed:
+        print(f"🔄 Embedding model changed ({', '.join(sorted(stored_models))} → {model}), rebuilding")
+        # Vectors already stored for the new model (from an interrupted run) are kept
+        conn.execute('DELETE FROM chunk_embeddings WHERE model != ?', (model,))
+    if full:
+        conn.execute('DELETE FROM chunk_embeddings')
+
+    # Chunks deleted since the last run: noted by db.delete_document(), or
+    # stored vectors whose chunk is gone (deleted some other way)
+    deleted_ids = [row[0] for row in conn.execute('''
+        SELECT chunk_id FROM deleted_chunks
+        UNION
+        SELECT chunk_id FROM chunk_embeddings
+        WHERE chunk_id NOT IN (SELECT c.chunk_id FROM chunks c JOIN documents d ON c.doc_id = d.doc_id)
+    ''')]
+    if deleted_ids:
+        conn.executemany('DELETE FROM chunk_embeddings WHERE chunk_id = ?',
+                         [(cid,) for cid in deleted_ids])
+        conn.execute('DELETE FROM deleted_chunks')
+    conn.commit()
+
+    if index_type == 'auto':
+        index_type = choose_index_type(n)
+    index_type, encoding = resolve_index(index_type, encoding, n)
+    state = {'model': model, 'index_type': index_type, 'encoding': encoding}
+    index_meta = get_index_meta(conn)
+    previous_type = index_meta.get('index_type', 'flat')
+    previous_encoding = index_meta.get('encoding', 'float32')
+
+    # A checkpoint only stays valid while the vectors it already covers are unchanged
+    checkpoint = read_checkpoint(conn, state)
+    if checkpoint and (full or model_changed or
+                       any(cid <= checkpoint['last_chunk_id'] for cid in deleted_ids)):
+        clear_checkpoint(conn)
+        checkpoint = None
+
+    # Update the index in place by chunk_id; rebuild from stored vectors
+    # (no re-embedding) when there is no usable index, an interrupted
+    # rebuild can be resumed, the index type changes, vectors cannot be
+    # removed in place, or the index has drifted
+    index = None if (full or model_changed or checkpoint) else load_faiss()
+    if index is not None and previous_type != index_type:
+        print(f"🔄 Index type changed ({previous_type} → {index_type}), rebuilding")
+        index = None
+    if index is not None and previous_encoding != encoding:
+        print(f"🔄 Encoding changed ({previous_encoding} → {encoding}), rebuilding")
+        index = None
+    if index is not None and deleted_ids:
+        if supports_remove(index):
+            index.remove_ids(np.asarray(deleted_ids, dtype='int64'))
+        else:
+            print(f"🔄 {index_type} cannot remove vectors in place, rebuilding")
+            index = None
+
     if OPENAI_API_KEY:
-        embeddings = embed_texts_openai(texts)
+        print(f"🔗 Using OpenAI embeddings ({get_openai_client().max_workers} concurrent requests)")
+        embed_texts = embed_texts_openai
     else:
-        embeddings = embed_texts_local(texts)
-    
-    # Build FAISS index
-    build_faiss(embeddings)
-    
-    # Save metadata
-    with open(EMBEDDINGS_META, 'w') as f:
-        json.dump(meta, f, indent=2)
-    
-    print(f"✓ Metadata saved: {EMBEDDINGS_META}")
+        print("🧠 Using local sentence-transformers embeddings")
+        embed_texts = embed_texts_local
+
+    # Stream chunks: embed and store only new/changed ones, page by page
+    new_count = changed_count = 0
+    since_save = 0
+    with tqdm(total=n, desc="Embedding", unit="chunk") as pbar:
+        for page in iter_chunks(conn, page_size):
+            ids = [row[0] for row in page]
+            hashes = [text_hash(row[1]) for row in page]
+            stored = get_stored_hashes(conn, ids)
+            todo = [i for i, (cid, h) in enumerate(zip(ids, hashes)) if stored.get(cid) != h]
+            pbar.update(len(page))
+            if not todo:
+                continue
+
+            embed_ids = [ids[i] for i in todo]
+            changed_ids = [cid for cid in embed_ids if cid in stored]
+            vecs = embed_texts([page[i][1] for i in todo], show_progress=False)
+            store_embeddings(conn, embed_ids, [hashes[i] for i in todo], vecs, model)
+            conn.commit()
+            new_count += len(embed_ids) - len(changed_ids)
+            changed_count += len(changed_ids)
+
+            if checkpoint and changed_ids and min(changed_ids) <= checkpoint['last_chunk_id']:
+                clear_checkpoint(conn)
+                checkpoint = None
+
+            if index is not None and changed_ids:
+                if supports_remove(index):
+                    index.remove_ids(np.asarray(changed_ids, dtype='int64'))
+                else:
+                    print(f"\n🔄 {index_type} cannot remove vectors in place, rebuilding")
+                    index = None
+            if index is not None:
+                index.add_with_ids(vecs, np.asarray(embed_ids, dtype='int64'))
+                since_save += len(embed_ids)
+                if since_save >= CHECKPOINT_EVERY:
+                    save_faiss(conn, index, model, index_type, encoding, quiet=True)
+                    since_save = 0
+
+    print(f"🧮 {new_count} new, {changed_count} changed, "
+          f"{len(deleted_ids)} deleted, {n - new_count - changed_count} unchanged")
+    if new_count or changed_count:
+        print(get_embedding_cache().format_stats())
+
+    if index is not None and index.ntotal != n:
+        print(f"⚠️ Index has {index.ntotal} vectors for {n} chunks, rebuilding")
+        index = None
+    rebuilt = index is None
+    up_to_date = not rebuilt and not (new_count or changed_count or deleted_ids)
+    if up_to_date:
+        print("✓ Index already up to date")
+        if not (evaluate or compare):
+            conn.close()
+            return
+    elif not rebuilt:
+        print(f"✓ Updated index in place (-{changed_count + len(deleted_ids)} "
+              f"+{new_count + changed_count} vectors)")
+
+    if index is None:
+        index = build_faiss(conn, n, state, nlist=nlist, page_size=page_size)
+        if index.ntotal != n:
+            print(f"⚠️ Resumed index has {index.ntotal} vectors for {n} chunks, rebuilding from scratch")
+            clear_checkpoint(conn)
+            index = build_faiss(conn, n, state, nlist=nlist, page_size=page_size)
+
+    if not up_to_date:
+        save_faiss(conn, index, model, index_type, encoding)
+        clear_checkpoint(conn)
+
+    if evaluate is None:
+        evaluate = (rebuilt and (index_type != 'flat' or encoding != 'float32')
+                    and n <= EVALUATE_MAX_VECTORS)
+    if evaluate or compare:
+        chunk_ids, all_vecs = load_all_vectors(conn)
+        if evaluate:
+            evaluate_index(index, index_type, all_vecs, chunk_ids)
+        if compare:
+            compare_encodings(index_type, all_vecs, chunk_ids, nlist=nlist)
+    conn.close()
+
     print("\n" + "=" * 60)
-    print(f"✅ Embeddings complete! {len(chunk_ids)} chunks indexed")
+    print(f"✅ Embeddings complete! {index.ntotal} chunks indexed "
+          f"({new_count + changed_count} embedded this run)")
     print("💡 You can now use semantic search in the Streamlit app")
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description="Build chunk embeddings and the FAISS index.")
+    parser.add_argument('--full', action='store_true',
+                        help="re-embed every chunk instead of only new/changed ones")
+    parser.add_argument('--index-type', choices=('auto',) + INDEX_TYPES, default=FAISS_INDEX_TYPE,
+                        help="FAISS index type (default: FAISS_INDEX_TYPE or auto by corpus size)")
+    parser.add_argument('--nlist', type=int, help="number of IVF cells (default: ~4*sqrt(n))")
+    parser.add_argument('--evaluate', action='store_true', default=None,
+                        help="print recall@k and latency vs exact search")
+    parser.add_argument('--no-evaluate', dest='evaluate', action='store_false')
+    parser.add_argument('--encoding', choices=ENCODINGS, default=FAISS_ENCODING,
+                        help="vector encoding stored in the index (default: FAISS_ENCODING or float32)")
+    parser.add_argument('--compare-encodings', action='store_true',
+                        help="report memory footprint and recall loss for every encoding")
+    parser.add_argument('--page-size', type=int, default=PAGE_SIZE,
+                        help=f"chunks read and embedded per step (default: {PAGE_SIZE})")
+    args = parser.parse_args()
+    main(full=args.full, index_type=args.index_type, nlist=args.nlist, evaluate=args.evaluate,
+         encoding=args.encoding, compare=args.compare_encodings, page_size=args.page_size)
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Bulk ingest of whole directories, globs or a manifest.
+
+ingest.py handles one file per process. For a large backlog this script
+runs the same steps as a pipeline, each stage with its own concurrency:
+
+1. Fetch      - thread pool (I/O bound): download URLs, check local files
+2. Extract    - process pool (CPU bound): transcribe / extract text, chunk
+3. Write      - a single writer in the main process with one connection,
+                committing every --commit-every documents
+
+Files flow from stage to stage as soon as they are ready, so downloads,
+transcription and database writes overlap. A progress line is printed per
+document and a throughput summary at the end.
+
+Usage:
+  python scripts/bulk_ingest.py data/archive/                     # every MP3/PDF below
+  python scripts/bulk_ingest.py 'data/archive/**/*.pdf'           # glob (quote it)
+  python scripts/bulk_ingest.py --manifest sources.txt            # paths/URLs, one per line
+  python scripts/bulk_ingest.py data/archive/ --cpu-workers 4 --io-workers 16
+  python scripts/bulk_ingest.py data/archive/ --on-duplicate replace  # re-extract everything
+
+Files already in the database (same sha256) are skipped before extraction
+unless --on-duplicate is replace or force.
+
+A manifest line is a path or URL, optionally followed by a tab and a
+title. Blank lines and lines starting with # are ignored.
+"""
+
+import io
+import os
+import sys
+import glob
+import time
+import queue
+import sqlite3
+import argparse
+import contextlib
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from ingest import (
+    DB_PATH, UPLOADS_DIR, DUPLICATE_POLICIES, ensure_dirs, file_sha256,
+    extract_document, write_document,
+)
+from db import connect, find_duplicates
+from downloader import download
+from setup_db import setup_database
+
+SUPPORTED_EXTENSIONS = ('.mp3', '.pdf')
+IO_WORKERS = 8
+CPU_WORKERS = os.cpu_count() or 1
+COMMIT_EVERY = 20
+
+
+def is_url(source):
+    return source.startswith(('http://', 'https://'))
+
+
+def expand_source(source):
+    """A path, directory, glob or URL -> list of files/URLs to ingest."""
+    if is_url(source):
+        return [source]
+    if os.path.isdir(source):
+        return sorted(str(p) for p in Path(source).rglob('*')
+                      if p.is_file() and p.suffix.lower() in SUPPORTED_EXTENSIONS)
+    if glob.has_magic(source):
+        return sorted(p for p in glob.glob(source, recursive=True)
+                      if os.path.isfile(p) and p.lower().endswith(SUPPORTED_EXTENSIONS))
+    return [source]
+
+
+def read_manifest(path):
+    """Manifest lines -> list of (source, title or None)."""
+    entries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line.strip() or line.lstrip().startswith('#'):
+                continue
+            source, _, title = line.partition('\t')
+            entries.append((source.strip(), title.strip() or None))
+    return entries
+
+
+def collect_sources(paths, manifest=None):
+    """Expand CLI paths and manifest entries into unique (source, title) pairs, in order."""
+    entries = [(source, None) for path in paths for source in expand_source(path)]
+    if manifest:
+        for source, title in read_manifest(manifest):
+            entries.extend((s, title) for s in expand_source(source))
+
+    titles = {}
+    for source, title in entries:
+        if title or source not in titles:  # a manifest title wins over a bare path
+            titles[source] = title
+    return list(titles.items())
+
+
+def fetch(source, on_duplicate='skip'):
+    """
+    Fetch stage: download a URL into UPLOADS_DIR, or check a local file,
+    then hash it so already-ingested files never reach the extract stage.
+
+    Returns:
+        {'path', 'content_hash', 'duplicate' (True if it should be
+        skipped), 'seconds'} - path is None if the fetch failed
+    """
+    start = time.perf_counter()
+    if is_url(source):
+        path, _, _ = download(source, UPLOADS_DIR)  # raises on failure
+    else:
+        path = source if os.path.isfile(source) else None
+
+    content_hash = file_sha256(path) if path else None
+    duplicate = False
+    if content_hash and on_duplicate == 'skip':
+        conn = connect(DB_PATH)
+        try:
+            duplicate = bool(find_duplicates(conn, content_hash))
+        finally:
+            conn.close()
+    return {'path': path, 'content_hash': content_hash, 'duplicate': duplicate,
+            'seconds': time.perf_counter() - start}
+
+
+def _init_worker(threads):
+    # Set before torch is imported so Whisper in each worker uses its share of the cores
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    os.environ['MKL_NUM_THREADS'] = str(threads)
+
+
+def _extract(path, title):
+    """
+    Extract stage (runs in a worker process).
+
+    Returns:
+        (doc or None, error or None, seconds)
+    """
+    start = time.perf_counter()
+    log = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(log):
+            # One file per process already uses every core; no nested pools
+            doc = extract_document(path, title, parallel=False)
+    except Exception as e:
+        return None, str(e), time.perf_counter() - start
+    error = None
+    if doc is None:
+        errors = [line.strip(' ❌') for line in log.getvalue().splitlines() if '❌' in line]
+        error = errors[-1] if errors else 'extraction failed'
+    return doc, error, time.perf_counter() - start
+
+
+class BulkIngest:
+    """
+    The staged pipeline. Fetch and extract run in pools; their results
+    arrive on a queue that the writer (run()) drains in the main thread.
+    """
+
+    def __init__(self, io_workers=IO_WORKERS, cpu_workers=CPU_WORKERS, commit_every=COMMIT_EVERY,
+                 on_duplicate='skip'):
+        self.io_workers = io_workers
+        self.cpu_workers = cpu_workers
+        self.commit_every = commit_every
+        self.on_duplicate = on_duplicate
+        self.results = queue.Queue()
+        self.stage_seconds = {'fetch': 0.0, 'extract': 0.0, 'write': 0.0}
+        self.ingested = 0
+        self.skipped = 0
+        self.failed = 0
+        self.chunks = 0
+
+    def _submit(self, source, title):
+        future = self.fetch_pool.submit(fetch, source, self.on_duplicate)
+        future.add_done_callback(lambda f: self._fetched(source, title, f))
+
+    def _fetched(self, source, title, future):
+        job = {'source': source, 'doc': None, 'error': None, 'extract_seconds': 0.0}
+        try:
+            job.update(future.result())
+        except Exception as e:
+            job.update(path=None, seconds=0.0, error=f"fetch failed: {e}")
+        if not job['path']:
+            job['error'] = job['error'] or 'fetch failed'
+            self.results.put(job)
+            return
+        if job['duplicate']:
+            self.results.put(job)
+            return
+        try:
+            extract = self.cpu_pool.submit(_extract, job['path'], title)
+        except RuntimeError as e:  # BrokenProcessPool: an earlier worker process died
+            # An exception here would be swallowed by the done-callback and run() would wait forever
+            job['error'] = f"worker failed: {e}"
+            self.results.put(job)
+            return
+        extract.add_done_callback(lambda f: self._extracted(job, f))
+
+    def _extracted(self, job, future):
+        try:
+            job['doc'], job['error'], job['extract_seconds'] = future.result()
+        except Exception as e:  # e.g. a worker process died
+            job['error'] = f"worker failed: {e}"
+        self.results.put(job)
+
+    def _write(self, conn, job):
+        """
+        Writer stage for one extracted document, in its own savepoint.
+
+        The savepoint is nested in a transaction that run() commits every
+        commit_every documents; a failed document is rolled back alone.
+
+        Returns:
+            False if it turned out to duplicate a document (e.g. one
+            written earlier in this run) and was skipped.
+        """
+        duplicates = [] if self.on_duplicate == 'force' else find_duplicates(conn, job['content_hash'])
+        if duplicates and self.on_duplicate == 'skip':
+            return False
+        if not conn.in_transaction:
+            # Outside a transaction the savepoint would be one, and RELEASE would commit it
+            conn.execute('BEGIN')
+        conn.execute('SAVEPOINT document')
+        try:
+            write_document(conn, 'upload', job['path'], job['doc'], job['content_hash'],
+                           replace_ids=[doc_id for doc_id, _ in duplicates], quiet=True)
+        except sqlite3.Error:
+            conn.execute('ROLLBACK TO document')
+            raise
+        finally:
+            conn.execute('RELEASE document')
+        return True
+
+    def run(self, sources):
+        """Ingest (source, title) pairs. Returns True if no document failed."""
+        total = len(sources)
+        threads = max(1, (os.cpu_count() or 1) // self.cpu_workers)
+        print(f"📚 Bulk ingest: {total} sources "
+              f"({self.io_workers} fetch threads, {self.cpu_workers} extract processes, 1 writer)")
+
+        start = time.perf_counter()
+        conn = connect(DB_PATH)
+        self.fetch_pool = ThreadPoolExecutor(max_workers=self.io_workers)
+        # spawn, not fork: forking after torch/OpenMP threads exist can deadlock
+        self.cpu_pool = ProcessPoolExecutor(max_workers=self.cpu_workers,
+                                            mp_context=multiprocessing.get_context('spawn'),
+                                            initializer=_init_worker, initargs=(threads,))
+        try:
+            for source, title in sources:
+                self._submit(source, title)
+
+            pending = 0
+            for done in range(1, total + 1):
+                job = self.results.get()
+                doc = job['doc']
+                self.stage_seconds['fetch'] += job['seconds']
+                self.stage_seconds['extract'] += job['extract_seconds']
+                if job.get('duplicate'):
+                    self.skipped += 1
+                    print(f"[{done}/{total}] ⏭️ {job['source']}: already ingested")
+                    continue
+                if doc is None:
+                    self.failed += 1
+                    print(f"[{done}/{total}] ❌ {job['source']}: {job['error']}")
+                    continue
+
+                write_start = time.perf_counter()
+                try:
+                    written = self._write(conn, job)
+                except sqlite3.Error as e:
+                    self.failed += 1
+                    print(f"[{done}/{total}] ❌ {job['source']}: write failed: {e}")
+                    continue
+                if not written:
+                    self.skipped += 1
+                    print(f"[{done}/{total}] ⏭️ {job['source']}: duplicate of a document in this run")
+                    continue
+                pending += 1
+                if pending >= self.commit_every:
+                    conn.commit()
+                    pending = 0
+                self.stage_seconds['write'] += time.perf_counter() - write_start
+
+                self.ingested += 1
+                self.chunks += len(doc['chunks'])
+                elapsed = time.perf_counter() - start
+                print(f"[{done}/{total}] ✓ {doc['title']} ({doc['content_type']}, "
+                      f"{len(doc['chunks'])} chunks, {job['extract_seconds']:.1f}s) - "
+                      f"{self.ingested / elapsed * 60:.1f} docs/min")
+            conn.commit()
+        finally:
+            self.fetch_pool.shutdown(wait=True)
+            self.cpu_pool.shutdown(wait=True)
+            conn.close()
+
+        self.wall_seconds = time.perf_counter() - start
+        return self.failed == 0
+
+    def print_summary(self):
+        wall = self.wall_seconds or 1e-9
+        print("\n" + "=" * 60)
+        print(f"✅ {self.ingested} ingested, {self.skipped} skipped as duplicates, {self.failed} failed, "
+              f"{self.chunks} chunks in {wall:.1f}s")
+        print(f"⏱️ Throughput: {self.ingested / wall * 60:.1f} docs/min, {self.chunks / wall:.1f} chunks/sec")
+        print("   Stage busy time (summed across workers):")
+        for stage, seconds in self.stage_seconds.items():
+            print(f"   {stage:<8} {seconds:>8.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest directories, globs or a manifest of MP3/PDF sources.")
+    parser.add_argument('paths', nargs='*', help="files, directories, globs or URLs")
+    parser.add_argument('--manifest', help="file with one path or URL per line (optional tab + title)")
+    parser.add_argument('--io-workers', type=int, default=IO_WORKERS,
+                        help=f"download/fetch threads (default: {IO_WORKERS})")
+    parser.add_argument('--cpu-workers', type=int, default=CPU_WORKERS,
+                        help=f"transcription/extraction processes (default: {CPU_WORKERS})")
+    parser.add_argument('--commit-every', type=int, default=COMMIT_EVERY,
+                        help=f"documents per database commit (default: {COMMIT_EVERY})")
+    parser.add_argument('--on-duplicate', choices=DUPLICATE_POLICIES, default='skip',
+                        help="files already ingested (same sha256): skip (default), replace the "
+                             "old document, or force a second copy")
+    args = parser.parse_args()
+
+    if not args.paths and not args.manifest:
+        parser.print_usage()
+        sys.exit(1)
+
+    sources = collect_sources(args.paths, args.manifest)
+    if not sources:
+        print("No MP3 or PDF sources found.")
+        sys.exit(1)
+
+    ensure_dirs()
+    setup_database(quiet=True)
+    pipeline = BulkIngest(args.io_workers, args.cpu_workers, args.commit_every, args.on_duplicate)
+    success = pipeline.run(sources)
+    pipeline.print_summary()
+    sys.exit(0 if success else 1)
+
+
+if __name__ == '__main__':
+    main()
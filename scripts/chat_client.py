@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Streaming client for the OpenAI chat completions endpoint.
+
+- Answers are streamed (server-sent events) and yielded piece by piece, so
+  the UI can render the first words as soon as they are generated
+- One pooled keep-alive session is shared by every request
+- (connect, read) timeouts are configurable; the read timeout applies
+  between streamed events, not to the whole answer
+- Each request records time-to-first-token and total latency
+
+The endpoint comes from OPENAI_BASE_URL, so the client can be pointed at a
+local stub server.
+
+Usage:
+  python scripts/chat_client.py "What is contemplative prayer?"
+"""
+
+import os
+import sys
+import json
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL', 'https://api.openai.com/v1')
+CHAT_MODEL = os.getenv('CHAT_MODEL', 'gpt-4o-mini')
+CHAT_MAX_TOKENS = int(os.getenv('CHAT_MAX_TOKENS', '1200'))
+CHAT_TIMEOUT = (float(os.getenv('CHAT_CONNECT_TIMEOUT', '10')),
+                float(os.getenv('CHAT_READ_TIMEOUT', '60')))
+CHAT_POOL_SIZE = 8  # concurrent app sessions sharing the client
+
+
+class ChatError(Exception):
+    """Raised when the chat endpoint returns an error or an unreadable stream."""
+
+
+def format_passage(text, title):
+    """One source-labelled excerpt as it appears in the prompt."""
+    return f"[From: {title}]\n{text}"
+
+
+def build_prompt(query, context_chunks, context_titles):
+    """The RAG prompt: source-labelled excerpts followed by the question."""
+    context = "\n\n".join([
+        format_passage(chunk, title)
+        for chunk, title in zip(context_chunks, context_titles)
+    ])
+
+    return f"""You are a helpful assistant that answers questions based on provided documents.
+Use the following document excerpts to answer the question. Be thorough and cite the source document.
+
+Document Context:
+{context}
+
+Question: {query}
+
+Answer:"""
+
+
+class OpenAIChatClient:
+    """
+    Pooled, streaming chat completions client. Safe to share between threads.
+
+    Args:
+        model: chat model name
+        api_key: API key (default OPENAI_API_KEY)
+        base_url: API root (default OPENAI_BASE_URL)
+        max_tokens: answer length limit
+        timeout: (connect, read) timeout in seconds
+    """
+
+    def __init__(self, model=CHAT_MODEL, api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL,
+                 max_tokens=CHAT_MAX_TOKENS, temperature=0.7, timeout=CHAT_TIMEOUT):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.model = model
+        self.url = base_url.rstrip('/') + '/chat/completions'
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=CHAT_POOL_SIZE)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        })
+
+    def stream(self, prompt, timings=None):
+        """
+        Stream an answer.
+
+        Args:
+            prompt: user message
+            timings: optional dict, filled in as the stream progresses with
+                first_token_ms, total_ms, chunks (events with content) and,
+                when the endpoint reports usage, prompt_tokens and
+                completion_tokens
+
+        Yields:
+            Text pieces in order. Raises ChatError on an error response.
+        """
+        import requests
+
+        timings = timings if timings is not None else {}
+        payload = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "stream": True,
+            "stream_options": {"include_usage": True},  # token counts in the final event
+        }
+        start = time.perf_counter()
+        timings['chunks'] = 0
+        try:
+            with self.session.post(self.url, json=payload, stream=True, timeout=self.timeout) as r:
+                if r.status_code != 200:
+                    raise ChatError(f"Chat request failed ({r.status_code}): {r.text[:500]}")
+                # chunk_size=None: hand over each event as it arrives instead of filling a buffer
+                for raw in r.iter_lines(chunk_size=None):
+                    line = raw.decode('utf-8')
+                    if not line.startswith('data:'):
+                        continue  # blank separators, SSE comments/keep-alives
+                    data = line[5:].strip()
+                    if data == '[DONE]':
+                        continue  # read to the end so the connection goes back to the pool
+                    try:
+                        event = json.loads(data)
+                    except ValueError as e:
+                        raise ChatError(f"Unreadable stream event: {data[:200]}") from e
+                    if event.get('usage'):
+                        timings['prompt_tokens'] = event['usage'].get('prompt_tokens')
+                        timings['completion_tokens'] = event['usage'].get('completion_tokens')
+                    choices = event.get('choices') or [{}]
+                    piece = (choices[0].get('delta') or {}).get('content')
+                    if piece:
+                        if 'first_token_ms' not in timings:
+                            timings['first_token_ms'] = round((time.perf_counter() - start) * 1000)
+                        timings['chunks'] += 1
+                        yield piece
+        except requests.RequestException as e:
+            raise ChatError(f"Chat request failed: {e}") from e
+        finally:
+            timings['total_ms'] = round((time.perf_counter() - start) * 1000)
+
+    def complete(self, prompt, timings=None):
+        """The whole answer as one string (consumes stream())."""
+        return ''.join(self.stream(prompt, timings))
+
+    def close(self):
+        self.session.close()
+
+
+def main():
+    if len(sys.argv) < 2:
+        print('Usage: python scripts/chat_client.py "question"')
+        sys.exit(1)
+
+    client = OpenAIChatClient()
+    timings = {}
+    try:
+        for piece in client.stream(sys.argv[1], timings):
+            print(piece, end='', flush=True)
+    except ChatError as e:
+        print(f"\n❌ {e}")
+        sys.exit(1)
+    print(f"\n\n⏱️ first token {timings.get('first_token_ms', '-')} ms, "
+          f"total {timings['total_ms']} ms, {timings['chunks']} chunks"
+          + (f", {timings['prompt_tokens']} prompt tokens" if timings.get('prompt_tokens') else ''))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Boundary-aware text chunking.
+
+iter_chunks() is a generator that packs whole sentences into chunks of up
+to CHUNK_SIZE, measured in characters or tokens (CHUNK_UNIT). It prefers
+to end a chunk at a paragraph or page break once the chunk is
+PARAGRAPH_MIN_FILL full, repeats whole trailing sentences (up to
+CHUNK_OVERLAP) at the start of the next chunk except across a page break,
+and only splits a sentence (at whitespace) when it is longer than a chunk
+on its own. Every chunk is an exact slice of the input, returned with its
+character offsets.
+
+Usage:
+  python scripts/chunker.py --benchmark                 # built-in sample text
+  python scripts/chunker.py --benchmark transcript.txt  # MB/s and chunks per MB
+"""
+
+import os
+import re
+import time
+import argparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CHUNK_UNIT = os.getenv('CHUNK_UNIT', 'chars')  # 'chars' or 'tokens'
+CHUNK_SIZE = int(os.getenv('CHUNK_SIZE', '1000' if CHUNK_UNIT == 'chars' else '250'))
+CHUNK_OVERLAP = int(os.getenv('CHUNK_OVERLAP', '200' if CHUNK_UNIT == 'chars' else '50'))
+PARAGRAPH_MIN_FILL = 0.75  # end a chunk at a paragraph/page break once it is this full
+
+# Sentences end at . ! ? (plus closing quotes/brackets, which stay with the
+# sentence) followed by whitespace.
+# Blank lines and PDF page markers (see pdf_extract.page_marker) also end one
+# and start a new paragraph - the marker stays with the page's first sentence.
+# Single line breaks (wrapped PDF lines) do not end a sentence.
+PAGE_MARKER = '--- Page '
+SENTENCE_END = re.compile(r'[.!?]+["\'”’)\]]*(\s+)|\n\s*\n\s*|\n(?=--- Page \d+ ---)')
+
+
+def measure_fn(unit=CHUNK_UNIT):
+    """Size function for a chunk unit: len() for 'chars', estimated tokens for 'tokens'."""
+    if unit == 'chars':
+        return len
+    if unit == 'tokens':
+        from embedding_client import estimate_tokens
+        return estimate_tokens
+    raise ValueError(f"Unknown chunk unit: {unit!r} (expected 'chars' or 'tokens')")
+
+
+def iter_sentences(text):
+    """
+    Yield (char_start, char_end, starts_paragraph) for each sentence,
+    with surrounding whitespace excluded from the span.
+    """
+    pos = len(text) - len(text.lstrip())
+    new_paragraph = True
+    for match in SENTENCE_END.finditer(text, pos):
+        boundary = match.start(1) if match.group(1) is not None else match.start()
+        end = pos + len(text[pos:boundary].rstrip())
+        if end > pos:
+            yield pos, end, new_paragraph
+            new_paragraph = False
+        if match.group().count('\n') >= 2 or text.startswith(PAGE_MARKER, match.end()):
+            new_paragraph = True
+        pos = match.end()
+    if pos < len(text) and text[pos:].strip():
+        yield pos, len(text.rstrip()), new_paragraph
+
+
+def _span_size(text, measure):
+    """size(start, end) of text[start:end]; plain arithmetic for chars, no slicing."""
+    if measure is len:
+        return lambda start, end: end - start
+    return lambda start, end: measure(text[start:end])
+
+
+def _split_long(text, start, end, size, span_size, chars):
+    """Split one over-long sentence at whitespace into pieces of at most `size`."""
+    for piece_start, piece_end in _split_at_whitespace(text, start, end, size, span_size, chars):
+        # A single "word" longer than size (e.g. a URL run) falls back to fixed windows
+        while piece_end - piece_start > 1 and span_size(piece_start, piece_end) > size:
+            step = max(1, (piece_end - piece_start) * size // span_size(piece_start, piece_end))
+            yield piece_start, piece_start + step
+            piece_start += step
+        if piece_start < piece_end:
+            yield piece_start, piece_end
+
+
+def _split_at_whitespace(text, start, end, size, span_size, chars):
+    """Split at whitespace into pieces of at most `size`, except where one word is longer."""
+    piece_start = start
+    if chars:  # cut at the last space that fits, without scanning every space
+        while end - piece_start > size:
+            limit = piece_start + size
+            cut = max(text.rfind(' ', piece_start, limit + 1), text.rfind('\n', piece_start, limit + 1))
+            if cut <= piece_start:
+                break
+            piece_end = cut
+            while text[piece_end - 1].isspace():
+                piece_end -= 1
+            yield piece_start, piece_end
+            piece_start = cut + 1
+            while text[piece_start].isspace():
+                piece_start += 1
+    last_space = None
+    offset = piece_start
+    for match in re.finditer(r'\s+', text[offset:end]):
+        space = offset + match.start()
+        if span_size(piece_start, space) > size and last_space is not None:
+            yield piece_start, last_space[0]
+            piece_start = last_space[1]
+        last_space = (space, offset + match.end())
+    if span_size(piece_start, end) > size and last_space is not None and last_space[1] > piece_start:
+        yield piece_start, last_space[0]
+        piece_start = last_space[1]
+    if piece_start < end:
+        yield piece_start, end
+
+
+def iter_chunks(text, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP, unit=CHUNK_UNIT):
+    """
+    Split text into sentence-aligned, overlapping chunks.
+
+    Args:
+        size: maximum chunk size in `unit`s
+        overlap: how much trailing text (whole sentences) to repeat at the
+            start of the next chunk, in `unit`s
+        unit: 'chars' or 'tokens'
+
+    Yields:
+        (chunk_text, char_start, char_end) with chunk_text == text[char_start:char_end]
+    """
+    if not text or not text.strip():
+        return
+    span_size = _span_size(text, measure_fn(unit))
+
+    window = []  # [(start, end, size)] of the sentences in the current chunk
+    total = 0
+    prev_end = None
+    for start, end, starts_paragraph in iter_sentences(text):
+        if span_size(start, end) <= size:
+            pieces = [(start, end)]
+        else:
+            pieces = list(_split_long(text, start, end, size, span_size, unit == 'chars'))
+
+        for i, (s, e) in enumerate(pieces):
+            # Count the whitespace before a sentence too, so a chunk's slice never exceeds size
+            n = span_size(prev_end if prev_end is not None else s, e)
+            prev_end = e
+            paragraph_break = starts_paragraph and i == 0 and total >= size * PARAGRAPH_MIN_FILL
+            if window and (total + n > size or paragraph_break):
+                yield text[window[0][0]:window[-1][1]], window[0][0], window[-1][1]
+
+                # Keep whole trailing sentences up to `overlap` - never the whole
+                # chunk, and not across a page break (a chunk's page is where it starts)
+                kept = []
+                kept_total = 0
+                carry = window[1:] if not text.startswith(PAGE_MARKER, s) else []
+                for sentence in reversed(carry):
+                    if kept_total + sentence[2] > overlap or kept_total + sentence[2] + n > size:
+                        break
+                    kept.insert(0, sentence)
+                    kept_total += sentence[2]
+                window, total = kept, kept_total
+            window.append((s, e, n))
+            total += n
+
+    if window:
+        yield text[window[0][0]:window[-1][1]], window[0][0], window[-1][1]
+
+
+def chunk_fixed_legacy(text, size=1000, overlap=200):
+    """The previous fixed-window chunker; kept for benchmarks."""
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append((chunk, start, end))
+        prev_start = start
+        start = end - overlap
+        if start >= len(text) or start <= prev_start:
+            break
+    return chunks
+
+
+SAMPLE_TEXT = """Prayer is a fundamental spiritual practice found in many traditions. It serves as a
+means of communication with the divine, whether through spoken words, silent thoughts, or
+meditative practices. "Be still, and know that I am God." Many teachers begin there.
+
+Types of prayer include petitionary prayer, intercessory prayer, thanksgiving and
+contemplative prayer! Each has its own history? Research suggests that prayer can reduce
+stress and foster a sense of community among practitioners.
+
+"""
+
+
+def benchmark(text, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """Print MB/s, chunks per MB and mean chunk length: legacy windows vs sentence-aware chunking."""
+    mb = len(text.encode('utf-8')) / 1e6
+    print(f"⏱️ Benchmark: {mb:.2f} MB of text")
+    runs = [
+        ('fixed-1000', lambda: chunk_fixed_legacy(text)),
+        (f'chars-{size}', lambda: list(iter_chunks(text, size, overlap, 'chars'))),
+    ]
+    try:
+        import tiktoken  # noqa: F401 - without it 'tokens' is just chars / 4
+        runs.append(('tokens-250', lambda: list(iter_chunks(text, 250, 50, 'tokens'))))
+    except ImportError:
+        pass
+
+    print(f"  {'chunker':<12} {'wall':>8} {'MB/s':>8} {'chunks':>8} {'chunks/MB':>10} {'avg chars':>10}")
+    for name, run in runs:
+        start = time.perf_counter()
+        chunks = run()
+        elapsed = time.perf_counter() - start
+        avg = sum(len(c[0]) for c in chunks) / max(1, len(chunks))
+        print(f"  {name:<12} {elapsed:>7.2f}s {mb / elapsed:>8.1f} {len(chunks):>8} "
+              f"{len(chunks) / mb:>10.0f} {avg:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sentence-aware text chunking.")
+    parser.add_argument('path', nargs='?', help="text file to chunk (default: built-in sample)")
+    parser.add_argument('--size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--overlap', type=int, default=CHUNK_OVERLAP)
+    parser.add_argument('--unit', choices=('chars', 'tokens'), default=CHUNK_UNIT)
+    parser.add_argument('--benchmark', action='store_true',
+                        help="throughput and chunks per MB, legacy vs sentence-aware")
+    args = parser.parse_args()
+
+    if args.path:
+        with open(args.path, 'r', encoding='utf-8') as f:
+            text = f.read()
+    else:
+        text = SAMPLE_TEXT * 2000  # ~1 MB
+
+    if args.benchmark:
+        benchmark(text, args.size, args.overlap)
+        return
+
+    for i, (chunk, start, end) in enumerate(iter_chunks(text, args.size, args.overlap, args.unit)):
+        print(f"--- chunk {i} [{start}:{end}] ---\n{chunk}")
+
+
+if __name__ == '__main__':
+    main()
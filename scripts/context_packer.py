@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Assemble retrieved chunks into a prompt context under a token budget.
+
+- Chunks that are consecutive in the same document (by chunk_order) are
+  merged into one passage, and the sentences the chunker repeated between
+  them (CHUNK_OVERLAP) appear only once
+- A passage whose word shingles are mostly contained in a better-ranked
+  passage (e.g. the same text ingested twice) is dropped
+- Passages are added in rank order until CONTEXT_TOKEN_BUDGET is reached;
+  a passage that doesn't fit is cut at a sentence boundary, or skipped if
+  too little room is left
+
+Usage:
+  python scripts/context_packer.py "What is contemplative prayer?"
+  python scripts/context_packer.py --top-k 10 --budget 1500 "question"
+"""
+
+import os
+import re
+import argparse
+from dotenv import load_dotenv
+
+from chat_client import format_passage
+from chunker import iter_chunks
+from embedding_client import estimate_tokens
+
+load_dotenv()
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '3000'))
+DUPLICATE_CONTAINMENT = 0.8  # share of a passage's shingles found in a kept one to count as a repeat
+SHINGLE_WORDS = 5
+MIN_PASSAGE_TOKENS = 100  # don't add a cut-down passage shorter than this
+
+
+def merge_text(first, second):
+    """
+    Join two consecutive chunks, dropping the text `second` repeats from the end of `first`.
+
+    The overlap is the longest suffix of `first`, starting at a word
+    boundary, that `second` begins with.
+    """
+    pos = max(0, len(first) - len(second))
+    while True:
+        pos = first.find(second[:1], pos)
+        if pos == -1:
+            return first + '\n' + second  # no overlap (page break or overlap disabled)
+        if (pos == 0 or first[pos - 1].isspace()) and second.startswith(first[pos:]):
+            return first + second[len(first) - pos:]
+        pos += 1
+
+
+def shingles(text, size=SHINGLE_WORDS):
+    """Set of `size`-word runs (lowercased) used for near-duplicate detection."""
+    words = re.findall(r'\w+', text.lower())
+    if len(words) <= size:
+        return {tuple(words)}
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _label(run):
+    title = run[0]['title']
+    first, last = run[0].get('page_number'), run[-1].get('page_number')
+    if first and last and last != first:
+        return f"{title}, pp. {first}-{last}"
+    if first:
+        return f"{title}, p. {first}"
+    return title
+
+
+def merge_adjacent(results):
+    """
+    Group results into passages of consecutive chunks from the same document.
+
+    Returns:
+        Passage dicts (text, label, doc_id, chunk_ids, rank) ordered by the
+        best rank among their chunks.
+    """
+    ranked = sorted(enumerate(results), key=lambda item: (item[1]['doc_id'], item[1]['chunk_order']))
+    runs = []
+    for rank, r in ranked:
+        previous = runs[-1][-1][1] if runs else None
+        if (previous is not None and previous['doc_id'] == r['doc_id']
+                and r['chunk_order'] == previous['chunk_order'] + 1):
+            runs[-1].append((rank, r))
+        else:
+            runs.append([(rank, r)])
+
+    passages = []
+    for run in runs:
+        chunks = [r for _, r in run]
+        text = chunks[0]['chunk_text']
+        for r in chunks[1:]:
+            text = merge_text(text, r['chunk_text'])
+        passages.append({
+            'text': text,
+            'label': _label(chunks),
+            'doc_id': chunks[0]['doc_id'],
+            'chunk_ids': [r['chunk_id'] for r in chunks],
+            'rank': min(rank for rank, _ in run),
+        })
+    passages.sort(key=lambda p: p['rank'])
+    return passages
+
+
+def pack_context(results, budget=CONTEXT_TOKEN_BUDGET):
+    """
+    Merge, de-duplicate and budget retrieved chunks for the prompt.
+
+    Args:
+        results: retrieved chunk dicts in rank order (doc_id, chunk_order,
+            chunk_id, chunk_text, title, page_number)
+        budget: maximum tokens for the formatted passages
+
+    Returns:
+        (passages, stats) - passages as from merge_adjacent() plus 'tokens',
+        in rank order; stats count chunks, merged chunks, duplicates,
+        truncated and skipped passages, and tokens before/after packing
+    """
+    stats = {
+        'chunks': len(results),
+        'merged': 0,
+        'duplicates': 0,
+        'truncated': 0,
+        'skipped': 0,
+        'input_tokens': sum(estimate_tokens(format_passage(r['chunk_text'], r['title'])) for r in results),
+        'context_tokens': 0,
+    }
+
+    kept_shingles = []
+    packed = []
+    for passage in merge_adjacent(results):
+        stats['merged'] += len(passage['chunk_ids']) - 1
+
+        passage_shingles = shingles(passage['text'])
+        # Only this passage's share counts: a short kept passage must not make a longer one a "duplicate"
+        if any(len(passage_shingles & seen) >= DUPLICATE_CONTAINMENT * len(passage_shingles)
+               for seen in kept_shingles):
+            stats['duplicates'] += 1
+            continue
+
+        tokens = estimate_tokens(format_passage(passage['text'], passage['label']))
+        remaining = budget - stats['context_tokens']
+        if tokens > remaining:
+            room = remaining - estimate_tokens(format_passage('', passage['label']))
+            if room < MIN_PASSAGE_TOKENS:
+                stats['skipped'] += 1
+                continue  # a later, shorter passage may still fit
+            passage['text'] = next(iter_chunks(passage['text'], room, 0, 'tokens'))[0]
+            tokens = estimate_tokens(format_passage(passage['text'], passage['label']))
+            stats['truncated'] += 1
+
+        passage['tokens'] = tokens
+        stats['context_tokens'] += tokens
+        kept_shingles.append(passage_shingles)
+        packed.append(passage)
+
+    stats['passages'] = len(packed)
+    return packed, stats
+
+
+def format_stats(stats):
+    """One-line summary of pack_context() stats."""
+    parts = [f"{stats['passages']} passages from {stats['chunks']} chunks"]
+    if stats['merged']:
+        parts.append(f"{stats['merged']} merged")
+    if stats['duplicates']:
+        parts.append(f"{stats['duplicates']} duplicates dropped")
+    if stats['truncated'] or stats['skipped']:
+        parts.append(f"{stats['truncated']} cut, {stats['skipped']} skipped for budget")
+    parts.append(f"{stats['context_tokens']} of {stats['input_tokens']} tokens")
+    return " · ".join(parts)
+
+
+def main():
+    from retrieval import RetrievalEngine
+
+    parser = argparse.ArgumentParser(description="Show the packed prompt context for a question.")
+    parser.add_argument('query')
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--budget', type=int, default=CONTEXT_TOKEN_BUDGET,
+                        help=f"context token budget (default: CONTEXT_TOKEN_BUDGET or {CONTEXT_TOKEN_BUDGET})")
+    args = parser.parse_args()
+
+    results, _ = RetrievalEngine().hybrid_retrieve(args.query, args.top_k)
+    passages, stats = pack_context(results, args.budget)
+    for p in passages:
+        print(f"--- {p['label']} (chunks {p['chunk_ids']}, {p['tokens']} tokens) ---\n{p['text']}\n")
+    print(f"📦 {format_stats(stats)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Shared SQLite connection and write path.
+
+connect() opens the database in WAL mode, so the app keeps reading while
+an ingest writes, with pragmas tuned for bulk inserts. insert_document()
+and insert_chunks() are the single write path used by ingest.py,
+bulk_ingest.py and add_samples.py: chunks go in with one executemany per
+document, and every statement is a module constant so sqlite3's statement
+cache prepares each one once per connection.
+
+Usage:
+  python scripts/db.py --benchmark            # rows/sec, old vs new write path
+  python scripts/db.py --benchmark --rows 200000 --chunks-per-doc 20
+"""
+
+import os
+import time
+import sqlite3
+import argparse
+import tempfile
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_PATH = os.getenv('DB_PATH', 'pr_chat.db')
+CACHE_SIZE_KB = 64_000  # page cache per connection
+BUSY_TIMEOUT_MS = 10_000  # wait this long for a lock instead of failing
+
+INSERT_DOCUMENT = '''
+    INSERT INTO documents (source_type, source_path, title, content_type, full_text, content_hash)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+INSERT_DOCUMENT_FTS = 'INSERT INTO documents_fts VALUES (?, ?, ?)'
+INSERT_CHUNK = '''
+    INSERT INTO chunks (doc_id, chunk_order, chunk_text, start_time, end_time, page_number)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+
+def connect(db_path=DB_PATH, check_same_thread=True):
+    """
+    Open a connection with WAL journaling and write-friendly pragmas.
+
+    WAL lets readers (the app) run alongside one writer; synchronous=NORMAL
+    is safe in WAL mode (a power loss can drop the last commits, never
+    corrupt the file) and avoids an fsync per commit. Pass
+    check_same_thread=False for a connection shared between threads behind
+    a lock.
+    """
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=check_same_thread)
+    conn.execute('PRAGMA journal_mode=WAL')  # persistent: stored in the database file
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA cache_size=-{CACHE_SIZE_KB}')
+    conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    return conn
+
+
+def insert_document(conn, source_type, source_path, title, content_type, full_text, content_hash=None):
+    """Insert a document and its FTS row. The caller commits. Returns doc_id."""
+    c = conn.execute(INSERT_DOCUMENT, (source_type, source_path, title, content_type, full_text, content_hash))
+    doc_id = c.lastrowid
+    conn.execute(INSERT_DOCUMENT_FTS, (doc_id, title, full_text))
+    return doc_id
+
+
+def find_duplicates(conn, content_hash):
+    """Documents ingested from a file with this hash, as (doc_id, title) rows."""
+    if not content_hash:
+        return []
+    return conn.execute('SELECT doc_id, title FROM documents WHERE content_hash = ? ORDER BY doc_id',
+                        (content_hash,)).fetchall()
+
+
+def delete_document(conn, doc_id):
+    """
+    Delete a document, its FTS row, its chunks and their stored vectors.
+    The caller commits.
+
+    The chunks_fts triggers drop the chunk index rows. The deleted chunk_ids
+    are noted in deleted_chunks so the next build_embeddings.py run removes
+    their vectors from the FAISS index.
+    """
+    conn.execute('''
+        INSERT OR IGNORE INTO deleted_chunks (chunk_id)
+        SELECT chunk_id FROM chunk_embeddings WHERE chunk_id IN (SELECT chunk_id FROM chunks WHERE doc_id = ?)
+    ''', (doc_id,))
+    conn.execute('DELETE FROM chunk_embeddings WHERE chunk_id IN (SELECT chunk_id FROM chunks WHERE doc_id = ?)',
+                 (doc_id,))
+    conn.execute('DELETE FROM chunks WHERE doc_id = ?', (doc_id,))
+    conn.execute('DELETE FROM documents_fts WHERE doc_id = ?', (doc_id,))
+    conn.execute('DELETE FROM documents WHERE doc_id = ?', (doc_id,))
+
+
+def insert_chunks(conn, doc_id, chunks):
+    """
+    Insert a document's chunks in one executemany.
+
+    Args:
+        chunks: (chunk_order, chunk_text, start_time, end_time, page_number)
+            tuples
+    """
+    conn.executemany(INSERT_CHUNK, ((doc_id,) + tuple(chunk) for chunk in chunks))
+
+
+def benchmark(rows=50_000, chunks_per_doc=200):
+    """Print rows/sec for the old per-row loop vs the executemany + WAL path."""
+    from setup_db import setup_database
+
+    text = "In the beginning was the Word, and the Word was with God. " * 16  # ~1000 chars
+    n_docs = max(1, rows // chunks_per_doc)
+    print(f"⏱️ Benchmark: {n_docs * chunks_per_doc} chunks in {n_docs} documents")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ('per-row', 'executemany'):
+            path = os.path.join(tmp, f'{name}.db')
+            setup_database(quiet=True, db_path=path)
+            if name == 'per-row':
+                conn = sqlite3.connect(path)
+                conn.execute('PRAGMA journal_mode=DELETE')  # the defaults ingest used before
+            else:
+                conn = connect(path)
+
+            start = time.perf_counter()
+            for d in range(n_docs):
+                chunks = [(i, text, None, None, None) for i in range(chunks_per_doc)]
+                doc_id = insert_document(conn, 'text', 'benchmark', f'Doc {d}', 'text', text)
+                if name == 'per-row':
+                    c = conn.cursor()
+                    for chunk in chunks:
+                        c.execute(INSERT_CHUNK, (doc_id,) + chunk)
+                else:
+                    insert_chunks(conn, doc_id, chunks)
+                conn.commit()  # one commit per document, as ingest does
+            elapsed = time.perf_counter() - start
+            conn.close()
+            results.append((name, elapsed))
+
+    total = n_docs * chunks_per_doc
+    print(f"  {'path':<12} {'wall':>8} {'rows/sec':>10}")
+    for name, elapsed in results:
+        print(f"  {name:<12} {elapsed:>7.2f}s {total / elapsed:>10.0f}")
+    print(f"  Speedup: {results[0][1] / results[1][1]:.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite write path utilities.")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="compare chunk insert rows/sec, per-row vs executemany + WAL")
+    parser.add_argument('--rows', type=int, default=50_000, help="chunks to insert in the benchmark")
+    parser.add_argument('--chunks-per-doc', type=int, default=200,
+                        help="chunks per document (one commit per document)")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.rows, args.chunks_per_doc)
+    else:
+        parser.print_usage()
+
+
+if __name__ == '__main__':
+    main()
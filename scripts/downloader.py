@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Resumable, cached HTTP downloads.
+
+- Streams every response to a .part file and renames it when complete, so
+  a large MP3 is never held in memory and a failed download never leaves a
+  truncated file under the final name
+- Resumes an interrupted download with a Range request (guarded by
+  If-Range, so a file that changed on the server is fetched again whole);
+  a 416 for a .part that already holds the whole file just finishes it
+- Remembers each file's ETag/Last-Modified in a small sidecar JSON file
+  and revalidates with a conditional GET; a 304 skips the download
+- Saves each URL under its own subdirectory (a hash of the URL), so two
+  URLs ending in the same file name don't overwrite each other
+- Shares one pooled requests.Session, and download_many() fetches several
+  URLs at once up to DOWNLOAD_WORKERS
+
+Usage:
+  python scripts/downloader.py https://example.com/a.mp3 https://example.com/b.mp3
+  python scripts/downloader.py --workers 8 --dest data/uploads $(cat urls.txt)
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from urllib.parse import urlparse, unquote
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+load_dotenv()
+
+UPLOADS_DIR = os.getenv('UPLOADS_DIR', 'data/uploads')
+DOWNLOAD_WORKERS = int(os.getenv('DOWNLOAD_WORKERS', '4'))
+# (connect, read) - the read timeout applies between received bytes, not to the whole file
+DOWNLOAD_TIMEOUT = (float(os.getenv('DOWNLOAD_CONNECT_TIMEOUT', '10')),
+                    float(os.getenv('DOWNLOAD_READ_TIMEOUT', '60')))
+STREAM_CHUNK_BYTES = 1 << 20
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Process-wide session with a connection pool sized for DOWNLOAD_WORKERS."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            retries = Retry(connect=3, read=0, backoff_factor=0.5)
+            adapter = HTTPAdapter(pool_connections=DOWNLOAD_WORKERS, pool_maxsize=DOWNLOAD_WORKERS,
+                                  max_retries=retries)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+        return _session
+
+
+def dest_path(url, dest_dir=UPLOADS_DIR):
+    """dest_dir/<url hash>/<file name> - keeps the file name (used as the title) readable."""
+    filename = unquote(urlparse(url).path.split('/')[-1]) or 'downloaded_file'
+    url_key = hashlib.sha1(url.encode()).hexdigest()[:12]
+    return os.path.join(dest_dir, url_key, filename)
+
+
+def _meta_path(path):
+    return path + '.http.json'
+
+
+def read_meta(path):
+    try:
+        with open(_meta_path(path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_meta(path, meta):
+    with open(_meta_path(path), 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+
+def download(url, dest_dir=UPLOADS_DIR, session=None, progress=False):
+    """
+    Download url into dest_dir, resuming or revalidating as possible.
+
+    Returns:
+        (path, status, bytes_received) - status is 'downloaded', 'resumed'
+        or 'unchanged'. Raises requests.RequestException / OSError on failure
+        (a partial .part file is kept for the next attempt).
+    """
+    session = session or get_session()
+    path = dest_path(url, dest_dir)
+    part = path + '.part'
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+    meta = read_meta(path)
+    validator = meta.get('etag') or meta.get('last_modified')
+    headers = {}
+    offset = 0
+    if os.path.exists(path) and meta.get('complete'):
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+    elif os.path.exists(part) and validator:
+        offset = os.path.getsize(part)
+        headers['Range'] = f'bytes={offset}-'
+        headers['If-Range'] = validator
+
+    with session.get(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+        if response.status_code == 304:
+            return path, 'unchanged', 0
+        if response.status_code == 416 and offset:
+            # Nothing left past the .part's end: complete if the server's size matches, else start over
+            total = re.fullmatch(r'bytes \*/(\d+)', response.headers.get('Content-Range', '').strip())
+            if total and int(total.group(1)) == offset:
+                _finish(path, part)
+                return path, 'resumed', 0
+            os.remove(part)
+            return download(url, dest_dir, session, progress)
+        response.raise_for_status()
+
+        resumed = response.status_code == 206
+        if resumed and not response.headers.get('Content-Range', '').startswith(f'bytes {offset}-'):
+            os.remove(part)  # not the range we asked for; start over
+            return download(url, dest_dir, session, progress)
+        if not resumed:
+            offset = 0
+        write_meta(path, {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'complete': False,
+        })
+
+        remaining = int(response.headers.get('Content-Length', 0)) or None
+        received = 0
+        bar = None
+        if progress:
+            from tqdm import tqdm
+            bar = tqdm(total=(offset + remaining) if remaining else None, initial=offset,
+                       unit='B', unit_scale=True)
+        try:
+            with open(part, 'ab' if resumed else 'wb') as f:
+                for chunk in response.iter_content(chunk_size=STREAM_CHUNK_BYTES):
+                    f.write(chunk)
+                    received += len(chunk)
+                    if bar:
+                        bar.update(len(chunk))
+        finally:
+            if bar:
+                bar.close()
+
+    _finish(path, part)
+    return path, 'resumed' if resumed else 'downloaded', received
+
+
+def _finish(path, part):
+    """Move a complete .part file into place and mark it complete in its metadata."""
+    os.replace(part, path)
+    meta = read_meta(path)
+    meta.update(complete=True, size=os.path.getsize(path))
+    write_meta(path, meta)
+
+
+def download_many(urls, dest_dir=UPLOADS_DIR, workers=DOWNLOAD_WORKERS):
+    """
+    Download several URLs at once, at most `workers` at a time.
+
+    Returns:
+        List of (url, path or None, status, bytes_received) in input order;
+        status is 'failed: <error>' for a download that raised.
+    """
+    session = get_session()
+
+    def fetch(url):
+        try:
+            return (url,) + download(url, dest_dir, session)
+        except (requests.RequestException, OSError) as e:
+            return url, None, f"failed: {e}", 0
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fetch, urls))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download URLs with resume and conditional GET caching.")
+    parser.add_argument('urls', nargs='+')
+    parser.add_argument('--dest', default=UPLOADS_DIR, help=f"destination directory (default: {UPLOADS_DIR})")
+    parser.add_argument('--workers', type=int, default=DOWNLOAD_WORKERS,
+                        help=f"concurrent downloads (default: DOWNLOAD_WORKERS or {DOWNLOAD_WORKERS})")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = download_many(args.urls, args.dest, args.workers)
+    elapsed = time.perf_counter() - start
+
+    total_bytes = 0
+    for url, path, status, received in results:
+        total_bytes += received
+        mark = '❌' if path is None else '✓'
+        print(f"{mark} {status:<10} {url}" + (f" -> {path}" if path else ''))
+    print(f"\n{len(results)} URLs, {total_bytes / 1e6:.1f} MB in {elapsed:.1f}s "
+          f"({total_bytes / 1e6 / elapsed if elapsed else 0:.1f} MB/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+"""
+Persistent on-disk embedding cache keyed by (model, normalized text hash).
+
+Lives in its own SQLite file (EMBEDDING_CACHE_PATH) so it survives a reset
+of the main database. Identical text - repeated boilerplate, duplicate
+chunks, re-ingested documents - is embedded once per model. The cache is
+bounded by EMBEDDING_CACHE_MAX_MB and evicts least recently used entries.
+"""
+
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EMBEDDING_CACHE_PATH = os.getenv('EMBEDDING_CACHE_PATH', 'data/embedding_cache.db')
+EMBEDDING_CACHE_MAX_MB = float(os.getenv('EMBEDDING_CACHE_MAX_MB', '1024'))
+
+EVICT_TO_FRACTION = 0.9  # evict down to 90% of the limit to avoid evicting on every put
+
+
+def normalize_text(text):
+    """Unicode-normalize and collapse whitespace so trivially different copies share a key."""
+    return ' '.join(unicodedata.normalize('NFKC', text).split())
+
+
+def normalized_hash(text):
+    """Cache key component for a text."""
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite-backed, size-bounded LRU cache of embedding vectors."""
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH, max_mb=EMBEDDING_CACHE_MAX_MB):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT,
+                text_hash TEXT,
+                vector BLOB,  -- float32 bytes
+                nbytes INTEGER,
+                last_used REAL,
+                PRIMARY KEY (model, text_hash)
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)')
+        self.conn.commit()
+        # Running size estimate: put_many() adds to it and only a crossing of
+        # max_bytes pays for an exact SUM (which also counts other processes' writes)
+        self._approx_bytes = self._total_bytes()
+
+    def get_many(self, model, hashes):
+        """
+        Look up vectors by text hash.
+
+        Returns:
+            {text_hash: float32 vector} for the hashes that were cached.
+        """
+        import numpy as np
+
+        unique = list(dict.fromkeys(hashes))
+        found = {}
+        with self._lock:
+            for i in range(0, len(unique), 500):
+                part = unique[i:i + 500]
+                placeholders = ', '.join('?' * len(part))
+                rows = self.conn.execute(f'''
+                    SELECT text_hash, vector FROM embeddings
+                    WHERE model = ? AND text_hash IN ({placeholders})
+                ''', [model] + part).fetchall()
+                for h, blob in rows:
+                    found[h] = np.frombuffer(blob, dtype='float32')
+
+            if found:
+                now = time.time()
+                self.conn.executemany(
+                    'UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?',
+                    [(now, model, h) for h in found])
+                self.conn.commit()
+
+            self.hits += sum(1 for h in hashes if h in found)
+            self.misses += sum(1 for h in hashes if h not in found)
+        return found
+
+    def put_many(self, model, hashes, vecs):
+        """Store vectors and evict old entries if the cache is over its size limit."""
+        now = time.time()
+        rows = []
+        for h, vec in zip(hashes, vecs):
+            blob = vec.astype('float32').tobytes()
+            rows.append((model, h, blob, len(blob), now))
+        with self._lock:
+            self.conn.executemany('''
+                INSERT OR REPLACE INTO embeddings (model, text_hash, vector, nbytes, last_used)
+                VALUES (?, ?, ?, ?, ?)
+            ''', rows)
+            self.conn.commit()
+            self._approx_bytes += sum(row[3] for row in rows)
+            if self._approx_bytes > self.max_bytes:
+                self._evict()
+
+    def _total_bytes(self):
+        return self.conn.execute('SELECT COALESCE(SUM(nbytes), 0) FROM embeddings').fetchone()[0]
+
+    def _evict(self):
+        total = self._total_bytes()
+        self._approx_bytes = total
+        if total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * EVICT_TO_FRACTION)
+        excess = total - target
+        freed = 0
+        evict = []
+        for model, h, nbytes in self.conn.execute(
+                'SELECT model, text_hash, nbytes FROM embeddings ORDER BY last_used'):
+            if freed >= excess:
+                break
+            evict.append((model, h))
+            freed += nbytes
+        self.conn.executemany('DELETE FROM embeddings WHERE model = ? AND text_hash = ?', evict)
+        self.conn.commit()
+        self._approx_bytes = total - freed
+
+    def stats(self):
+        """Hit/miss counters for this process plus the cache's current size."""
+        with self._lock:
+            entries, nbytes = self.conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM embeddings').fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': entries,
+            'bytes': nbytes,
+        }
+
+    def format_stats(self):
+        s = self.stats()
+        return (f"🗃️ Embedding cache: {s['hits']} hits, {s['misses']} misses "
+                f"({s['hit_rate']:.0%} hit rate), {s['entries']} entries, {s['bytes'] / 1e6:.1f} MB")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache():
+    """Process-wide cache instance."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache()
+        return _cache
+
+
+def cached_embed(texts, model, embed_fn, cache=None):
+    """
+    Embed texts through the cache.
+
+    Duplicate texts within the call and texts already cached for `model`
+    are not sent to embed_fn; only the unique misses are.
+
+    Args:
+        texts: list of strings
+        model: embedding model name (part of the cache key)
+        embed_fn: callable(list of texts) -> float32 matrix
+        cache: EmbeddingCache (default: the process-wide cache)
+
+    Returns:
+        float32 matrix with one row per text, in input order.
+    """
+    import numpy as np
+
+    cache = cache or get_embedding_cache()
+    hashes = [normalized_hash(t) for t in texts]
+    vectors = cache.get_many(model, hashes)
+
+    missing = {}
+    for text, h in zip(texts, hashes):
+        if h not in vectors and h not in missing:
+            missing[h] = text
+    if missing:
+        new_vecs = np.asarray(embed_fn(list(missing.values())), dtype='float32')
+        cache.put_many(model, list(missing), new_vecs)
+        vectors.update(zip(missing, new_vecs))
+
+    if not texts:
+        return np.zeros((0, 0), dtype='float32')
+    return np.vstack([vectors[h] for h in hashes])
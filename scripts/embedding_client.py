@@ -0,0 +1,231 @@
+"""
+Concurrent, token-aware client for the OpenAI embeddings endpoint.
+
+- Batches are packed by an estimated token budget rather than a fixed count
+- Batches are sent concurrently over one pooled keep-alive session
+- x-ratelimit-* and Retry-After headers pause every worker until the limit resets
+- 429s, 5xx responses and connection errors are retried with jittered backoff
+- Output order always matches input order
+
+The endpoint comes from OPENAI_BASE_URL, so the client can be pointed at a
+local stub server.
+"""
+
+import os
+import re
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL', 'https://api.openai.com/v1')
+EMBEDDING_WORKERS = int(os.getenv('EMBEDDING_WORKERS', '4'))
+EMBEDDING_BATCH_TOKENS = int(os.getenv('EMBEDDING_BATCH_TOKENS', '50000'))
+
+MAX_BATCH_INPUTS = 2048  # API limit on inputs per request
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class EmbeddingError(Exception):
+    """Raised when a batch cannot be embedded after all retries."""
+
+
+_tiktoken_encoding = None
+
+
+def _encoding(tiktoken):
+    global _tiktoken_encoding
+    if _tiktoken_encoding is None:
+        _tiktoken_encoding = tiktoken.get_encoding('cl100k_base')
+    return _tiktoken_encoding
+
+
+def estimate_tokens(text):
+    """Token count via tiktoken when installed, otherwise ~4 chars per token."""
+    try:
+        import tiktoken
+    except ImportError:
+        return len(text) // 4 + 1
+    return len(_encoding(tiktoken).encode(text, disallowed_special=()))
+
+
+def batch_by_tokens(texts, max_tokens=EMBEDDING_BATCH_TOKENS, max_inputs=MAX_BATCH_INPUTS):
+    """
+    Group texts into batches under a token budget.
+
+    Returns:
+        List of (start, end, tokens) - index ranges into texts with their
+        estimated token totals.
+    """
+    batches = []
+    start = 0
+    tokens = 0
+    for i, text in enumerate(texts):
+        n = estimate_tokens(text)
+        if i > start and (tokens + n > max_tokens or i - start >= max_inputs):
+            batches.append((start, i, tokens))
+            start, tokens = i, 0
+        tokens += n
+    if start < len(texts):
+        batches.append((start, len(texts), tokens))
+    return batches
+
+
+def parse_reset(value):
+    """Parse durations like '1s', '6m0s', '20ms' or '0.5' into seconds."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    seconds = 0.0
+    for amount, unit in re.findall(r'([\d.]+)(ms|h|m|s)', value):
+        seconds += float(amount) * {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}[unit]
+    return seconds
+
+
+class RateLimiter:
+    """Shared pause gate driven by the API's rate-limit headers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._resume_at = 0.0
+
+    def wait(self):
+        while True:
+            with self._lock:
+                delay = self._resume_at - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def pause(self, seconds):
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+    def update(self, headers, next_tokens=0):
+        """Pause until reset when the remaining request/token budget runs out."""
+        remaining_requests = headers.get('x-ratelimit-remaining-requests')
+        remaining_tokens = headers.get('x-ratelimit-remaining-tokens')
+        if remaining_requests is not None and int(remaining_requests) <= 0:
+            self.pause(parse_reset(headers.get('x-ratelimit-reset-requests')) or 1.0)
+        if remaining_tokens is not None and int(remaining_tokens) < next_tokens:
+            self.pause(parse_reset(headers.get('x-ratelimit-reset-tokens')) or 1.0)
+
+
+class OpenAIEmbeddingClient:
+    """
+    Pooled, concurrent embeddings client.
+
+    Args:
+        model: embedding model name
+        api_key: API key (default OPENAI_API_KEY)
+        base_url: API root (default OPENAI_BASE_URL)
+        max_workers: concurrent requests
+        max_batch_tokens: estimated tokens per request
+        max_retries: retries per batch before giving up
+        timeout: (connect, read) timeout in seconds
+    """
+
+    def __init__(self, model, api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL,
+                 max_workers=EMBEDDING_WORKERS, max_batch_tokens=EMBEDDING_BATCH_TOKENS,
+                 max_retries=6, backoff_base=0.5, backoff_max=30.0, timeout=(10, 120)):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.model = model
+        self.url = base_url.rstrip('/') + '/embeddings'
+        self.max_workers = max_workers
+        self.max_batch_tokens = max_batch_tokens
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.rate_limiter = RateLimiter()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        })
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='embed')
+
+    def _backoff(self, attempt, retry_after=None):
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retry_after:
+            delay = max(delay, retry_after)
+        return delay
+
+    def _post_batch(self, batch, tokens):
+        """Embed one batch, retrying transient failures."""
+        import requests
+
+        payload = {"model": self.model, "input": [t or ' ' for t in batch]}
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.wait()
+            try:
+                r = self.session.post(self.url, json=payload, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise EmbeddingError(f"Embedding request failed: {e}") from e
+                time.sleep(self._backoff(attempt))
+                continue
+
+            if r.status_code == 200:
+                self.rate_limiter.update(r.headers, next_tokens=tokens)
+                data = sorted(r.json()['data'], key=lambda item: item['index'])
+                return [item['embedding'] for item in data]
+
+            if r.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                raise EmbeddingError(f"Embedding request failed ({r.status_code}): {r.text[:500]}")
+
+            retry_after = parse_reset(r.headers.get('retry-after'))
+            if retry_after is None and r.status_code == 429:
+                resets = [parse_reset(r.headers.get(h)) for h in
+                          ('x-ratelimit-reset-requests', 'x-ratelimit-reset-tokens')]
+                resets = [v for v in resets if v]
+                retry_after = min(resets) if resets else None
+            delay = self._backoff(attempt, retry_after)
+            self.rate_limiter.pause(delay)  # every worker backs off, not just this one
+            time.sleep(delay)
+
+    def embed(self, texts, progress=None):
+        """
+        Embed texts concurrently.
+
+        Args:
+            texts: list of strings
+            progress: optional callable(n_texts_done) invoked per batch
+
+        Returns:
+            float32 matrix with one row per text, in input order.
+        """
+        import numpy as np
+
+        if not texts:
+            return np.zeros((0, 0), dtype='float32')
+
+        ranges = batch_by_tokens(texts, self.max_batch_tokens)
+        futures = [
+            self._executor.submit(self._post_batch, texts[start:end], tokens)
+            for start, end, tokens in ranges
+        ]
+
+        results = []
+        for (start, end, _), future in zip(ranges, futures):
+            results.extend(future.result())
+            if progress:
+                progress(end - start)
+        return np.asarray(results, dtype='float32')
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.session.close()
@@ -11,17 +11,19 @@ Handles:
 
 import os
 import sys
-import sqlite3
+import time
+import bisect
+import hashlib
 import json
 import tempfile
 from pathlib import Path
-from urllib.parse import urlparse
 from datetime import datetime
 from dotenv import load_dotenv
 
-# Third-party imports
-import requests
-from tqdm import tqdm
+from chunker import iter_chunks
+from downloader import download
+from db import connect, insert_document, insert_chunks, find_duplicates, delete_document
+from setup_db import setup_database
 
 load_dotenv()
 
@@ -30,8 +32,8 @@ UPLOADS_DIR = os.getenv('UPLOADS_DIR', 'data/uploads')
 TRANSCRIPTS_DIR = os.getenv('TRANSCRIPTS_DIR', 'data/transcripts')
 LOCAL_WHISPER_MODEL = os.getenv('LOCAL_WHISPER_MODEL', 'base')
 
-CHUNK_SIZE = 1000  # characters per chunk
-CHUNK_OVERLAP = 200
+# What to do when a file's hash matches an ingested document
+DUPLICATE_POLICIES = ('skip', 'replace', 'force')
 
 
 def ensure_dirs():
@@ -40,27 +42,34 @@ def ensure_dirs():
         Path(d).mkdir(parents=True, exist_ok=True)
 
 
-def extract_pdf_text(pdf_path):
-    """Extract text from PDF file."""
+def extract_pdf_text(pdf_path, workers=None):
+    """
+    Extract text from PDF file, pages in parallel (see pdf_extract.py).
+    
+    Args:
+        workers: extraction processes (default PDF_WORKERS; 1 = sequential)
+    
+    Returns:
+        {'text', 'page_spans': [(char_start, char_end, page_number)]},
+        or None on failure
+    """
     try:
-        from PyPDF2 import PdfReader
+        from pdf_extract import PDF_WORKERS, extract_pages, join_pages
         
         print(f"  📄 Extracting text from PDF...")
-        text = ""
-        reader = PdfReader(pdf_path)
-        print(f"    Pages to extract: {len(reader.pages)}")
-        for page_num, page in enumerate(reader.pages):
-            if page_num % 10 == 0:
-                print(f"    Extracting page {page_num}...")
-            text += f"\n--- Page {page_num + 1} ---\n"
-            text += page.extract_text()
+        start = time.perf_counter()
+        workers = workers or PDF_WORKERS
+        pages = extract_pages(pdf_path, workers)
+        text, page_spans = join_pages(pages)
+        elapsed = time.perf_counter() - start
         
-        print(f"    Extraction complete: {len(text)} characters")
-        if not text.strip():
+        print(f"    Extraction complete: {len(pages)} pages, {len(text)} characters "
+              f"in {elapsed:.1f}s ({len(pages) / max(elapsed, 1e-6):.1f} pages/sec, up to {workers} workers)")
+        if not any(page.strip() for page in pages):
             print("  ⚠️ PDF has no extractable text (may be image-based)")
             return None
         
-        return text
+        return {'text': text, 'page_spans': page_spans}
     except Exception as e:
         print(f"  ❌ PDF extraction error: {e}")
         import traceback
@@ -68,87 +77,232 @@ def extract_pdf_text(pdf_path):
         return None
 
 
-def transcribe_with_whisper(audio_path):
-    """Transcribe MP3 with local Whisper."""
-    try:
+_whisper_model = None
+
+
+def get_whisper_model():
+    """Load the Whisper model once per process and reuse it for every file."""
+    global _whisper_model
+    if _whisper_model is None:
         import whisper
         
-        print(f"  🎙️ Transcribing with Whisper ({LOCAL_WHISPER_MODEL} model)...")
-        model = whisper.load_model(LOCAL_WHISPER_MODEL)
-        result = model.transcribe(audio_path)
-        text = result["text"]
+        print(f"  🧠 Loading Whisper {LOCAL_WHISPER_MODEL} model...")
+        _whisper_model = whisper.load_model(LOCAL_WHISPER_MODEL)
+    return _whisper_model
+
+
+def transcribe_with_whisper(audio_path, parallel=True):
+    """
+    Transcribe MP3 with local Whisper.
+    
+    Recordings longer than PARALLEL_TRANSCRIBE_MIN_SECONDS are split at
+    silences and transcribed across processes (see parallel_transcribe.py)
+    unless parallel is False.
+    
+    Returns:
+        {'text', 'segments': [{'start', 'end', 'text'}]} with times in
+        seconds, or None on failure
+    """
+    try:
+        from parallel_transcribe import (
+            TRANSCRIBE_WORKERS, PARALLEL_MIN_SECONDS, audio_duration, transcribe_parallel,
+        )
+        
+        duration = audio_duration(audio_path) if parallel else None
+        if TRANSCRIBE_WORKERS > 1 and duration and duration >= PARALLEL_MIN_SECONDS:
+            print(f"  🎙️ Transcribing {duration:.0f}s with Whisper ({LOCAL_WHISPER_MODEL} model, "
+                  f"{TRANSCRIBE_WORKERS} processes)...")
+            result = transcribe_parallel(audio_path)
+        else:
+            model = get_whisper_model()
+            print(f"  🎙️ Transcribing with Whisper ({LOCAL_WHISPER_MODEL} model)...")
+            result = model.transcribe(audio_path)
+        segments = [
+            {'start': seg['start'], 'end': seg['end'], 'text': seg['text'].strip()}
+            for seg in result["segments"] if seg['text'].strip()
+        ]
+        text = ' '.join(seg['text'] for seg in segments) if segments else result["text"].strip()
         
         if not text.strip():
             print("  ⚠️ Whisper returned empty transcription")
             return None
         
-        return text
+        return {'text': text, 'segments': segments}
     except Exception as e:
         print(f"  ❌ Whisper transcription error: {e}")
         return None
 
 
 def download_file(url, dest_dir):
-    """Download file from URL."""
+    """Download file from URL (streamed, resumable, skipped if unchanged - see downloader.py)."""
     try:
         print(f"  ⬇️ Downloading from {url}...")
         
-        filename = urlparse(url).path.split('/')[-1]
-        if not filename:
-            filename = "downloaded_file"
-        
-        dest_path = os.path.join(dest_dir, filename)
+        dest_path, status, received = download(url, dest_dir, progress=True)
         
-        response = requests.get(url, timeout=30, stream=True)
-        response.raise_for_status()
-        
-        total_size = int(response.headers.get('content-length', 0))
-        
-        with open(dest_path, 'wb') as f:
-            if total_size > 0:
-                with tqdm(total=total_size, unit='B', unit_scale=True) as pbar:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                        pbar.update(len(chunk))
-            else:
-                f.write(response.content)
-        
-        print(f"  ✓ Downloaded: {dest_path}")
+        if status == 'unchanged':
+            print(f"  ✓ Not modified since last download: {dest_path}")
+        else:
+            print(f"  ✓ Downloaded ({status}, {received / 1e6:.1f} MB): {dest_path}")
         return dest_path
     except Exception as e:
         print(f"  ❌ Download error: {e}")
         return None
 
 
-def chunk_text(text, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
-    """Split text into overlapping chunks."""
-    print(f"    chunk_text called with {len(text)} characters")
-    if not text or len(text.strip()) < 50:
-        return [text]
+def file_sha256(path, block_size=1 << 20):
+    """Hash a file in blocks (MP3s can be hundreds of MB)."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def save_transcript(title, source, text, segments=None):
+    """Write a transcript JSON file (with segment timestamps) to TRANSCRIPTS_DIR."""
+    transcript_path = os.path.join(TRANSCRIPTS_DIR, f"{title}.json")
+    with open(transcript_path, 'w') as f:
+        json.dump({
+            'title': title,
+            'source': source,
+            'transcript': text,
+            'segments': segments or [],
+            'timestamp': datetime.now().isoformat()
+        }, f, indent=2)
     
-    chunks = []
-    start = 0
-    L = len(text)
+    print(f"  ✓ Transcript saved: {transcript_path}")
+    return transcript_path
+
+
+def segment_spans(segments):
+    """
+    Character spans of Whisper segments within ' '.join(segment texts).
     
-    while start < L:
-        end = min(start + size, L)
-        chunk = text[start:end].strip()
-        if chunk:
-            chunks.append(chunk)
+    Returns:
+        List of (char_start, char_end, start_time, end_time)
+    """
+    spans = []
+    pos = 0
+    for seg in segments:
+        spans.append((pos, pos + len(seg['text']), seg['start'], seg['end']))
+        pos += len(seg['text']) + 1
+    return spans
+
+
+def chunk_times(char_start, char_end, spans):
+    """(start_time, end_time) of the segments a chunk overlaps, or (None, None)."""
+    if not spans:
+        return None, None
+    first = bisect.bisect_right([span[1] for span in spans], char_start)
+    last = bisect.bisect_left([span[0] for span in spans], char_end) - 1
+    if first >= len(spans) or last < first:
+        return None, None
+    return spans[first][2], spans[last][3]
+
+
+def chunk_page(char_start, page_spans):
+    """Number of the PDF page a chunk starts on, or None."""
+    if not page_spans:
+        return None
+    i = bisect.bisect_right([span[0] for span in page_spans], char_start) - 1
+    return page_spans[max(i, 0)][2]
+
+
+def extract_document(file_path, title=None, parallel=True):
+    """
+    Extract (or transcribe) a local file and chunk it - the CPU-bound part of ingest.
+    
+    Args:
+        file_path: local MP3 or PDF
+        title: document title (default: file name)
+        parallel: let a single file use several processes; bulk ingest
+            turns this off because it already runs one file per process
+    
+    Returns:
+        {'content_type', 'title', 'full_text', 'chunks'} where chunks are
+        (chunk_order, chunk_text, start_time, end_time, page_number)
+        tuples, or None on failure
+    """
+    segments = []
+    page_spans = []
+    
+    # Determine file type and process accordingly
+    if file_path.lower().endswith('.mp3'):
+        content_type = 'mp3'
+        print(f"\n🎵 Processing MP3: {file_path}")
         
-        # Move forward: if we're at the end or close to it, break
-        prev_start = start
-        start = end - overlap
+        transcript = transcribe_with_whisper(file_path, parallel=parallel)
+        if not transcript:
+            print("  ❌ Failed to transcribe MP3")
+            return None
+        full_text = transcript['text']
+        segments = transcript['segments']
+        
+        # Save transcript
+        if title is None:
+            title = Path(file_path).stem
         
-        # Prevent infinite loop: ensure we always make progress
-        if start >= L or start <= prev_start:
-            break
+        save_transcript(title, file_path, full_text, segments)
     
-    print(f"    chunk_text returning {len(chunks)} chunks")
-    return chunks
+    elif file_path.lower().endswith('.pdf'):
+        content_type = 'pdf'
+        print(f"\n📄 Processing PDF: {file_path}")
+        
+        extracted = extract_pdf_text(file_path, workers=None if parallel else 1)
+        if not extracted:
+            print("  ❌ Failed to extract PDF text")
+            return None
+        full_text = extracted['text']
+        page_spans = extracted['page_spans']
+        
+        if title is None:
+            title = Path(file_path).stem
+    
+    else:
+        print(f"  ❌ Unsupported file type: {file_path}")
+        return None
+    
+    print(f"  📦 Chunking text...")
+    spans = segment_spans(segments)
+    chunks = []
+    for i, (chunk, char_start, char_end) in enumerate(iter_chunks(full_text)):
+        start_time, end_time = chunk_times(char_start, char_end, spans)
+        chunks.append((i, chunk, start_time, end_time, chunk_page(char_start, page_spans)))
+    
+    return {'content_type': content_type, 'title': title, 'full_text': full_text, 'chunks': chunks}
 
 
-def ingest_file(file_path, source_type='upload', title=None):
+def write_document(conn, source_type, source_path, doc, content_hash=None, replace_ids=(), quiet=False):
+    """
+    Insert an extracted document, its FTS row and its chunks (see db.py). The caller commits.
+    
+    Args:
+        content_hash: sha256 of the source file
+        replace_ids: doc_ids of duplicates to delete in the same transaction
+    
+    Returns:
+        The new doc_id.
+    """
+    log = (lambda *a: None) if quiet else print
+    
+    for old_id in replace_ids:
+        log(f"  🗑️ Replacing document {old_id}")
+        delete_document(conn, old_id)
+    
+    log(f"  💾 Inserting into database...")
+    doc_id = insert_document(conn, source_type, source_path, doc['title'],
+                             doc['content_type'], doc['full_text'], content_hash)
+    log(f"  ✓ Document {doc_id} and FTS row inserted")
+    
+    chunks = doc['chunks']
+    log(f"  📦 Inserting {len(chunks)} chunks...")
+    insert_chunks(conn, doc_id, chunks)
+    
+    return doc_id
+
+
+def ingest_file(file_path, source_type='upload', title=None, on_duplicate='skip'):
     """
     Ingest a single file or URL into the knowledge base.
     
@@ -156,98 +310,38 @@ def ingest_file(file_path, source_type='upload', title=None):
         file_path: Local file path, URL, or text content
         source_type: 'upload', 'url', or 'text'
         title: Optional title for the document
+        on_duplicate: if the file was already ingested (same sha256):
+            'skip' it, 'replace' the old document, or 'force' a second copy
     """
     ensure_dirs()
+    setup_database(quiet=True)  # adds newer tables/triggers (e.g. chunks_fts) to old DBs
     
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    
-    content_type = None
-    full_text = None
-    actual_path = file_path
+    # Handle URL input
+    if source_type == 'url':
+        file_path = download_file(file_path, UPLOADS_DIR)
+        if not file_path:
+            return False
+        source_type = 'upload'
     
+    conn = connect(DB_PATH)
     try:
-        # Handle URL input
-        if source_type == 'url':
-            file_path = download_file(file_path, UPLOADS_DIR)
-            if not file_path:
-                return False
-            actual_path = file_path
-            source_type = 'upload'
+        # Check for duplicates before transcribing/extracting: a hash is far cheaper
+        content_hash = file_sha256(file_path)
+        duplicates = find_duplicates(conn, content_hash) if on_duplicate != 'force' else []
+        if duplicates and on_duplicate == 'skip':
+            doc_id, existing_title = duplicates[0]
+            print(f"⏭️ Already ingested as document {doc_id} ({existing_title}); skipping")
+            return True
         
-        # Determine file type and process accordingly
-        if file_path.lower().endswith('.mp3'):
-            content_type = 'mp3'
-            print(f"\n🎵 Processing MP3: {file_path}")
-            
-            full_text = transcribe_with_whisper(file_path)
-            if not full_text:
-                print("  ❌ Failed to transcribe MP3")
-                return False
-            
-            # Save transcript
-            if title is None:
-                title = Path(file_path).stem
-            
-            transcript_path = os.path.join(TRANSCRIPTS_DIR, f"{title}.json")
-            with open(transcript_path, 'w') as f:
-                json.dump({
-                    'title': title,
-                    'source': file_path,
-                    'transcript': full_text,
-                    'timestamp': datetime.now().isoformat()
-                }, f, indent=2)
-            
-            print(f"  ✓ Transcript saved: {transcript_path}")
-        
-        elif file_path.lower().endswith('.pdf'):
-            content_type = 'pdf'
-            print(f"\n📄 Processing PDF: {file_path}")
-            
-            full_text = extract_pdf_text(file_path)
-            if not full_text:
-                print("  ❌ Failed to extract PDF text")
-                return False
-            
-            if title is None:
-                title = Path(file_path).stem
-        
-        else:
-            print(f"  ❌ Unsupported file type: {file_path}")
+        doc = extract_document(file_path, title)
+        if not doc:
             return False
         
-        # Insert document
-        print(f"  💾 Inserting into database...")
-        c.execute('''
-            INSERT INTO documents (source_type, source_path, title, content_type, full_text)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (source_type, actual_path, title, content_type, full_text))
-        
-        doc_id = c.lastrowid
-        print(f"  ✓ Document inserted with ID {doc_id}")
-        
-        # Insert into FTS table
-        print(f"  📇 Inserting into FTS...")
-        c.execute('INSERT INTO documents_fts VALUES (?, ?, ?)',
-                  (doc_id, title, full_text))
-        print(f"  ✓ FTS indexed")
-        
-        # Create and insert chunks
-        print(f"  📦 Chunking text...")
-        chunks = chunk_text(full_text)
-        print(f"  📦 Creating {len(chunks)} chunks...")
-        
-        for i, chunk in enumerate(chunks):
-            if i % 50 == 0:
-                print(f"    Inserting chunk {i}/{len(chunks)}...")
-            c.execute('''
-                INSERT INTO chunks (doc_id, chunk_order, chunk_text)
-                VALUES (?, ?, ?)
-            ''', (doc_id, i, chunk))
-        
+        write_document(conn, source_type, file_path, doc, content_hash,
+                       replace_ids=[doc_id for doc_id, _ in duplicates])
         print(f"  💾 Committing...")
         conn.commit()
-        print(f"✓ Successfully ingested: {title} ({len(chunks)} chunks)")
+        print(f"✓ Successfully ingested: {doc['title']} ({len(doc['chunks'])} chunks)")
         
         return True
     
@@ -263,16 +357,19 @@ def ingest_file(file_path, source_type='upload', title=None):
 def main():
     """Main entry point."""
     if len(sys.argv) < 2:
-        print("Usage: python scripts/ingest.py <file_path|url> [--title TITLE] [--type upload|url|text]")
+        print("Usage: python scripts/ingest.py <file_path|url> [--title TITLE] [--type upload|url|text] "
+              "[--on-duplicate skip|replace|force]")
         print("\nExample:")
         print("  python scripts/ingest.py data/uploads/sermon.mp3")
         print("  python scripts/ingest.py https://example.com/file.mp3 --type url")
         print("  python scripts/ingest.py data/file.pdf --title 'My Document'")
+        print("  python scripts/ingest.py data/file.pdf --on-duplicate replace")
         return
     
     source = sys.argv[1]
     title = None
     source_type = 'upload'
+    on_duplicate = 'skip'
     
     # Parse arguments
     for i in range(2, len(sys.argv)):
@@ -280,8 +377,14 @@ def main():
             title = sys.argv[i + 1]
         elif sys.argv[i] == '--type' and i + 1 < len(sys.argv):
             source_type = sys.argv[i + 1]
+        elif sys.argv[i] == '--on-duplicate' and i + 1 < len(sys.argv):
+            on_duplicate = sys.argv[i + 1]
+    
+    if on_duplicate not in DUPLICATE_POLICIES:
+        print(f"❌ --on-duplicate must be one of: {', '.join(DUPLICATE_POLICIES)}")
+        sys.exit(1)
     
-    success = ingest_file(source, source_type=source_type, title=title)
+    success = ingest_file(source, source_type=source_type, title=title, on_duplicate=on_duplicate)
     sys.exit(0 if success else 1)
 
 
@@ -0,0 +1,550 @@
+#!/usr/bin/env python3
+"""
+SQLite-backed ingest job queue and its worker process.
+
+The app enqueues an upload or URL and returns at once with a job ID; a
+separate worker process claims queued jobs and runs them one at a time
+through ingest_file() on a TranscriptionWorker, so the Whisper model is
+loaded by the first audio job and reused by every later one. With
+--isolate (JOB_ISOLATION=subprocess) each job runs as
+`python scripts/ingest.py ...` instead (argument list, no shell), at most
+JOB_CONCURRENCY at a time, and the job records its exit status and
+stderr. While a job runs, its progress lines are stored on the job row so
+the app can show them. A failed job is retried
+up to JOB_MAX_ATTEMPTS times with exponential backoff (JOB_RETRY_SECONDS,
+then twice that, ...). Whenever the queue goes idle after jobs finished,
+the worker updates the embedding index with an incremental
+build_embeddings.py run.
+
+Only one worker runs at a time (it holds a lock on JOB_WORKER_PID_FILE);
+jobs left 'running' by a worker that died are requeued when the next one
+starts.
+
+Usage:
+  python scripts/ingest_jobs.py worker                    # run jobs until stopped
+  python scripts/ingest_jobs.py worker --idle-exit 300    # stop after 5 idle minutes
+  python scripts/ingest_jobs.py worker --isolate --concurrency 2   # one process per job
+  python scripts/ingest_jobs.py add data/uploads/talk.mp3 --title "Sunday talk"
+  python scripts/ingest_jobs.py add https://example.com/talk.mp3 --type url
+  python scripts/ingest_jobs.py list
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+import subprocess
+from collections import deque
+from pathlib import Path
+from dotenv import load_dotenv
+
+from db import connect
+from setup_db import setup_database
+
+load_dotenv()
+
+DB_PATH = os.getenv('DB_PATH', 'pr_chat.db')
+JOB_ISOLATION = os.getenv('JOB_ISOLATION', 'thread')  # 'thread' (shared model) or 'subprocess'
+JOB_CONCURRENCY = int(os.getenv('JOB_CONCURRENCY', '1'))  # subprocess jobs at once; raise for PDFs
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+JOB_RETRY_SECONDS = float(os.getenv('JOB_RETRY_SECONDS', '30'))
+JOB_WORKER_PID_FILE = os.getenv('JOB_WORKER_PID_FILE', 'data/ingest_worker.pid')
+POLL_SECONDS = 1.0
+LOG_TAIL_LINES = 40
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+# Rough share of a job done when ingest.py prints a line starting with this
+STAGE_PROGRESS = (
+    ('⬇️', 0.05),
+    ('🎵', 0.1),
+    ('📄', 0.1),
+    ('🧠', 0.15),
+    ('🎙️', 0.2),
+    ('📦 Chunking', 0.7),
+    ('✓ Transcript saved', 0.75),
+    ('💾', 0.8),
+    ('📦 Inserting', 0.85),
+    ('✓ Successfully', 0.9),
+    ('⏭️', 0.9),
+)
+
+
+# ---- Queue ----------------------------------------------------------------
+
+def enqueue(conn, source, source_type='upload', title=None, max_attempts=JOB_MAX_ATTEMPTS):
+    """Queue a file path or URL for ingest. Returns job_id."""
+    now = time.time()
+    c = conn.execute('''
+        INSERT INTO ingest_jobs (source, source_type, title, status, stage, max_attempts,
+                                 next_attempt_at, created_at)
+        VALUES (?, ?, ?, 'queued', 'Waiting for worker', ?, ?, ?)
+    ''', (source, source_type, title, max_attempts, now, now))
+    conn.commit()
+    return c.lastrowid
+
+
+def claim_next(conn):
+    """Atomically move the oldest due job to 'running'. Returns its row dict or None."""
+    now = time.time()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        row = conn.execute('''
+            SELECT job_id, source, source_type, title, attempts FROM ingest_jobs
+            WHERE status = 'queued' AND next_attempt_at <= ?
+            ORDER BY next_attempt_at, job_id LIMIT 1
+        ''', (now,)).fetchone()
+        if row is None:
+            conn.commit()
+            return None
+        conn.execute('''
+            UPDATE ingest_jobs SET status = 'running', attempts = attempts + 1, progress = 0,
+                                   stage = 'Starting', error = NULL, started_at = ?
+            WHERE job_id = ?
+        ''', (now, row[0]))
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return {'job_id': row[0], 'source': row[1], 'source_type': row[2], 'title': row[3],
+            'attempt': row[4] + 1}
+
+
+def set_progress(conn, job_id, stage, progress=None):
+    if progress is None:
+        conn.execute('UPDATE ingest_jobs SET stage = ? WHERE job_id = ?', (stage, job_id))
+    else:
+        conn.execute('UPDATE ingest_jobs SET stage = ?, progress = MAX(progress, ?) WHERE job_id = ?',
+                     (stage, progress, job_id))
+    conn.commit()
+
+
+def finish_attempt(conn, job_id, ok, log_tail, error=None, exit_code=None, stderr=None):
+    """
+    Record the end of an attempt: 'indexing' on success, otherwise back to
+    'queued' with backoff, or 'failed' once max_attempts is used up.
+
+    Returns:
+        The job's new status.
+    """
+    now = time.time()
+    conn.execute('UPDATE ingest_jobs SET exit_code = ?, stderr = ? WHERE job_id = ?', (exit_code, stderr, job_id))
+    attempts, max_attempts = conn.execute(
+        'SELECT attempts, max_attempts FROM ingest_jobs WHERE job_id = ?', (job_id,)).fetchone()
+    if ok:
+        status = 'indexing'
+        conn.execute('''
+            UPDATE ingest_jobs SET status = ?, progress = 0.95, stage = 'Waiting to update the search index',
+                                   log = ? WHERE job_id = ?
+        ''', (status, log_tail, job_id))
+    elif attempts < (max_attempts or 1):
+        status = 'queued'
+        delay = JOB_RETRY_SECONDS * 2 ** (attempts - 1)
+        conn.execute('''
+            UPDATE ingest_jobs SET status = ?, progress = 0, error = ?, log = ?, next_attempt_at = ?,
+                                   stage = ? WHERE job_id = ?
+        ''', (status, error, log_tail, now + delay,
+              f"Attempt {attempts} failed; retrying in {delay:.0f}s", job_id))
+    else:
+        status = 'failed'
+        conn.execute('''
+            UPDATE ingest_jobs SET status = ?, error = ?, log = ?, finished_at = ?,
+                                   stage = ? WHERE job_id = ?
+        ''', (status, error, log_tail, now, f"Failed after {attempts} attempts", job_id))
+    conn.commit()
+    return status
+
+
+def list_jobs(conn, limit=20):
+    """Most recent jobs first, as dicts."""
+    columns = ('job_id', 'source', 'source_type', 'title', 'status', 'progress', 'stage',
+               'attempts', 'max_attempts', 'error', 'created_at', 'started_at', 'finished_at')
+    rows = conn.execute(f'''
+        SELECT {', '.join(columns)} FROM ingest_jobs ORDER BY job_id DESC LIMIT ?
+    ''', (limit,)).fetchall()
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def pending_count(conn):
+    """Jobs not yet done or failed."""
+    return conn.execute("SELECT COUNT(*) FROM ingest_jobs WHERE status IN ('queued', 'running', 'indexing')"
+                        ).fetchone()[0]
+
+
+# ---- Worker process -------------------------------------------------------
+
+_started_workers = []  # Popen handles of workers started by this process
+
+
+def _lock_pid_file(pid_file):
+    """Take an exclusive lock on pid_file. Returns the open file, or None if another process holds it."""
+    Path(pid_file).parent.mkdir(parents=True, exist_ok=True)
+    f = open(pid_file, 'a+')
+    try:
+        import fcntl
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except ImportError:
+        pass  # no flock (Windows): see worker_running()
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+def worker_running(pid_file=JOB_WORKER_PID_FILE):
+    """True while a worker holds the lock on pid_file (released when it exits, even if it crashed)."""
+    for proc in list(_started_workers):
+        if proc.poll() is not None:  # reap workers we started that have exited
+            _started_workers.remove(proc)
+    try:
+        import fcntl  # noqa: F401
+    except ImportError:
+        return bool(_started_workers)  # no flock (Windows): only workers we started are known
+    if not os.path.exists(pid_file):
+        return False
+    lock = _lock_pid_file(pid_file)
+    if lock is None:
+        return True
+    lock.close()
+    return False
+
+
+def start_worker(idle_exit=300, pid_file=JOB_WORKER_PID_FILE):
+    """
+    Launch a detached worker unless one is already running.
+
+    Returns:
+        True if a new worker process was started.
+    """
+    if worker_running(pid_file):
+        return False
+    Path(pid_file).parent.mkdir(parents=True, exist_ok=True)
+    with open(Path(pid_file).with_suffix('.log'), 'ab') as log:
+        _started_workers.append(subprocess.Popen(
+            [sys.executable, str(SCRIPTS_DIR / 'ingest_jobs.py'), 'worker', '--idle-exit', str(idle_exit)],
+            stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, start_new_session=True,
+        ))
+    return True
+
+
+def _stage_progress(line):
+    for prefix, progress in STAGE_PROGRESS:
+        if line.startswith(prefix):
+            return progress
+    return None
+
+
+def _error_line(lines, fallback):
+    """The first '❌' line of a job's output (without the emoji), else `fallback`."""
+    errors = [line for line in lines if line.startswith('❌')]
+    return errors[0].lstrip('❌ ') if errors else fallback
+
+
+class RoutedStdout:
+    """
+    sys.stdout replacement that hands the output of registered threads to a
+    callback (and still echoes it), so in-process jobs can report progress.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.sinks = {}  # thread ident -> callable(text)
+
+    def write(self, text):
+        sink = self.sinks.get(threading.get_ident())
+        if sink is not None:
+            sink(text)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class InProcessJob:
+    """
+    A job run by ingest_file() on the worker's TranscriptionWorker thread.
+
+    Its progress lines are kept in memory and written to the job row by the
+    worker's main loop (report()); writing them from the ingest thread would
+    wait on the ingest's own open transaction.
+    """
+
+    def __init__(self, job, transcriber, stdout):
+        self.job = job
+        self.tail = deque(maxlen=LOG_TAIL_LINES)
+        self.stage = None
+        self.progress = None
+        self._reported = None
+        self._partial = ''
+        self._stdout = stdout
+        self._thread_id = transcriber.thread_id
+        stdout.sinks[self._thread_id] = self._write
+        self.future = transcriber.submit(job['source'], job['title'], job['source_type'])
+
+    def _write(self, text):
+        lines = (self._partial + text).split('\n')
+        self._partial = lines.pop()
+        for line in lines:
+            line = line.strip()
+            if line:
+                self.tail.append(line)
+                self.stage = line[:200]
+                self.progress = _stage_progress(line) or self.progress
+
+    def report(self, conn):
+        """Write the latest progress line to the job row if it changed."""
+        stage, progress = self.stage, self.progress
+        if stage is None or (stage, progress) == self._reported:
+            return
+        try:
+            set_progress(conn, self.job['job_id'], stage, progress)
+            self._reported = (stage, progress)
+        except sqlite3.OperationalError:
+            conn.rollback()  # the ingest is holding the write lock; try again on the next poll
+
+    def done(self):
+        return self.future.done()
+
+    def result(self):
+        """(ok, log_tail, error, exit_code, stderr) once the job has finished."""
+        self._stdout.sinks.pop(self._thread_id, None)
+        try:
+            ok = self.future.result()['ok']
+            error = None if ok else _error_line(self.tail, 'ingest failed')
+        except Exception as e:
+            ok, error = False, f"{type(e).__name__}: {e}"
+        return ok, '\n'.join(self.tail), error, None, None
+
+
+class SubprocessJob:
+    """
+    One ingest.py subprocess; reader threads forward its stdout to the job
+    row and keep the tail of its stderr.
+    """
+
+    def __init__(self, job, db_path):
+        self.job = job
+        self.tail = deque(maxlen=LOG_TAIL_LINES)
+        self.stderr_tail = deque(maxlen=LOG_TAIL_LINES)
+        args = [sys.executable, str(SCRIPTS_DIR / 'ingest.py'), job['source'], '--type', job['source_type']]
+        if job['title']:
+            args += ['--title', job['title']]
+        env = dict(os.environ, PYTHONUNBUFFERED='1')
+        self.proc = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                     stdin=subprocess.DEVNULL, env=env, text=True, encoding='utf-8',
+                                     errors='replace')
+        self.readers = [
+            threading.Thread(target=self._read, args=(db_path,), daemon=True),
+            threading.Thread(target=self._read_stderr, daemon=True),
+        ]
+        for reader in self.readers:
+            reader.start()
+
+    def _read(self, db_path):
+        conn = connect(db_path)
+        try:
+            for line in self.proc.stdout:
+                line = line.strip()
+                if not line:
+                    continue
+                self.tail.append(line)
+                set_progress(conn, self.job['job_id'], line[:200], _stage_progress(line))
+        finally:
+            conn.close()
+
+    def _read_stderr(self):
+        for line in self.proc.stderr:
+            if line.strip():
+                self.stderr_tail.append(line.rstrip())
+
+    def done(self):
+        return self.proc.poll() is not None
+
+    def result(self):
+        """(ok, log_tail, error, exit_code, stderr) once the process has exited."""
+        for reader in self.readers:
+            reader.join()
+        code = self.proc.returncode
+        stderr = '\n'.join(self.stderr_tail) or None
+        if code == 0:
+            return True, '\n'.join(self.tail), None, code, stderr
+        fallback = self.stderr_tail[-1] if self.stderr_tail else f"exit code {code}"
+        return False, '\n'.join(self.tail), _error_line(self.tail, fallback), code, stderr
+
+
+class Worker:
+    """
+    Claims and runs queued jobs and updates the embedding index whenever the
+    queue drains.
+
+    By default jobs run one at a time in this process on a
+    TranscriptionWorker, which keeps the Whisper model loaded between them;
+    with isolate=True each job is an ingest.py subprocess, at most
+    `concurrency` at once.
+    """
+
+    def __init__(self, db_path=DB_PATH, concurrency=JOB_CONCURRENCY, isolate=JOB_ISOLATION == 'subprocess'):
+        self.db_path = db_path
+        self.isolate = isolate
+        self.concurrency = max(1, concurrency) if isolate else 1  # one Whisper model, one job
+        self.conn = connect(db_path)
+        self.running = {}  # job_id -> InProcessJob / SubprocessJob
+        self.transcriber = None
+        self.stdout = None
+
+    def recover(self):
+        """
+        Requeue jobs a dead worker left running (the attempt still counts);
+        a job that has used all its attempts - e.g. one that keeps crashing
+        the worker - is marked failed instead.
+        """
+        failed = self.conn.execute('''
+            UPDATE ingest_jobs SET status = 'failed', finished_at = ?,
+                                   error = 'Worker stopped during the last attempt',
+                                   stage = 'Failed after ' || attempts || ' attempts'
+            WHERE status = 'running' AND attempts >= max_attempts
+        ''', (time.time(),)).rowcount
+        n = self.conn.execute('''
+            UPDATE ingest_jobs SET status = 'queued', stage = 'Requeued after worker restart'
+            WHERE status = 'running'
+        ''').rowcount
+        self.conn.commit()
+        if n:
+            print(f"↩️ Requeued {n} interrupted jobs")
+        if failed:
+            print(f"❌ {failed} interrupted jobs had no attempts left")
+
+    def _start_job(self, job):
+        if self.isolate:
+            return SubprocessJob(job, self.db_path)
+        if self.transcriber is None:
+            from transcribe_worker import TranscriptionWorker
+
+            self.stdout = RoutedStdout(sys.stdout)
+            sys.stdout = self.stdout
+            self.transcriber = TranscriptionWorker(ingest=True, preload=False)
+        return InProcessJob(job, self.transcriber, self.stdout)
+
+    def _start_jobs(self):
+        while len(self.running) < self.concurrency:
+            job = claim_next(self.conn)
+            if job is None:
+                return
+            print(f"▶️ Job {job['job_id']} (attempt {job['attempt']}): {job['source']}")
+            try:
+                self.running[job['job_id']] = self._start_job(job)
+            except OSError as e:
+                finish_attempt(self.conn, job['job_id'], False, '', f"Could not start ingest: {e}")
+
+    def _reap_jobs(self):
+        for job_id, job in list(self.running.items()):
+            if not job.done():
+                if isinstance(job, InProcessJob):
+                    job.report(self.conn)
+                continue
+            del self.running[job_id]
+            ok, log_tail, error, exit_code, stderr = job.result()
+            status = finish_attempt(self.conn, job_id, ok, log_tail, error, exit_code, stderr)
+            print(f"{'✓' if ok else '❌'} Job {job_id}: {status}" + (f" - {error}" if error else ''))
+
+    def _update_index(self):
+        """Run an incremental embedding build for the jobs waiting on it, then mark them done."""
+        job_ids = [row[0] for row in self.conn.execute("SELECT job_id FROM ingest_jobs WHERE status = 'indexing'")]
+        if not job_ids:
+            return
+        placeholders = ', '.join('?' * len(job_ids))
+        self.conn.execute(f"UPDATE ingest_jobs SET stage = 'Updating the search index' WHERE job_id IN ({placeholders})",
+                          job_ids)
+        self.conn.commit()
+
+        print(f"🧠 Updating embeddings for {len(job_ids)} finished jobs...")
+        proc = subprocess.run([sys.executable, str(SCRIPTS_DIR / 'build_embeddings.py')],
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+                              text=True, encoding='utf-8', errors='replace')
+        if proc.returncode == 0:
+            stage, error = 'Done', None
+        else:
+            # The documents are in and keyword-searchable; only the vector index is behind
+            lines = [line for line in proc.stdout.splitlines() if line.strip()]
+            stage, error = 'Done (search index update failed)', lines[-1] if lines else f"exit code {proc.returncode}"
+            print(f"  ❌ build_embeddings.py failed: {error}")
+        self.conn.execute(f'''
+            UPDATE ingest_jobs SET status = 'done', progress = 1, stage = ?, error = ?, finished_at = ?
+            WHERE job_id IN ({placeholders})
+        ''', [stage, error, time.time()] + job_ids)
+        self.conn.commit()
+
+    def run(self, idle_exit=0):
+        """Process jobs until stopped, or until idle for `idle_exit` seconds (0 = never)."""
+        self.recover()
+        mode = f"one process per job, concurrency {self.concurrency}" if self.isolate else "in-process"
+        print(f"👷 Ingest worker {os.getpid()} started ({mode})")
+        idle_since = time.time()
+        while True:
+            self._reap_jobs()
+            self._start_jobs()
+            if not self.running:
+                self._update_index()  # queue drained: index everything that finished
+                if idle_exit and pending_count(self.conn) == 0 and time.time() - idle_since > idle_exit:
+                    print("💤 Idle; worker exiting")
+                    if self.transcriber is not None:
+                        self.transcriber.close()
+                    return
+            else:
+                idle_since = time.time()
+            time.sleep(POLL_SECONDS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest job queue and worker.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    worker_cmd = commands.add_parser('worker', help="run queued jobs")
+    worker_cmd.add_argument('--isolate', action='store_true', default=JOB_ISOLATION == 'subprocess',
+                            help="run each job as an ingest.py subprocess (default: in-process, "
+                                 "keeping the Whisper model loaded; JOB_ISOLATION=subprocess)")
+    worker_cmd.add_argument('--concurrency', type=int, default=JOB_CONCURRENCY,
+                            help=f"subprocess jobs at once with --isolate (default: JOB_CONCURRENCY or {JOB_CONCURRENCY})")
+    worker_cmd.add_argument('--idle-exit', type=float, default=0,
+                            help="exit after this many idle seconds (default: run until stopped)")
+
+    add_cmd = commands.add_parser('add', help="queue a file or URL")
+    add_cmd.add_argument('source')
+    add_cmd.add_argument('--type', choices=('upload', 'url'), default='upload')
+    add_cmd.add_argument('--title')
+
+    commands.add_parser('list', help="show recent jobs")
+    args = parser.parse_args()
+
+    setup_database(quiet=True)
+
+    if args.command == 'worker':
+        lock = _lock_pid_file(JOB_WORKER_PID_FILE)
+        if lock is None:
+            print("Another ingest worker is already running.")
+            return
+        lock.seek(0)
+        lock.truncate()
+        lock.write(str(os.getpid()))
+        lock.flush()
+        Worker(DB_PATH, args.concurrency, args.isolate).run(args.idle_exit)
+        return
+
+    conn = connect(DB_PATH)
+    if args.command == 'add':
+        job_id = enqueue(conn, args.source, args.type, args.title)
+        print(f"✓ Queued job {job_id}" + ("" if worker_running() else
+                                          " (no worker running: python scripts/ingest_jobs.py worker)"))
+    else:
+        for job in list_jobs(conn):
+            print(f"  #{job['job_id']:<5} {job['status']:<9} {job['progress'] * 100:>4.0f}%  "
+                  f"{job['title'] or os.path.basename(job['source'])}  - {job['stage'] or ''}")
+
+
+if __name__ == '__main__':
+    main()
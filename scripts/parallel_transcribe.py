@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Parallel transcription of long audio.
+
+A single model.transcribe() call runs on one file sequentially. For long
+recordings this module instead:
+
+1. Decodes the audio once with pydub (mono, 16 kHz - what Whisper expects)
+2. Cuts it into ~TRANSCRIBE_SEGMENT_SECONDS segments, placing each cut in
+   the quietest stretch near the target so no word is split
+3. Transcribes the segments in a process pool; each worker process loads
+   the Whisper model once and keeps it for every segment it is given
+4. Stitches the text back together and shifts each segment's timestamps
+   by its offset so they are global to the recording
+
+Usage:
+  python scripts/parallel_transcribe.py sermon.mp3
+  python scripts/parallel_transcribe.py sermon.mp3 --benchmark   # vs one call
+"""
+
+import os
+import time
+import argparse
+import threading
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LOCAL_WHISPER_MODEL = os.getenv('LOCAL_WHISPER_MODEL', 'base')
+TRANSCRIBE_WORKERS = int(os.getenv('TRANSCRIBE_WORKERS', str(max(1, (os.cpu_count() or 1) // 4))))
+TRANSCRIBE_SEGMENT_SECONDS = int(os.getenv('TRANSCRIBE_SEGMENT_SECONDS', '300'))
+PARALLEL_MIN_SECONDS = int(os.getenv('PARALLEL_TRANSCRIBE_MIN_SECONDS', '600'))
+
+SAMPLE_RATE = 16000  # Whisper's input rate
+SILENCE_SEARCH_MS = 30_000  # look this far either side of a target cut for silence
+MIN_SILENCE_MS = 500
+SILENCE_MARGIN_DB = 16  # "silence" = this far below the recording's average loudness
+
+
+def audio_duration(path):
+    """Length of an audio file in seconds (via ffprobe), or None if unknown."""
+    try:
+        out = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'csv=p=0', path],
+            capture_output=True, text=True, timeout=30,
+        ).stdout.strip()
+        return float(out)
+    except (OSError, ValueError, subprocess.TimeoutExpired):
+        return None
+
+
+def find_cut_points(audio, segment_ms):
+    """
+    Millisecond offsets at which to cut `audio` into ~segment_ms pieces.
+
+    Only the window around each target cut is scanned for silence (a full
+    scan of an hour of audio is slow); the cut goes in the middle of the
+    longest silent stretch, or at the target if the window has none.
+    """
+    from pydub.silence import detect_silence
+
+    silence_thresh = audio.dBFS - SILENCE_MARGIN_DB
+    cuts = [0]
+    target = segment_ms
+    while target < len(audio) - segment_ms // 4:  # don't leave a tiny last segment
+        lo = max(cuts[-1] + segment_ms // 2, target - SILENCE_SEARCH_MS)
+        hi = min(len(audio), target + SILENCE_SEARCH_MS)
+        silences = detect_silence(audio[lo:hi], min_silence_len=MIN_SILENCE_MS,
+                                  silence_thresh=silence_thresh, seek_step=10)
+        if silences:
+            start, end = max(silences, key=lambda s: s[1] - s[0])
+            cut = lo + (start + end) // 2
+        else:
+            cut = target
+        cuts.append(cut)
+        target = cut + segment_ms
+    return cuts
+
+
+def split_audio(audio_path, segment_seconds=TRANSCRIBE_SEGMENT_SECONDS):
+    """
+    Decode audio and split it at silences.
+
+    Returns:
+        (segments, duration) - segments is a list of (offset_seconds,
+        float32 samples at 16 kHz); duration is in seconds.
+    """
+    import numpy as np
+    from pydub import AudioSegment
+
+    audio = AudioSegment.from_file(audio_path).set_channels(1).set_frame_rate(SAMPLE_RATE)
+    audio = audio.set_sample_width(2)
+    cuts = find_cut_points(audio, segment_seconds * 1000) + [len(audio)]
+
+    samples = np.frombuffer(audio.raw_data, dtype=np.int16).astype(np.float32) / 32768.0
+    segments = []
+    for start_ms, end_ms in zip(cuts, cuts[1:]):
+        start, end = start_ms * SAMPLE_RATE // 1000, end_ms * SAMPLE_RATE // 1000
+        segments.append((start_ms / 1000, samples[start:end]))
+    return segments, len(audio) / 1000
+
+
+# Worker-process state: the model is loaded once per process by _init_worker
+_worker_model = None
+
+
+def _init_worker(model_name, threads):
+    global _worker_model
+    import torch
+    import whisper
+
+    torch.set_num_threads(threads)  # share the cores between workers instead of oversubscribing
+    _worker_model = whisper.load_model(model_name)
+
+
+def _transcribe_segment(offset, samples):
+    result = _worker_model.transcribe(samples, fp16=False)
+    return [
+        {'start': seg['start'] + offset, 'end': seg['end'] + offset, 'text': seg['text'].strip()}
+        for seg in result['segments']
+    ]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(workers=TRANSCRIBE_WORKERS, model_name=LOCAL_WHISPER_MODEL):
+    """Shared process pool, kept alive so later files reuse the loaded models."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            # spawn, not fork: forking a process that already holds torch threads can deadlock
+            _pool = ProcessPoolExecutor(max_workers=workers,
+                                        mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=_init_worker,
+                                        initargs=(model_name, threads))
+        return _pool
+
+
+def transcribe_parallel(audio_path, segment_seconds=TRANSCRIBE_SEGMENT_SECONDS, workers=TRANSCRIBE_WORKERS):
+    """
+    Transcribe audio by segments across a process pool.
+
+    Returns:
+        {'text', 'segments': [{'start', 'end', 'text'}] with global
+        timestamps in seconds, 'duration'}
+    """
+    segments, duration = split_audio(audio_path, segment_seconds)
+    print(f"  ✂️ Split {duration:.0f}s of audio into {len(segments)} segments "
+          f"across {min(workers, len(segments))} workers")
+
+    pool = get_pool(workers)
+    futures = [pool.submit(_transcribe_segment, offset, samples) for offset, samples in segments]
+    stitched = []
+    for future in futures:
+        stitched.extend(future.result())
+    return {
+        'text': ' '.join(seg['text'] for seg in stitched if seg['text']),
+        'segments': stitched,
+        'duration': duration,
+    }
+
+
+def warm_up_pool(workers=TRANSCRIBE_WORKERS):
+    """Start every worker process (loading its model) before timing anything."""
+    pool = get_pool(workers)
+    for future in [pool.submit(time.sleep, 0.5) for _ in range(workers)]:
+        future.result()
+
+
+def transcribe_single(audio_path, model):
+    """The sequential path: one model.transcribe() call over the whole file."""
+    result = model.transcribe(audio_path, fp16=False)
+    return {
+        'text': result['text'].strip(),
+        'segments': [{'start': s['start'], 'end': s['end'], 'text': s['text'].strip()}
+                     for s in result['segments']],
+        'duration': audio_duration(audio_path),
+    }
+
+
+def benchmark(audio_path, workers=TRANSCRIBE_WORKERS, segment_seconds=TRANSCRIBE_SEGMENT_SECONDS):
+    """
+    Print wall-clock time of the single-call path vs the parallel path.
+    Model loading is excluded from both timings.
+    """
+    import whisper
+
+    duration = audio_duration(audio_path) or 0
+    print(f"⏱️ Benchmark: {audio_path} ({duration:.0f}s of audio, {LOCAL_WHISPER_MODEL} model, "
+          f"{os.cpu_count()} cores)")
+
+    print("  Single call...")
+    model = whisper.load_model(LOCAL_WHISPER_MODEL)
+    start = time.perf_counter()
+    single = transcribe_single(audio_path, model)
+    single_s = time.perf_counter() - start
+    del model
+
+    print(f"  Parallel ({workers} workers)...")
+    warm_up_pool(workers)
+    start = time.perf_counter()
+    parallel = transcribe_parallel(audio_path, segment_seconds, workers)
+    parallel_s = time.perf_counter() - start
+
+    print(f"\n  {'path':<10} {'wall':>9} {'x realtime':>11} {'words':>7}")
+    for name, secs, result in (('single', single_s, single), ('parallel', parallel_s, parallel)):
+        speed = duration / secs if secs else 0
+        print(f"  {name:<10} {secs:>8.1f}s {speed:>10.1f}x {len(result['text'].split()):>7}")
+    print(f"  Speedup: {single_s / parallel_s:.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe long audio in parallel segments.")
+    parser.add_argument('audio_path')
+    parser.add_argument('--workers', type=int, default=TRANSCRIBE_WORKERS,
+                        help=f"worker processes (default: TRANSCRIBE_WORKERS or {TRANSCRIBE_WORKERS})")
+    parser.add_argument('--segment-seconds', type=int, default=TRANSCRIBE_SEGMENT_SECONDS,
+                        help="target segment length (cuts snap to nearby silence)")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="compare wall-clock time against a single transcribe() call")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.audio_path, args.workers, args.segment_seconds)
+        return
+
+    start = time.perf_counter()
+    result = transcribe_parallel(args.audio_path, args.segment_seconds, args.workers)
+    elapsed = time.perf_counter() - start
+    for seg in result['segments']:
+        print(f"[{seg['start']:8.1f} → {seg['end']:8.1f}] {seg['text']}")
+    print(f"\n✓ {result['duration']:.0f}s of audio in {elapsed:.1f}s "
+          f"({result['duration'] / elapsed:.1f}x realtime)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+"""
+Resident retrieval engine for semantic search.
+
+Keeps the query encoder and the FAISS index in memory so a query only pays
+for encoding and the vector search. FAISS vector IDs are chunk_ids, so hits
+are resolved against the chunks/documents tables by primary key. The index
+is reloaded automatically when its file changes on disk (e.g. after running
+build_embeddings.py), and the encoder follows the model recorded for it in
+index_meta.
+
+Usage:
+  python scripts/retrieval.py "what is forgiveness" [--runs N] [--hybrid]
+
+Prints cold (first query, including loading) and warm query latency.
+With --hybrid, the keyword+vector hybrid path is measured instead.
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+from build_embeddings import LOCAL_EMBEDDING_MODEL, embed_texts_openai
+from vector_index import FAISS_NPROBE, FAISS_EF_SEARCH, set_search_params
+
+load_dotenv()
+
+DB_PATH = os.getenv('DB_PATH', 'pr_chat.db')
+FAISS_INDEX_PATH = os.getenv('FAISS_INDEX_PATH', 'faiss_index.faiss')
+RRF_K = 60  # reciprocal-rank fusion damping constant
+RECENT_QUERY_VECTORS = 64  # encoded queries kept, so a caller can reuse the search's vector
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1)
+
+
+def read_index_meta(db_path=DB_PATH):
+    """Return the index_meta table as a dict (empty if missing)."""
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            return dict(conn.execute('SELECT key, value FROM index_meta').fetchall())
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return {}
+
+
+def fetch_chunks(conn, chunk_ids):
+    """
+    Hydrate chunk_ids with chunk and document fields in one query.
+
+    Returns:
+        List of dicts in the same order as chunk_ids; ids that no longer
+        exist in the database are dropped.
+    """
+    if not chunk_ids:
+        return []
+
+    placeholders = ', '.join('?' * len(chunk_ids))
+    c = conn.cursor()
+    c.execute(f'''
+        SELECT c.chunk_id, c.doc_id, d.title, d.content_type, d.source_path,
+               c.chunk_order, c.chunk_text, c.start_time, c.end_time, c.page_number
+        FROM chunks c
+        JOIN documents d ON c.doc_id = d.doc_id
+        WHERE c.chunk_id IN ({placeholders})
+    ''', list(chunk_ids))
+
+    by_id = {}
+    for row in c.fetchall():
+        by_id[row[0]] = {
+            'chunk_id': row[0],
+            'doc_id': row[1],
+            'title': row[2],
+            'content_type': row[3] or 'unknown',
+            'source_path': row[4],
+            'chunk_order': row[5],
+            'chunk_text': row[6],
+            'start_time': row[7],
+            'end_time': row[8],
+            'page_number': row[9],
+        }
+    return [by_id[cid] for cid in chunk_ids if cid in by_id]
+
+
+def quote_fts_terms(query, match_any=False):
+    """
+    Turn free text into an FTS5 query of quoted terms (no operators).
+
+    Terms are ANDed by default; match_any ORs them, which suits natural
+    language questions where bm25 does the weighting.
+    """
+    terms = [t.replace('"', '""') for t in query.split()]
+    joiner = ' OR ' if match_any else ' '
+    return joiner.join(f'"{t}"' for t in terms if t)
+
+
+def keyword_search(conn, query, limit=10):
+    """
+    Rank chunks against a query with the chunk-level FTS5 index.
+
+    bm25() ordering and LIMIT are applied inside the FTS query, so only
+    the top passages are joined to their documents. Queries that are not
+    valid FTS5 syntax are retried as plain quoted terms.
+
+    Returns:
+        List of dicts like fetch_chunks() plus 'score' (bm25, lower is
+        better), 'snippet' and 'highlight' (matches wrapped in <mark>).
+    """
+    sql = '''
+        SELECT c.chunk_id, c.doc_id, d.title, d.content_type, d.source_path,
+               c.chunk_order, c.chunk_text, c.start_time, c.end_time, c.page_number,
+               m.score, m.snippet, m.highlight
+        FROM (
+            SELECT rowid AS chunk_id,
+                   bm25(chunks_fts) AS score,
+                   snippet(chunks_fts, 0, '<mark>', '</mark>', '…', 40) AS snippet,
+                   highlight(chunks_fts, 0, '<mark>', '</mark>') AS highlight
+            FROM chunks_fts
+            WHERE chunks_fts MATCH ?
+            ORDER BY bm25(chunks_fts)
+            LIMIT ?
+        ) m
+        JOIN chunks c ON c.chunk_id = m.chunk_id
+        JOIN documents d ON c.doc_id = d.doc_id
+        ORDER BY m.score
+    '''
+    c = conn.cursor()
+    try:
+        c.execute(sql, (query, limit))
+    except sqlite3.OperationalError:
+        quoted = quote_fts_terms(query)
+        if not quoted:
+            return []
+        c.execute(sql, (quoted, limit))
+
+    return [
+        {
+            'chunk_id': row[0],
+            'doc_id': row[1],
+            'title': row[2],
+            'content_type': row[3] or 'unknown',
+            'source_path': row[4],
+            'chunk_order': row[5],
+            'chunk_text': row[6],
+            'start_time': row[7],
+            'end_time': row[8],
+            'page_number': row[9],
+            'score': row[10],
+            'snippet': row[11],
+            'highlight': row[12],
+        }
+        for row in c.fetchall()
+    ]
+
+
+def reciprocal_rank_fusion(result_lists, k=RRF_K):
+    """
+    Fuse ranked result lists with reciprocal-rank fusion.
+
+    Each chunk scores sum(1 / (k + rank)) over the lists it appears in.
+    Fields from every list are merged, so a fused row keeps both the
+    keyword 'snippet' and the semantic 'distance' when available.
+
+    Returns:
+        Rows sorted by 'rrf_score' (higher is better), each with a
+        'sources' list naming the legs that found it.
+    """
+    fused = {}
+    for name, results in result_lists:
+        for rank, r in enumerate(results, 1):
+            row = fused.setdefault(r['chunk_id'], {'rrf_score': 0.0, 'sources': []})
+            for key, value in r.items():
+                row.setdefault(key, value)
+            row['rrf_score'] += 1.0 / (k + rank)
+            row['sources'].append(name)
+    return sorted(fused.values(), key=lambda r: r['rrf_score'], reverse=True)
+
+
+class RetrievalEngine:
+    """
+    Long-lived holder for the query encoder and FAISS index.
+
+    One instance is meant to be shared by every session of the app. The
+    encoder is loaded once (and again only if the index was rebuilt with a
+    different model); the index is swapped whenever its file changes.
+    """
+
+    def __init__(self, index_path=FAISS_INDEX_PATH, db_path=DB_PATH,
+                 nprobe=FAISS_NPROBE, ef_search=FAISS_EF_SEARCH):
+        self.index_path = index_path
+        self.db_path = db_path
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.index_type = None
+        self.encoding = None
+        self.model_name = None
+        self.model = None
+        self.index = None
+        self._signature = None
+        self._lock = threading.Lock()
+        self._recent_vectors = OrderedDict()  # (model_name, query) -> row vector
+        self._vectors_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='retrieval')
+        self.queries = 0
+        self.cold_timings = None
+        self.last_timings = None
+
+    def is_available(self):
+        """Return True if the index file exists."""
+        return os.path.exists(self.index_path)
+
+    def _file_signature(self):
+        stat = os.stat(self.index_path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def ensure_loaded(self):
+        """
+        Load the encoder and index if needed.
+
+        Returns:
+            Seconds spent loading (0.0 when everything was already resident).
+        """
+        signature = self._file_signature()
+        if signature == self._signature:
+            return 0.0
+
+        with self._lock:
+            if signature == self._signature:
+                return 0.0  # another session loaded it while we waited
+
+            start = time.perf_counter()
+            import faiss
+            index = faiss.read_index(self.index_path)
+            set_search_params(index, nprobe=self.nprobe, ef_search=self.ef_search)
+            index_meta = read_index_meta(self.db_path)
+            model_name = index_meta.get('model', LOCAL_EMBEDDING_MODEL)
+
+            if model_name != self.model_name:
+                self.model = None
+                if model_name == LOCAL_EMBEDDING_MODEL:
+                    from sentence_transformers import SentenceTransformer
+                    self.model = SentenceTransformer(model_name)
+                self.model_name = model_name
+
+            self.index = index
+            self.index_type = index_meta.get('index_type', 'flat')
+            self.encoding = index_meta.get('encoding', 'float32')
+            self._signature = signature
+            print(f"✓ Loaded FAISS index ({self.index_type}, {self.encoding}, "
+                  f"{index.ntotal} vectors, {model_name})")
+            return time.perf_counter() - start
+
+    def encode(self, query):
+        """
+        Encode a query into a float32 row vector with the index's model.
+
+        The last RECENT_QUERY_VECTORS queries are remembered, so encoding a
+        query that was just searched for (e.g. for the answer cache) is free.
+        """
+        import numpy as np
+
+        key = (self.model_name, query)
+        with self._vectors_lock:
+            if key in self._recent_vectors:
+                self._recent_vectors.move_to_end(key)
+                return self._recent_vectors[key]
+
+        if self.model is not None:
+            qvec = self.model.encode([query], convert_to_numpy=True).astype('float32')
+        else:
+            qvec = np.asarray(embed_texts_openai([query], show_progress=False), dtype='float32')
+
+        with self._vectors_lock:
+            self._recent_vectors[key] = qvec
+            while len(self._recent_vectors) > RECENT_QUERY_VECTORS:
+                self._recent_vectors.popitem(last=False)
+        return qvec
+
+    def search(self, query, top_k=5):
+        """
+        Find the chunks nearest to a query.
+
+        Returns:
+            (hits, timings) where hits is a list of (chunk_id, distance)
+            in rank order and timings holds load/encode/search times in
+            milliseconds.
+        """
+        total_start = time.perf_counter()
+        load_seconds = self.ensure_loaded()
+        index = self.index
+
+        start = time.perf_counter()
+        qvec = self.encode(query)
+        encode_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        D, I = index.search(qvec, top_k)
+        search_seconds = time.perf_counter() - start
+
+        hits = [(int(chunk_id), float(dist)) for dist, chunk_id in zip(D[0], I[0]) if chunk_id >= 0]
+
+        timings = {
+            'load_ms': _ms(load_seconds),
+            'encode_ms': _ms(encode_seconds),
+            'search_ms': _ms(search_seconds),
+            'total_ms': _ms(time.perf_counter() - total_start),
+            'cold': load_seconds > 0,
+        }
+        self.queries += 1
+        if self.cold_timings is None:
+            self.cold_timings = timings
+        self.last_timings = timings
+        return hits, timings
+
+    def retrieve(self, query, top_k=5):
+        """
+        Search and hydrate hits from the database in a single round-trip.
+
+        Returns:
+            (results, timings) - results are fetch_chunks() dicts with a
+            'distance' key, in rank order; timings include hydrate_ms.
+        """
+        hits, timings = self.search(query, top_k)
+
+        start = time.perf_counter()
+        conn = sqlite3.connect(self.db_path)
+        try:
+            results = fetch_chunks(conn, [chunk_id for chunk_id, _ in hits])
+        finally:
+            conn.close()
+        distances = dict(hits)
+        for r in results:
+            r['distance'] = distances[r['chunk_id']]
+        hydrate_seconds = time.perf_counter() - start
+
+        timings = dict(timings, hydrate_ms=_ms(hydrate_seconds),
+                       total_ms=round(timings['total_ms'] + _ms(hydrate_seconds), 1))
+        self.last_timings = timings
+        return results, timings
+
+    def _keyword_leg(self, query, limit):
+        start = time.perf_counter()
+        conn = sqlite3.connect(self.db_path)
+        try:
+            results = keyword_search(conn, quote_fts_terms(query, match_any=True), limit)
+        finally:
+            conn.close()
+        return results, _ms(time.perf_counter() - start)
+
+    def _semantic_leg(self, query, limit):
+        start = time.perf_counter()
+        results, timings = self.retrieve(query, limit)
+        return results, timings, _ms(time.perf_counter() - start)
+
+    def hybrid_retrieve(self, query, top_k=5, candidates=None):
+        """
+        Run FTS5 BM25 and FAISS retrieval concurrently and fuse them with RRF.
+
+        Both legs fetch `candidates` results (default 3 * top_k, at least
+        20) on the engine's thread pool; sqlite, FAISS and the encoder
+        release the GIL, so the legs overlap. Without a FAISS index the
+        keyword leg is used alone.
+
+        Returns:
+            (results, timings) - reciprocal_rank_fusion() rows cut to
+            top_k; timings hold per-leg latency (keyword_ms, semantic_ms
+            and its encode/search/hydrate breakdown), fuse_ms and the
+            wall-clock total_ms.
+        """
+        candidates = candidates or max(top_k * 3, 20)
+        start = time.perf_counter()
+
+        keyword_future = self._executor.submit(self._keyword_leg, query, candidates)
+        semantic_future = None
+        if self.is_available():
+            semantic_future = self._executor.submit(self._semantic_leg, query, candidates)
+
+        keyword_results, keyword_ms = keyword_future.result()
+        semantic_results, semantic_timings, semantic_ms = [], {}, 0.0
+        if semantic_future is not None:
+            semantic_results, semantic_timings, semantic_ms = semantic_future.result()
+
+        fuse_start = time.perf_counter()
+        results = reciprocal_rank_fusion([
+            ('keyword', keyword_results),
+            ('semantic', semantic_results),
+        ])[:top_k]
+        fuse_ms = _ms(time.perf_counter() - fuse_start)
+
+        timings = {
+            'keyword_ms': keyword_ms,
+            'semantic_ms': semantic_ms,
+            'load_ms': semantic_timings.get('load_ms', 0.0),
+            'encode_ms': semantic_timings.get('encode_ms', 0.0),
+            'search_ms': semantic_timings.get('search_ms', 0.0),
+            'hydrate_ms': semantic_timings.get('hydrate_ms', 0.0),
+            'fuse_ms': fuse_ms,
+            'total_ms': _ms(time.perf_counter() - start),
+            'cold': semantic_timings.get('cold', False),
+        }
+        return results, timings
+
+
+def main():
+    """Report cold and warm query latency."""
+    args = sys.argv[1:]
+    hybrid = '--hybrid' in args
+    if hybrid:
+        args.remove('--hybrid')
+    runs = 5
+    if '--runs' in args:
+        i = args.index('--runs')
+        runs = int(args[i + 1])
+        del args[i:i + 2]
+    if not args:
+        print('Usage: python scripts/retrieval.py "query" [--runs N]')
+        return 1
+
+    query = args[0]
+    engine = RetrievalEngine()
+    if not engine.is_available():
+        print("❌ FAISS index not found. Run: python scripts/build_embeddings.py")
+        return 1
+
+    run = engine.hybrid_retrieve if hybrid else engine.retrieve
+    results, cold = run(query)
+    breakdown = ', '.join(f"{k[:-3]} {v} ms" for k, v in cold.items()
+                          if k.endswith('_ms') and k != 'total_ms')
+    print(f"Cold query: {cold['total_ms']} ms ({breakdown})")
+
+    warm = []
+    for _ in range(runs):
+        engine._recent_vectors.clear()  # measure the encoder too, not the remembered vector
+        warm.append(run(query)[1])
+    warm_total = sorted(t['total_ms'] for t in warm)
+    print(f"Warm query: median {warm_total[len(warm_total) // 2]} ms, "
+          f"min {warm_total[0]} ms, max {warm_total[-1]} ms over {runs} runs")
+    print(f"Top hit: {results[0]['title'] if results else '(none)'}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
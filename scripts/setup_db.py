@@ -5,17 +5,27 @@ Creates tables for storing documents, chunks, and metadata.
 """
 
 import os
-import sqlite3
 from dotenv import load_dotenv
 
+from db import connect
+
 load_dotenv()
 
 DB_PATH = os.getenv('DB_PATH', 'pr_chat.db')
 
 
-def setup_database():
-    """Create database tables if they don't exist."""
-    conn = sqlite3.connect(DB_PATH)
+def add_missing_columns(c, table, columns):
+    """Add columns introduced after `table` was first created (a no-op on new databases)."""
+    c.execute(f'PRAGMA table_info({table})')
+    existing = {row[1] for row in c.fetchall()}
+    for name, decl in columns.items():
+        if name not in existing:
+            c.execute(f'ALTER TABLE {table} ADD COLUMN {name} {decl}')
+
+
+def setup_database(quiet=False, db_path=DB_PATH):
+    """Create database tables if they don't exist (and switch the file to WAL mode)."""
+    conn = connect(db_path)
     c = conn.cursor()
 
     # Documents table - stores metadata for each uploaded/ingested document
@@ -27,9 +37,12 @@ def setup_database():
             title TEXT,
             content_type TEXT,  -- 'mp3', 'pdf', 'text'
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            full_text TEXT  -- Full extracted text
+            full_text TEXT,  -- Full extracted text
+            content_hash TEXT  -- sha256 of the source file, for duplicate detection
         )
     ''')
+    add_missing_columns(c, 'documents', {'content_hash': 'TEXT'})
+    c.execute('CREATE INDEX IF NOT EXISTS idx_documents_content_hash ON documents (content_hash)')
 
     # Full-Text Search virtual table for keyword search
     c.execute('''
@@ -47,10 +60,79 @@ def setup_database():
             doc_id INTEGER,
             chunk_order INTEGER,
             chunk_text TEXT,
+            start_time REAL,  -- seconds into the recording (audio only)
+            end_time REAL,
+            page_number INTEGER,  -- PDF page the chunk starts on
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (doc_id) REFERENCES documents(doc_id)
         )
     ''')
+    add_missing_columns(c, 'chunks', {'start_time': 'REAL', 'end_time': 'REAL', 'page_number': 'INTEGER'})
+
+    # Chunk-level Full-Text Search, an external-content index over chunks
+    # kept in sync by triggers so keyword search can rank passages with bm25()
+    c.execute("SELECT 1 FROM sqlite_master WHERE name = 'chunks_fts'")
+    chunks_fts_exists = c.fetchone() is not None
+    c.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+            chunk_text,
+            content='chunks',
+            content_rowid='chunk_id',
+            tokenize='porter unicode61'
+        )
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS chunks_fts_insert AFTER INSERT ON chunks BEGIN
+            INSERT INTO chunks_fts (rowid, chunk_text) VALUES (new.chunk_id, new.chunk_text);
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS chunks_fts_delete AFTER DELETE ON chunks BEGIN
+            INSERT INTO chunks_fts (chunks_fts, rowid, chunk_text)
+            VALUES ('delete', old.chunk_id, old.chunk_text);
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS chunks_fts_update AFTER UPDATE OF chunk_text ON chunks BEGIN
+            INSERT INTO chunks_fts (chunks_fts, rowid, chunk_text)
+            VALUES ('delete', old.chunk_id, old.chunk_text);
+            INSERT INTO chunks_fts (rowid, chunk_text) VALUES (new.chunk_id, new.chunk_text);
+        END
+    ''')
+    if not chunks_fts_exists:
+        # Index chunks that were ingested before this table existed
+        c.execute("INSERT INTO chunks_fts (chunks_fts) VALUES ('rebuild')")
+
+    # Chunk embeddings - one stored vector per chunk, keyed by model and text hash
+    # so build_embeddings.py only re-embeds new or changed chunks
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS chunk_embeddings (
+            chunk_id INTEGER PRIMARY KEY,
+            model TEXT,  -- embedding model name
+            text_hash TEXT,  -- sha256 of chunk_text
+            dim INTEGER,
+            vector BLOB,  -- float32 bytes
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (chunk_id) REFERENCES chunks(chunk_id)
+        )
+    ''')
+
+    # Chunks deleted with their documents since the last build_embeddings.py
+    # run; their stored vectors are gone but they are still in the FAISS index
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS deleted_chunks (
+            chunk_id INTEGER PRIMARY KEY
+        )
+    ''')
+
+    # Index metadata - small key/value facts about the FAISS index
+    # (embedding model, dimension, vector count); vector IDs are chunk_ids
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS index_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
 
     # Chat history - store conversation threads
     c.execute('''
@@ -64,9 +146,84 @@ def setup_database():
         )
     ''')
 
+    # Query log - one row per search or Ask request, with per-stage timings
+    # in query_stages (see telemetry.py)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS query_log (
+            query_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT,
+            kind TEXT,  -- 'keyword', 'semantic', 'hybrid' or 'ask'
+            query TEXT,
+            result_count INTEGER,
+            cache_hit INTEGER DEFAULT 0,  -- Ask answered from the answer cache
+            prompt_tokens INTEGER,
+            total_ms REAL,
+            created_at REAL  -- unix time
+        )
+    ''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_query_log_created_at ON query_log(created_at)')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS query_stages (
+            query_id INTEGER,
+            stage TEXT,  -- e.g. 'encode', 'search', 'hydrate', 'first_token', 'answer'
+            ms REAL,
+            FOREIGN KEY (query_id) REFERENCES query_log(query_id)
+        )
+    ''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_query_stages_query_id ON query_stages(query_id)')
+
+    # Answer cache - generated Ask answers keyed by question and retrieved chunks (see answer_cache.py)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS answer_cache (
+            entry_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            question TEXT,
+            question_hash TEXT,  -- answer_cache.question_hash(question)
+            retrieval TEXT,  -- how the chunks were found, e.g. 'hybrid:5'
+            model TEXT,  -- embedding model of question_vector
+            question_vector BLOB,  -- unit-length float32 bytes, or NULL
+            chunk_key TEXT,  -- sorted retrieved chunk_ids
+            chunk_ids TEXT,  -- retrieved chunk_ids in rank order
+            chunk_hash TEXT,  -- chunk_content_hash() when the answer was generated
+            answer TEXT,
+            created_at REAL,  -- unix time
+            last_used REAL,
+            hits INTEGER DEFAULT 0
+        )
+    ''')
+    add_missing_columns(c, 'answer_cache', {'retrieval': 'TEXT', 'chunk_ids': 'TEXT'})
+    c.execute('CREATE INDEX IF NOT EXISTS idx_answer_cache_chunk_key ON answer_cache(chunk_key)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_answer_cache_question_hash ON answer_cache(question_hash)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_answer_cache_last_used ON answer_cache(last_used)')
+
+    # Ingest jobs - queued uploads/URLs run by the worker in ingest_jobs.py
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS ingest_jobs (
+            job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT,  -- file path or URL
+            source_type TEXT,  -- 'upload' or 'url'
+            title TEXT,
+            status TEXT DEFAULT 'queued',  -- queued, running, indexing, done, failed
+            progress REAL DEFAULT 0,  -- 0-1, estimated from the ingest stage
+            stage TEXT,  -- latest ingest.py progress line
+            attempts INTEGER DEFAULT 0,
+            max_attempts INTEGER,
+            error TEXT,
+            log TEXT,  -- tail of the last attempt's output
+            exit_code INTEGER,  -- ingest.py exit status (subprocess jobs only)
+            stderr TEXT,  -- tail of ingest.py's stderr (subprocess jobs only)
+            next_attempt_at REAL,  -- unix time; retry backoff
+            created_at REAL,
+            started_at REAL,
+            finished_at REAL
+        )
+    ''')
+    add_missing_columns(c, 'ingest_jobs', {'exit_code': 'INTEGER', 'stderr': 'TEXT'})
+    c.execute('CREATE INDEX IF NOT EXISTS idx_ingest_jobs_status ON ingest_jobs(status, next_attempt_at)')
+
     conn.commit()
     conn.close()
-    print(f"✓ Database initialized at {DB_PATH}")
+    if not quiet:
+        print(f"✓ Database initialized at {db_path}")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Per-query latency telemetry.
+
+Every keyword, semantic, hybrid and Ask request is written to query_log
+(result count, answer-cache hit, prompt tokens, total latency) with one
+query_stages row per timed stage (encode, search, hydrate, fts, fuse,
+first_token, answer, ...). Ask questions and answers also go to
+chat_history. stage_percentiles() reports p50/p95/p99 per stage over a
+time window, for the app's Latency panel and the command line.
+
+Usage:
+  python scripts/telemetry.py                   # last 24 hours
+  python scripts/telemetry.py --hours 168 --kind ask
+  python scripts/telemetry.py --prune-days 30   # delete older rows
+"""
+
+import os
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from dotenv import load_dotenv
+
+from db import connect
+
+load_dotenv()
+
+DB_PATH = os.getenv('DB_PATH', 'pr_chat.db')
+PERCENTILES = (50, 95, 99)
+
+
+def stage_timings(timings):
+    """{stage: ms} from a timings dict: its nonzero *_ms entries other than total_ms."""
+    return {k[:-3]: v for k, v in timings.items()
+            if k.endswith('_ms') and k != 'total_ms' and isinstance(v, (int, float)) and v}
+
+
+class QueryLog:
+    """Writes query telemetry and chat history. Safe to share between threads."""
+
+    def __init__(self, db_path=DB_PATH):
+        self.conn = connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def log(self, kind, query, timings, result_count, session_id=None, cache_hit=False, prompt_tokens=None):
+        """
+        Record one request.
+
+        Args:
+            kind: 'keyword', 'semantic', 'hybrid' or 'ask'
+            timings: dict with total_ms and per-stage *_ms values
+
+        Returns:
+            query_id, or None if the write failed (telemetry never fails a request)
+        """
+        try:
+            with self._lock:
+                c = self.conn.execute('''
+                    INSERT INTO query_log (session_id, kind, query, result_count, cache_hit,
+                                           prompt_tokens, total_ms, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (session_id, kind, query, result_count, int(cache_hit), prompt_tokens,
+                      timings.get('total_ms'), time.time()))
+                query_id = c.lastrowid
+                self.conn.executemany('INSERT INTO query_stages (query_id, stage, ms) VALUES (?, ?, ?)',
+                                      [(query_id, stage, ms) for stage, ms in stage_timings(timings).items()])
+                self.conn.commit()
+            return query_id
+        except sqlite3.Error as e:
+            print(f"⚠️ Query log write failed: {e}")
+            return None
+
+    def log_chat(self, session_id, question, answer, doc_ids):
+        """Append an Ask question and its answer to chat_history."""
+        sources = json.dumps(sorted(set(doc_ids)))
+        try:
+            with self._lock:
+                self.conn.executemany('''
+                    INSERT INTO chat_history (session_id, role, content, sources) VALUES (?, ?, ?, ?)
+                ''', [(session_id, 'user', question, None), (session_id, 'assistant', answer, sources)])
+                self.conn.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️ Chat history write failed: {e}")
+
+    def stage_percentiles(self, hours=24, kind=None):
+        """See stage_percentiles()."""
+        with self._lock:
+            return stage_percentiles(self.conn, hours, kind)
+
+
+def stage_percentiles(conn, hours=24, kind=None):
+    """
+    Latency percentiles per request kind and stage over the last `hours`.
+
+    Returns:
+        List of dicts (kind, stage, count, p50, p95, p99) sorted by kind,
+        with each kind's 'total' row first; an 'ask' kind also reports its
+        answer-cache hit rate in 'cache_hits' on the total row.
+    """
+    import numpy as np
+
+    since = time.time() - hours * 3600
+    kind_filter = ' AND q.kind = ?' if kind else ''
+    params = (since, kind) if kind else (since,)
+
+    samples = {}
+    cache_hits = {}
+    for row_kind, total_ms, cache_hit in conn.execute(f'''
+        SELECT q.kind, q.total_ms, q.cache_hit FROM query_log q
+        WHERE q.created_at >= ?{kind_filter}
+    ''', params):
+        if total_ms is not None:
+            samples.setdefault((row_kind, 'total'), []).append(total_ms)
+        cache_hits[row_kind] = cache_hits.get(row_kind, 0) + cache_hit
+    for row_kind, stage, ms in conn.execute(f'''
+        SELECT q.kind, s.stage, s.ms FROM query_stages s
+        JOIN query_log q ON q.query_id = s.query_id
+        WHERE q.created_at >= ?{kind_filter}
+    ''', params):
+        samples.setdefault((row_kind, stage), []).append(ms)
+
+    rows = []
+    for (row_kind, stage), values in sorted(samples.items(), key=lambda item: (item[0][0], item[0][1] != 'total')):
+        p = np.percentile(values, PERCENTILES)
+        row = {'kind': row_kind, 'stage': stage, 'count': len(values)}
+        row.update({f'p{q}': round(float(v), 1) for q, v in zip(PERCENTILES, p)})
+        if stage == 'total' and row_kind == 'ask':
+            row['cache_hits'] = cache_hits.get(row_kind, 0)
+        rows.append(row)
+    return rows
+
+
+def prune(conn, days):
+    """Delete query_log and query_stages rows older than `days`. Returns rows deleted."""
+    before = time.time() - days * 86400
+    conn.execute('''
+        DELETE FROM query_stages WHERE query_id IN (SELECT query_id FROM query_log WHERE created_at < ?)
+    ''', (before,))
+    deleted = conn.execute('DELETE FROM query_log WHERE created_at < ?', (before,)).rowcount
+    conn.commit()
+    return deleted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query latency percentiles by stage.")
+    parser.add_argument('--hours', type=float, default=24, help="time window (default: 24)")
+    parser.add_argument('--kind', choices=('keyword', 'semantic', 'hybrid', 'ask'))
+    parser.add_argument('--prune-days', type=float, help="delete telemetry older than this many days")
+    args = parser.parse_args()
+
+    conn = connect(DB_PATH)
+    if args.prune_days is not None:
+        print(f"🧹 Deleted {prune(conn, args.prune_days)} queries older than {args.prune_days:g} days")
+        return
+
+    rows = stage_percentiles(conn, args.hours, args.kind)
+    if not rows:
+        print(f"No queries logged in the last {args.hours:g} hours.")
+        return
+    print(f"⏱️ Latency over the last {args.hours:g} hours (ms)")
+    print(f"  {'kind':<9} {'stage':<12} {'count':>6} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for row in rows:
+        extra = f"  ({row['cache_hits']} answer cache hits)" if 'cache_hits' in row else ''
+        print(f"  {row['kind']:<9} {row['stage']:<12} {row['count']:>6} "
+              f"{row['p50']:>9} {row['p95']:>9} {row['p99']:>9}{extra}")
+
+
+if __name__ == '__main__':
+    main()
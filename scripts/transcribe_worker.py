@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Long-lived transcription worker.
+
+Loads the Whisper model once and transcribes queued files back to back,
+instead of paying the model load for every file the way one ingest.py
+process per upload does.
+
+Usage:
+  python scripts/transcribe_worker.py a.mp3 b.mp3 c.mp3     # ingest each file
+  python scripts/transcribe_worker.py --no-ingest a.mp3     # transcripts only
+  find data/uploads -name '*.mp3' | python scripts/transcribe_worker.py --stdin
+
+With --stdin the worker keeps running and takes one path per line until
+EOF. Each job reports its throughput as audio-seconds per wall-second
+(e.g. 12.0x means an hour of audio took five minutes), and a summary is
+printed at the end.
+"""
+
+import sys
+import time
+import queue
+import argparse
+import threading
+from pathlib import Path
+from concurrent.futures import Future
+
+from ingest import (
+    LOCAL_WHISPER_MODEL, ensure_dirs, get_whisper_model, transcribe_with_whisper,
+    save_transcript, ingest_file,
+)
+from parallel_transcribe import audio_duration
+
+
+class TranscriptionWorker:
+    """
+    Background thread that owns the Whisper model and works through a job queue.
+
+    Args:
+        ingest: ingest each file into the knowledge base (default), or only
+            write its transcript to TRANSCRIPTS_DIR
+        preload: load the model before the first job; with False it is
+            loaded by the first audio file (PDF-only queues never load it)
+            and kept for the rest
+    """
+
+    def __init__(self, ingest=True, preload=True):
+        self.ingest = ingest
+        self.preload = preload
+        self.jobs = queue.Queue()
+        self.audio_seconds = 0.0
+        self.wall_seconds = 0.0
+        self.completed = 0
+        self.failed = 0
+        self._thread = threading.Thread(target=self._run, name='transcribe-worker', daemon=True)
+        self._thread.start()
+
+    def submit(self, path, title=None, source_type='upload'):
+        """Queue a file (or a URL with source_type='url'); the returned Future resolves to the job's result dict."""
+        future = Future()
+        self.jobs.put((path, title, source_type, future))
+        return future
+
+    @property
+    def thread_id(self):
+        """Ident of the thread that runs the jobs (and prints their progress)."""
+        return self._thread.ident
+
+    def close(self):
+        """Finish the queued jobs and stop the worker."""
+        self.jobs.put(None)
+        self._thread.join()
+
+    def speed(self):
+        """Overall audio-seconds transcribed per wall-second."""
+        return self.audio_seconds / self.wall_seconds if self.wall_seconds else 0.0
+
+    def _run(self):
+        load_error = None
+        if self.preload:
+            start = time.perf_counter()
+            try:
+                get_whisper_model()
+                print(f"✓ Whisper {LOCAL_WHISPER_MODEL} model loaded in {time.perf_counter() - start:.1f}s")
+            except Exception as e:
+                load_error = e
+                print(f"❌ Could not load Whisper {LOCAL_WHISPER_MODEL} model: {e}")
+
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            path, title, source_type, future = job
+            if load_error is not None:
+                self.failed += 1
+                future.set_exception(load_error)
+                continue
+            try:
+                future.set_result(self._process(path, title, source_type))
+            except Exception as e:
+                self.failed += 1
+                print(f"❌ {path}: {e}")
+                future.set_exception(e)
+
+    def _process(self, path, title, source_type='upload'):
+        duration = audio_duration(path) if source_type != 'url' else None
+        start = time.perf_counter()
+        if self.ingest:
+            ok = ingest_file(path, source_type=source_type, title=title)
+        else:
+            transcript = transcribe_with_whisper(path)
+            ok = bool(transcript)
+            if ok:
+                save_transcript(title or Path(path).stem, path, transcript['text'], transcript['segments'])
+        elapsed = time.perf_counter() - start
+
+        result = {'path': path, 'ok': ok, 'audio_seconds': duration, 'wall_seconds': elapsed}
+        if not ok:
+            self.failed += 1
+            print(f"❌ {path}: failed after {elapsed:.1f}s")
+            return result
+
+        self.completed += 1
+        if duration:
+            self.audio_seconds += duration
+            self.wall_seconds += elapsed
+            result['speed'] = duration / elapsed
+            print(f"✓ {path}: {duration:.0f}s of audio in {elapsed:.1f}s ({result['speed']:.1f}x realtime)")
+        else:
+            print(f"✓ {path}: done in {elapsed:.1f}s (audio length unknown)")
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe audio files with one long-lived Whisper model.")
+    parser.add_argument('paths', nargs='*', help="audio files to transcribe")
+    parser.add_argument('--stdin', action='store_true', help="read more paths from stdin, one per line")
+    parser.add_argument('--no-ingest', dest='ingest', action='store_false',
+                        help="only write transcripts, don't add them to the database")
+    args = parser.parse_args()
+
+    if not args.paths and not args.stdin:
+        parser.print_usage()
+        sys.exit(1)
+
+    ensure_dirs()
+    start = time.perf_counter()
+    worker = TranscriptionWorker(ingest=args.ingest)
+    for path in args.paths:
+        worker.submit(path)
+    if args.stdin:
+        for line in sys.stdin:
+            if line.strip():
+                worker.submit(line.strip())
+
+    worker.close()
+    total = time.perf_counter() - start
+
+    print("\n" + "=" * 60)
+    print(f"✅ {worker.completed} transcribed, {worker.failed} failed in {total:.1f}s")
+    if worker.wall_seconds:
+        print(f"⏱️ Throughput: {worker.audio_seconds:.0f}s of audio in {worker.wall_seconds:.1f}s "
+              f"of transcription ({worker.speed():.1f} audio-seconds per wall-second)")
+    sys.exit(0 if not worker.failed else 1)
+
+
+if __name__ == '__main__':
+    main()
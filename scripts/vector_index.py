@@ -0,0 +1,336 @@
+"""
+FAISS index factory for the chunk vector store.
+
+Index types:
+- flat      brute-force search over every vector
+- ivf_flat  inverted lists over k-means cells (only nearby cells are scanned)
+- ivf_pq    inverted lists with product-quantized codes (smallest, lossy)
+- hnsw      graph-based search (fast and accurate, no in-place deletes)
+
+Vector encodings:
+- float32   full precision (4 bytes per dimension)
+- float16   half precision scalar quantizer (2 bytes per dimension)
+- int8      8-bit scalar quantizer (1 byte per dimension)
+- pq        product quantization (~1 byte per 8 dimensions)
+
+PQ learns 2**nbits centroids per sub-quantizer, so it needs enough
+training vectors: nbits drops from 8 on small corpora, and below
+PQ_MIN_TRAIN_VECTORS the pq encoding falls back to int8 (ivf_pq to
+ivf_flat with int8), see resolve_index().
+
+Every index uses chunk_id as the vector ID. `auto` picks a type from the
+corpus size; IVF types and trained encodings learn from a random sample
+of the vectors. The encoding is part of the saved index, so readers pick
+it up from faiss.read_index() without extra configuration.
+"""
+
+import os
+import math
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+INDEX_TYPES = ('flat', 'ivf_flat', 'ivf_pq', 'hnsw')
+ENCODINGS = ('float32', 'float16', 'int8', 'pq')
+FAISS_INDEX_TYPE = os.getenv('FAISS_INDEX_TYPE', 'auto')
+FAISS_ENCODING = os.getenv('FAISS_ENCODING', 'float32')
+FAISS_NPROBE = int(os.getenv('FAISS_NPROBE', '16'))
+FAISS_EF_SEARCH = int(os.getenv('FAISS_EF_SEARCH', '64'))
+
+FLAT_MAX_VECTORS = 50_000  # exact search stays fast below this
+IVF_FLAT_MAX_VECTORS = 1_000_000  # beyond this, compress with PQ
+HNSW_M = 32
+MAX_TRAIN_VECTORS = 100_000
+PQ_MAX_NBITS = 8
+PQ_MIN_NBITS = 4
+PQ_POINTS_PER_CENTROID = 39  # faiss warns when k-means gets fewer training points per centroid
+PQ_MIN_TRAIN_VECTORS = PQ_POINTS_PER_CENTROID * 2 ** PQ_MIN_NBITS
+
+
+def choose_index_type(n):
+    """Pick an index type for a corpus of n vectors."""
+    if n < FLAT_MAX_VECTORS:
+        return 'flat'
+    if n < IVF_FLAT_MAX_VECTORS:
+        return 'ivf_flat'
+    return 'ivf_pq'
+
+
+def choose_nlist(n):
+    """Number of IVF cells: ~4*sqrt(n), with at least 39 training points per cell."""
+    return max(1, min(int(4 * math.sqrt(n)), n // 39))
+
+
+def choose_pq_m(d):
+    """PQ sub-quantizer count: ~8 dims per 1-byte code, dividing d evenly."""
+    m = max(1, d // 8)
+    while d % m:
+        m -= 1
+    return m
+
+
+def choose_pq_nbits(n):
+    """
+    Bits per PQ code that n training vectors can train: 2**nbits centroids
+    with at least PQ_POINTS_PER_CENTROID points each, at most PQ_MAX_NBITS.
+
+    Returns:
+        nbits, or None when n is below PQ_MIN_TRAIN_VECTORS.
+    """
+    n = min(n, MAX_TRAIN_VECTORS)
+    for nbits in range(PQ_MAX_NBITS, PQ_MIN_NBITS - 1, -1):
+        if n >= PQ_POINTS_PER_CENTROID * 2 ** nbits:
+            return nbits
+    return None
+
+
+def resolve_encoding(index_type, encoding):
+    """ivf_pq always stores PQ codes; other types use the requested encoding."""
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown encoding: {encoding} (expected one of {', '.join(ENCODINGS)})")
+    return 'pq' if index_type == 'ivf_pq' else encoding
+
+
+def resolve_index(index_type, encoding, n):
+    """
+    The index type and encoding to build for n (training) vectors.
+
+    PQ cannot be trained on fewer than PQ_MIN_TRAIN_VECTORS vectors: the pq
+    encoding then falls back to int8, and ivf_pq to ivf_flat with int8.
+    Resolving an already resolved pair returns it unchanged.
+
+    Returns:
+        (index_type, encoding)
+    """
+    encoding = resolve_encoding(index_type, encoding)
+    if encoding != 'pq' or choose_pq_nbits(n) is not None:
+        return index_type, encoding
+    if index_type == 'ivf_pq':
+        print(f"⚠️ ivf_pq needs at least {PQ_MIN_TRAIN_VECTORS} vectors to train PQ ({n} available), "
+              f"using ivf_flat with int8")
+        return 'ivf_flat', 'int8'
+    print(f"⚠️ PQ needs at least {PQ_MIN_TRAIN_VECTORS} vectors to train ({n} available), using int8")
+    return index_type, 'int8'
+
+
+def code_string(encoding, d, n=None):
+    """faiss.index_factory code description for a resolved encoding (n sizes PQ's nbits)."""
+    if encoding == 'pq':
+        nbits = choose_pq_nbits(n) if n is not None else PQ_MAX_NBITS
+        if nbits is None:
+            raise ValueError(f"Too few vectors to train PQ: {n} (need at least {PQ_MIN_TRAIN_VECTORS})")
+        return f'PQ{choose_pq_m(d)}' if nbits == PQ_MAX_NBITS else f'PQ{choose_pq_m(d)}x{nbits}'
+    return {'float32': 'Flat', 'float16': 'SQfp16', 'int8': 'SQ8'}[encoding]
+
+
+def factory_string(index_type, d, n, nlist=None, encoding='float32'):
+    """faiss.index_factory description for an index type and encoding, as resolve_index() returns them."""
+    code = code_string(encoding, d, n)
+    if index_type == 'flat':
+        return code
+    if index_type in ('ivf_flat', 'ivf_pq'):
+        return f'IVF{nlist or choose_nlist(n)},{code}'
+    if index_type == 'hnsw':
+        return f'HNSW{HNSW_M}' if code == 'Flat' else f'HNSW{HNSW_M}_{code}'
+    raise ValueError(f"Unknown index type: {index_type} (expected one of {', '.join(INDEX_TYPES)})")
+
+
+def needs_training(index_type, encoding):
+    """True when the index learns from sample vectors before it can be filled."""
+    return index_type.startswith('ivf') or resolve_encoding(index_type, encoding) in ('int8', 'pq')
+
+
+def train_sample(vecs, max_vectors=MAX_TRAIN_VECTORS, seed=0):
+    """Random sample of rows used to train IVF/PQ quantizers."""
+    import numpy as np
+
+    if len(vecs) <= max_vectors:
+        return vecs
+    rows = np.random.default_rng(seed).choice(len(vecs), max_vectors, replace=False)
+    return vecs[np.sort(rows)]
+
+
+def create_index(index_type, d, n, nlist=None, encoding='float32', sample=None):
+    """
+    Create an empty, trained index ready for add_with_ids().
+
+    Args:
+        index_type: one of INDEX_TYPES
+        d: vector dimension
+        n: expected number of vectors (sizes the IVF cell count)
+        nlist: IVF cell count override
+        encoding: one of ENCODINGS
+        sample: float32 training vectors (needed by IVF and trained encodings)
+
+    Returns:
+        The empty FAISS index (of the type resolve_index() picks for the sample).
+    """
+    import faiss
+
+    # PQ's nbits is limited by the vectors it actually trains on
+    train_n = len(sample) if sample is not None else n
+    index_type, encoding = resolve_index(index_type, encoding, train_n)
+    description = factory_string(index_type, d, train_n, nlist or choose_nlist(n), encoding)
+    index = faiss.index_factory(d, description)
+    if not index_type.startswith('ivf'):
+        index = faiss.IndexIDMap2(index)  # IVF indexes store ids themselves
+
+    if not index.is_trained:
+        print(f"  🏋️ Training {description} on {len(sample)} sampled vectors...")
+        start = time.perf_counter()
+        index.train(sample)
+        print(f"  ✓ Trained in {time.perf_counter() - start:.1f}s")
+
+    set_search_params(index)
+    return index
+
+
+def build_index(index_type, vecs, ids, nlist=None, encoding='float32'):
+    """
+    Create, train and fill an index from vectors already in memory.
+
+    Args:
+        index_type: one of INDEX_TYPES
+        vecs: float32 matrix of vectors
+        ids: chunk_ids, one per row of vecs
+        nlist: IVF cell count override
+        encoding: one of ENCODINGS
+
+    Returns:
+        The filled FAISS index.
+    """
+    import numpy as np
+
+    n, d = vecs.shape
+    index = create_index(index_type, d, n, nlist, encoding, sample=train_sample(vecs))
+    index.add_with_ids(vecs, np.asarray(ids, dtype='int64'))
+    return index
+
+
+def index_nbytes(index):
+    """Serialized size of an index, a close proxy for its resident memory."""
+    import faiss
+
+    return faiss.serialize_index(index).nbytes
+
+
+def is_positional(index):
+    """True for legacy indexes whose row positions were mapped via JSON."""
+    import faiss
+
+    return type(index) in (faiss.IndexFlat, faiss.IndexFlatL2)
+
+
+def supports_remove(index):
+    """HNSW graphs cannot delete vectors; everything else here can."""
+    import faiss
+
+    inner = faiss.downcast_index(index.index) if hasattr(index, 'id_map') else index
+    return not hasattr(inner, 'hnsw')
+
+
+def set_search_params(index, nprobe=FAISS_NPROBE, ef_search=FAISS_EF_SEARCH):
+    """Apply query-time knobs: nprobe for IVF, efSearch for HNSW."""
+    import faiss
+
+    inner = faiss.downcast_index(index.index) if hasattr(index, 'id_map') else index
+    try:
+        faiss.extract_index_ivf(index).nprobe = nprobe
+    except RuntimeError:
+        pass  # not an IVF index
+    if hasattr(inner, 'hnsw'):
+        inner.hnsw.efSearch = ef_search
+
+
+def _search_excluding_self(index, queries, query_ids, k):
+    """Search k+1 neighbours and drop each query's own id."""
+    start = time.perf_counter()
+    _, I = index.search(queries, k + 1)
+    ms_per_query = (time.perf_counter() - start) * 1000 / len(queries)
+    results = [[i for i in row if i != qid and i >= 0][:k] for row, qid in zip(I, query_ids)]
+    return results, ms_per_query
+
+
+def _recall(found, truth):
+    import numpy as np
+
+    return float(np.mean([len(set(f) & set(t)) / max(len(t), 1) for f, t in zip(found, truth)]))
+
+
+def _eval_queries(vecs, ids, k, n_queries, seed):
+    """Sample corpus vectors as queries and compute exact ground truth."""
+    import faiss
+    import numpy as np
+
+    n = len(vecs)
+    rows = np.random.default_rng(seed).choice(n, min(n_queries, n), replace=False)
+    queries = vecs[rows]
+    query_ids = np.asarray(ids, dtype='int64')[rows]
+
+    exact = faiss.IndexIDMap2(faiss.IndexFlatL2(vecs.shape[1]))
+    exact.add_with_ids(vecs, np.asarray(ids, dtype='int64'))
+    truth, exact_ms = _search_excluding_self(exact, queries, query_ids, k)
+    return queries, query_ids, truth, exact_ms, index_nbytes(exact)
+
+
+def evaluate_index(index, index_type, vecs, ids, k=10, n_queries=200, seed=0):
+    """
+    Print recall@k, latency and size against an exact float32 flat index.
+
+    Queries are corpus vectors sampled at random (their own id is
+    excluded from both result lists). nprobe/efSearch are swept so the
+    recall/latency trade-off is visible.
+    """
+    import faiss
+
+    queries, query_ids, truth, exact_ms, exact_bytes = _eval_queries(vecs, ids, k, n_queries, seed)
+
+    print(f"\n📏 Recall@{k} vs exact search ({len(queries)} queries)")
+    print(f"  {'exact flat float32':<28} recall 1.000   {exact_ms:.3f} ms/query   "
+          f"{exact_bytes / 1e6:.1f} MB")
+
+    if index_type.startswith('ivf'):
+        sweep = [('nprobe', v) for v in (1, 4, 16, 64) if v <= faiss.extract_index_ivf(index).nlist]
+    elif index_type == 'hnsw':
+        sweep = [('efSearch', v) for v in (16, 32, 64, 128)]
+    else:
+        sweep = [(None, None)]
+
+    size_mb = index_nbytes(index) / 1e6
+    for param, value in sweep:
+        if param == 'nprobe':
+            set_search_params(index, nprobe=value)
+        elif param == 'efSearch':
+            set_search_params(index, ef_search=value)
+        found, ms = _search_excluding_self(index, queries, query_ids, k)
+        label = index_type if param is None else f"{index_type} {param}={value}"
+        print(f"  {label:<28} recall {_recall(found, truth):.3f}   {ms:.3f} ms/query   {size_mb:.1f} MB")
+
+    set_search_params(index)  # restore configured defaults
+
+
+def compare_encodings(index_type, vecs, ids, nlist=None, k=10, n_queries=200, seed=0):
+    """
+    Build the index once per encoding and print memory footprint and
+    recall loss relative to exact float32 search.
+    """
+    queries, query_ids, truth, exact_ms, exact_bytes = _eval_queries(vecs, ids, k, n_queries, seed)
+    n = len(vecs)
+
+    print(f"\n💾 Encodings for {index_type} ({n} vectors, recall@{k} over {len(queries)} queries)")
+    print(f"  {'encoding':<10} {'size':>10} {'bytes/vec':>10} {'recall':>8} {'loss':>7} {'ms/query':>9}")
+    print(f"  {'exact':<10} {exact_bytes / 1e6:>8.1f}MB {exact_bytes / n:>10.0f} "
+          f"{1.0:>8.3f} {0.0:>7.3f} {exact_ms:>9.3f}")
+
+    encodings = ('pq',) if index_type == 'ivf_pq' else ENCODINGS
+    for encoding in encodings:
+        if encoding == 'pq' and choose_pq_nbits(n) is None:
+            print(f"  {encoding:<10} skipped: needs at least {PQ_MIN_TRAIN_VECTORS} vectors to train")
+            continue
+        index = build_index(index_type, vecs, ids, nlist=nlist, encoding=encoding)
+        nbytes = index_nbytes(index)
+        found, ms = _search_excluding_self(index, queries, query_ids, k)
+        recall = _recall(found, truth)
+        print(f"  {encoding:<10} {nbytes / 1e6:>8.1f}MB {nbytes / n:>10.0f} "
+              f"{recall:>8.3f} {1.0 - recall:>7.3f} {ms:>9.3f}")
@@ -0,0 +1,40 @@
+import sqlite3
+
+import bulk_ingest
+from bulk_ingest import BulkIngest
+from setup_db import setup_database
+
+
+def extracted_job(i):
+    chunks = [(0, f'chunk text of document {i}', None, None, 1)]
+    return {'source': f'doc{i}.pdf', 'path': f'doc{i}.pdf', 'content_hash': f'hash{i}', 'duplicate': False,
+            'seconds': 0.0, 'extract_seconds': 0.0, 'error': None,
+            'doc': {'title': f'Document {i}', 'content_type': 'pdf', 'full_text': f'document {i}',
+                    'chunks': chunks}}
+
+
+def test_documents_are_committed_every_commit_every(tmp_path, monkeypatch):
+    db_path = str(tmp_path / 'test.db')
+    setup_database(quiet=True, db_path=db_path)
+    monkeypatch.setattr(bulk_ingest, 'DB_PATH', db_path)
+
+    pipeline = BulkIngest(io_workers=1, cpu_workers=1, commit_every=3)
+    # Skip fetch/extract: hand the writer already extracted documents
+    monkeypatch.setattr(pipeline, '_submit', lambda source, title: pipeline.results.put(extracted_job(source)))
+
+    reader = sqlite3.connect(db_path)
+    visible = []
+    write = pipeline._write
+
+    def write_and_look(conn, job):
+        written = write(conn, job)
+        visible.append(reader.execute('SELECT COUNT(*) FROM documents').fetchone()[0])
+        return written
+
+    monkeypatch.setattr(pipeline, '_write', write_and_look)
+
+    assert pipeline.run([(i, None) for i in range(5)])
+    # Nothing shows until the 3rd document's commit; documents 4-5 wait for the final commit
+    assert visible == [0, 0, 0, 3, 3]
+    assert reader.execute('SELECT COUNT(*) FROM documents').fetchone()[0] == 5
+    reader.close()
@@ -0,0 +1,38 @@
+from chunker import iter_chunks
+
+MIXED_TEXT = ('Hello there. ' + 'x' * 3000 + ' end. ' + 'A normal sentence with several words in it. ' * 20
+              + 'See https://example.com/' + 'a' * 700 + ' for details.')
+
+QUOTED_TEXT = ('He said "Stop." Then (she left.) [Done!] Was it \'over?\' '
+               'Nobody knew. They waited... "Really?!" ') * 40
+
+
+def rebuild(text, chunks):
+    """Join the chunks back together, dropping the text each one repeats from the last."""
+    out = ''
+    prev_end = chunks[0][1]
+    for chunk, start, end in chunks:
+        assert chunk == text[start:end]
+        if start >= prev_end:
+            gap = text[prev_end:start]
+            assert not gap.strip(), f"text lost between chunks: {gap!r}"
+            out += gap + chunk
+        else:
+            out += chunk[prev_end - start:]
+        prev_end = end
+    return out
+
+
+def test_chunks_never_exceed_size_on_mixed_input():
+    chunks = list(iter_chunks(MIXED_TEXT, 300, 50, 'chars'))
+
+    assert all(len(chunk) <= 300 for chunk, _, _ in chunks)
+    assert rebuild(MIXED_TEXT, chunks) == MIXED_TEXT.strip()
+
+
+def test_closing_quotes_and_brackets_stay_with_their_sentence():
+    chunks = list(iter_chunks(QUOTED_TEXT, 120, 40, 'chars'))
+
+    assert len(chunks) > 1
+    assert rebuild(QUOTED_TEXT, chunks) == QUOTED_TEXT.strip()
+    assert all(chunk.endswith(('.', '!', '?', '"', "'", ')', ']')) for chunk, _, _ in chunks)
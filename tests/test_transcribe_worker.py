@@ -0,0 +1,41 @@
+import sys
+import types
+
+import ingest
+from transcribe_worker import TranscriptionWorker
+
+
+class FakeModel:
+    def __init__(self):
+        self.transcribed = []
+
+    def transcribe(self, path):
+        self.transcribed.append(path)
+        return {'text': f'words from {path}',
+                'segments': [{'start': 0.0, 'end': 1.0, 'text': f'words from {path}'}]}
+
+
+def test_transcriptions_share_one_model_load(tmp_path, monkeypatch):
+    loads = []
+
+    def load_model(name):
+        loads.append(name)
+        return FakeModel()
+
+    monkeypatch.setitem(sys.modules, 'whisper', types.SimpleNamespace(load_model=load_model))
+    monkeypatch.setattr(ingest, '_whisper_model', None)
+    monkeypatch.setattr(ingest, 'TRANSCRIPTS_DIR', str(tmp_path))
+
+    paths = []
+    for name in ('a.mp3', 'b.mp3'):
+        path = tmp_path / name
+        path.write_bytes(b'')
+        paths.append(str(path))
+
+    worker = TranscriptionWorker(ingest=False, preload=False)
+    results = [worker.submit(path).result(timeout=30) for path in paths]
+    worker.close()
+
+    assert [r['ok'] for r in results] == [True, True]
+    assert len(loads) == 1
+    assert ingest._whisper_model.transcribed == paths
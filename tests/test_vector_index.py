@@ -0,0 +1,32 @@
+import faiss
+import numpy as np
+import pytest
+
+from vector_index import ENCODINGS, PQ_MIN_TRAIN_VECTORS, build_index, compare_encodings, resolve_index
+
+
+@pytest.mark.parametrize('encoding', ENCODINGS)
+def test_ivf_pq_on_a_small_corpus_falls_back_to_ivf_flat_int8(encoding, capsys):
+    n = 300
+    assert n < PQ_MIN_TRAIN_VECTORS
+    vecs = np.random.default_rng(0).standard_normal((n, 64)).astype('float32')
+
+    assert resolve_index('ivf_pq', encoding, n) == ('ivf_flat', 'int8')
+    index = build_index('ivf_pq', vecs, np.arange(n), encoding=encoding)
+
+    assert isinstance(faiss.downcast_index(index), faiss.IndexIVFScalarQuantizer)
+    assert index.ntotal == n
+    assert capsys.readouterr().out.count('using ivf_flat with int8') == 2  # resolve_index + build_index
+
+
+def test_resolved_pair_is_stable():
+    assert resolve_index('ivf_flat', 'int8', 300) == ('ivf_flat', 'int8')
+    assert resolve_index('ivf_pq', 'float32', 1000) == ('ivf_pq', 'pq')
+
+
+def test_compare_encodings_skips_pq_on_a_small_corpus(capsys):
+    vecs = np.random.default_rng(0).standard_normal((300, 64)).astype('float32')
+
+    compare_encodings('ivf_pq', vecs, np.arange(300), n_queries=20)
+
+    assert 'pq         skipped' in capsys.readouterr().out